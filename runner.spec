@@ -13,7 +13,7 @@ a = Analysis(['src\\runner.py'],
                     ('H:\\DOWNLOADS\\compile\\compile\\bin\\Tesseract-OCR\\tessdata\\*', 'bin/Tesseract-OCR/tessdata'),
                    ],
              binaries=[],
-             hiddenimports=[],
+             hiddenimports=['openpyxl'],
              hookspath=[],
              hooksconfig={},
              runtime_hooks=[],
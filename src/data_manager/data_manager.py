@@ -2,7 +2,7 @@
 This module deals with saving and reading data for the application
 
 Data Structure of .bci file:
-root
+root --- attrs{version: counts saves to the tree and table}
  |
  |--- ids : group
  |     |
@@ -13,7 +13,7 @@ root
  |      |
  |      |--- drawing_id : group --- attrs{total_imgs: int, 'drawing': 'drawing_name', parts: (parts)}
  |      |        |
- |      |        |--- page1.png : dataset
+ |      |        |--- page1.png : dataset --- attrs{stamp, rotation, packed, width, tables}
  |      |         ...
  |       ...
  |
@@ -30,20 +30,58 @@ root
  |           ...
  |
  |
- |--- user_data : group
+ |--- user_table : group
             |
-            |---part_id : group --- attrs{'part': 'part_name' ... data}
+            |--- part_ids : dataset --- row of each part in the sections
+            |--- section : dataset --- (rows, fields) attrs{fields: (fields)}
              ...
 
+ |
+ |--- search_index : group --- attrs{version}
+ |
+ |--- templates : group
+            |
+            |--- signature : group --- attrs{cols, roles}
+             ...
+
+ the user table is described in user_table.py, the search index in search_index.py
+
 """
-from threading import Thread
-from typing import List
+
+from contextlib import contextmanager
+from threading import Lock, RLock, Thread
+from typing import Iterator, List
+from uuid import uuid4
 import h5py
 import numpy as np
-from pdf2image import convert_from_path
-from PyPDF2 import PdfFileReader
 
-from gui.components.loading_popup.loading_popup import LoadingPopup
+from .page_cache import PageCache
+from .search_index import SearchIndex, section_text
+from . import user_table
+
+# pages with more pixels than this are never read into memory all at once
+HUGE_PIXELS = 14000 * 14000
+
+# height of the bands big pages are copied and rewritten in
+BAND_ROWS = 1024
+
+# row height of the chunks packed bilevel pages are stored in
+PACKED_CHUNK_ROWS = 256
+
+# parts read at a time when the tree is loaded in the background
+PART_CHUNK = 500
+
+# hdf5 can't have the same file open for reading and writing at once, so every
+# thread has to take this before opening the data file
+FILE_LOCK = RLock()
+
+
+@contextmanager
+def open_file(filename: str, mode: str):
+    """open the data file while holding the FILE_LOCK"""
+    with FILE_LOCK:
+        with h5py.File(filename, mode) as f:
+            yield f
 
 
 class DataWriter:
@@ -51,37 +89,65 @@ class DataWriter:
     This class handles all writing to the file
 
     Methods:
+        + save_drawings             = saves changed parts and deletes removed ones
         + insert_drawing            = inserts a new part into the file ids section
         + insert_images             = inserts an array of images under a part name
         + insert_image              = deletes old image of name, and creates new one
+        + set_rotation              = sets the view rotation of a page
+        + set_tables                = saves the boxes of the tables found on a page
+        + compact_rotation          = rotates the pixels of a page to its view rotation
         + insert_extract_data       = inserts the extracted data for a part number and img
         + insert_user_data          = inserts the table data for a part into the file
+        + insert_user_data_batch    = inserts the table data for many parts at once
+        + save_search_index         = saves the search index into the file
+        + insert_template           = saves the columns of a table layout
         + del_img_arr               = deletes all images for a part number
         + del_drawing               = deletes a part number from ids section of file
+        - write_drawing             = writes a part into an open file
         - get_num_extractions       = get how many extractions have been done on a
                                       part and img returns the next index
 
     Attributes:
         + debug
         + filename
+        + cache
 
     """
 
-    def __init__(self, file_path: str, debug=False) -> None:
+    def __init__(self, file_path: str, debug=False, cache: PageCache = None) -> None:
         self.debug = debug
         self.filename = file_path
+        self.cache = cache
 
-        with h5py.File(self.filename, "r+") as f:
-            groups = ["ids", "images", "extracted_data", "user_data"]
+        with open_file(self.filename, "r+") as f:
+            groups = ["ids", "images", "extracted_data"]
             for i in groups:
                 if i not in f:
                     f.create_group(i)
+            user_table.create(f)
+            user_table.migrate(f)
+            # pages from before the cache existed need a stamp to be cached
+            for drawing in f["images"].values():
+                for page in drawing.values():
+                    if "stamp" not in page.attrs:
+                        page.attrs["stamp"] = _new_stamp()
 
     def save_drawings(self, parts: list, deleted: list) -> bool:
-        for i in parts:
-            self.insert_drawing(i[0], i[1], i[2], i[3], i[4])
-        for i in deleted:
-            self.del_drawing(i)
+        """
+        Save the parts that changed ( parent, part_id, part_name, tag_color, children )
+        and delete the ids that were removed, all with the file opened once
+        """
+        with open_file(self.filename, "a") as f:
+            _bump_version(f)
+            for i in parts:
+                self.__write_drawing(f, i[0], i[1], i[2], i[3], i[4])
+            for i in deleted:
+                try:
+                    del f["ids"][i]
+                except KeyError as e:
+                    if self.debug:
+                        print(f"error in DataWriter - save_drawings \n {e}")
+        return True
 
     def insert_drawing(
         self, parent: str, part_id: str, part_name: str, tag_color: str, children: tuple
@@ -89,81 +155,191 @@ class DataWriter:
         """
         Treeview will use this for inserting,
         """
-        with h5py.File(self.filename, "a") as f:
+        with open_file(self.filename, "a") as f:
+            _bump_version(f)
+            return self.__write_drawing(
+                f, parent, part_id, part_name, tag_color, children
+            )
 
-            try:
-                f.create_group(f"ids/{part_id}")
-                print(f"inputting {part_id}")
-            except ValueError as e:
-                if self.debug:
-                    print(f"error in DataWriter - insert_drawing \n {e}")
-            try:
-                f[f"ids/{part_id}"].attrs["parent"] = parent
-                f[f"ids/{part_id}"].attrs["part_name"] = part_name
-                f[f"ids/{part_id}"].attrs["tag_color"] = tag_color
-                f[f"ids/{part_id}"].attrs["children"] = children
-            except ValueError as e:
-                if self.debug:
-                    print(f"error in DataWriter - insert_drawing \n {e}")
-                return False
+    def __write_drawing(
+        self, f, parent: str, part_id: str, part_name: str, tag_color: str, children
+    ) -> bool:
+        try:
+            f.create_group(f"ids/{part_id}")
+            print(f"inputting {part_id}")
+        except ValueError as e:
+            if self.debug:
+                print(f"error in DataWriter - insert_drawing \n {e}")
+        try:
+            f[f"ids/{part_id}"].attrs["parent"] = parent
+            f[f"ids/{part_id}"].attrs["part_name"] = part_name
+            f[f"ids/{part_id}"].attrs["tag_color"] = tag_color
+            f[f"ids/{part_id}"].attrs["children"] = children
+        except ValueError as e:
+            if self.debug:
+                print(f"error in DataWriter - insert_drawing \n {e}")
+            return False
         return True
 
-    def insert_images(self, part_id: str, pdf_path: str, gui_root, refresh) -> bool:
+    def insert_images(
+        self, part_id: str, pdf_path: str, progress=None, bilevel=False
+    ) -> None:
         """
-        Should insert into the images group with the drawing_id assigned by treeview
+        Should insert into the images group with the drawing_id assigned by treeview,
+        bilevel stores the pages as packed black and white bits (for line art).
+        This takes a while, it is meant to be run as a background job, progress is
+        called with the percent done after each page
         """
-        with h5py.File(self.filename, "a") as f:
+        # the pdf libraries are only loaded once a pdf is added, to start faster
+        from pdf2image import convert_from_path
+        from PyPDF2 import PdfFileReader
+
+        with open_file(self.filename, "a") as f:
             try:  # deletes group if already exists
                 del f["images"][part_id]
             except KeyError:
                 pass
 
-        def thread_task():
-            loading = LoadingPopup(
-                gui_root, title="Uploading pdf...", desc="Uploading pdf, please wait..."
+        with open(pdf_path, "rb") as pdf:
+            pdf_reader = PdfFileReader(pdf)
+            num_pgs = pdf_reader.getNumPages()
+        for i in range(1, num_pgs + 1):
+            img = convert_from_path(
+                pdf_path,
+                grayscale=True,
+                first_page=i,
+                last_page=i,
+                poppler_path=r"bin/Poppler",
             )
-            with open(pdf_path, "rb") as pdf:
-                pdf_reader = PdfFileReader(pdf)
-                num_pgs = pdf_reader.getNumPages()
-            for i in range(1, num_pgs + 1):
-                img = convert_from_path(
-                    pdf_path,
-                    grayscale=True,
-                    first_page=i,
-                    last_page=i,
-                    poppler_path=r"bin/Poppler",
-                )
-                loading.change_progress(i * 100 / num_pgs)
-                part_name = part_id + f"-{i-1}"
-                self.insert_image(part_id, part_name, np.array(img[0]))
-            refresh()
-
-        load_thread = Thread(target=thread_task)
-        load_thread.start()
+            part_name = part_id + f"-{i-1}"
+            self.insert_image(part_id, part_name, np.array(img[0]), bilevel)
+            if progress:
+                progress(i * 100 / num_pgs)
 
-    def insert_image(self, part_id: str, part_name: str, img: np.array) -> bool:
+    def insert_image(
+        self, part_id: str, part_name: str, img: np.array, bilevel=False
+    ) -> bool:
         """
         Deletes an image if it exists in the data file, creates a single image
-        in data file
+        in data file. A bilevel image is thresholded and stored 8 pixels to a byte
         """
-        with h5py.File(self.filename, "a") as f:
+        data, chunks = img, True
+        if bilevel:
+            img = _binarize(img)
+            data = _pack(img)
+            chunks = (min(PACKED_CHUNK_ROWS, data.shape[0]), data.shape[1])
+        with open_file(self.filename, "a") as f:
             try:
                 del f["images"][part_id][part_name]
             except KeyError:
                 pass
             try:
-                f.create_dataset(
+                dataset = f.create_dataset(
                     f"images/{part_id}/{part_name}",
-                    data=img,
+                    data=data,
+                    chunks=chunks,
                     compression="gzip",
                     compression_opts=9,
                 )
+                dataset.attrs["stamp"] = stamp = _new_stamp()
+                if bilevel:
+                    dataset.attrs["packed"] = True
+                    dataset.attrs["width"] = img.shape[1]
             except ValueError as e:
                 if self.debug:
                     print(f"error in DataWriter - insert_image \n {e}")
                 return False
+        if self.cache:
+            self.cache.put(f"/images/{part_id}/{part_name}", stamp, img)
         return True
 
+    def set_rotation(self, drawing_id: str, page_name: str, turns: int) -> bool:
+        """
+        Store how a page is rotated for viewing, turns are counter clockwise quarter
+        turns (same as np.rot90), the pixels are not touched
+        """
+        with open_file(self.filename, "a") as f:
+            try:
+                f["images"][drawing_id][page_name].attrs["rotation"] = turns % 4
+            except KeyError as e:
+                if self.debug:
+                    print(f"error in DataWriter - set_rotation \n {e}")
+                return False
+        return True
+
+    def set_tables(self, drawing_id: str, page_name: str, boxes: List[tuple]) -> bool:
+        """
+        Store the boxes of the tables found on a page, each ( x1, y1, x2, y2 ) as
+        fractions of the unrotated page
+        """
+        with open_file(self.filename, "a") as f:
+            try:
+                f["images"][drawing_id][page_name].attrs["tables"] = np.array(
+                    boxes, dtype=np.float32
+                ).reshape(len(boxes), 4)
+            except KeyError as e:
+                if self.debug:
+                    print(f"error in DataWriter - set_tables \n {e}")
+                return False
+        return True
+
+    def compact_rotation(self, drawing_id: str, page_name: str, done=None) -> None:
+        """
+        Physically rotate a page by its rotation attribute in a background thread.
+        The page is rewritten one band at a time so it is never fully in memory,
+        done is called once the new page has replaced the old one
+        """
+        path = f"images/{drawing_id}/{page_name}"
+        temp_path = path + "-rotated"
+
+        def thread_task():
+            with open_file(self.filename, "a") as f:
+                try:
+                    turns = int(f[path].attrs.get("rotation", 0))
+                    height, width = _shape(f[path])[:2]
+                    packed = _is_packed(f[path])
+                except KeyError as e:
+                    if self.debug:
+                        print(f"error in DataWriter - compact_rotation \n {e}")
+                    return
+                if turns == 0:
+                    return
+                shape = (width, height) if turns % 2 else (height, width)
+                if temp_path in f:
+                    del f[temp_path]
+                f.create_dataset(
+                    temp_path,
+                    shape=(shape[0], -(-shape[1] // 8)) if packed else shape,
+                    dtype=f[path].dtype,
+                    compression="gzip",
+                    compression_opts=9,
+                )
+            for top in range(0, shape[0], BAND_ROWS):
+                bottom = min(top + BAND_ROWS, shape[0])
+                # the lock is let go between bands so the ui can still read pages
+                with open_file(self.filename, "a") as f:
+                    band = _rotated_band(f[path], turns, top, bottom)
+                    f[temp_path][top:bottom] = _pack(band) if packed else band
+            with open_file(self.filename, "a") as f:
+                for key, value in f[path].attrs.items():
+                    f[temp_path].attrs[key] = value
+                # the view may have been turned again while the bands were written
+                current = int(f[path].attrs.get("rotation", turns))
+                f[temp_path].attrs["rotation"] = (current - turns) % 4
+                if "tables" in f[path].attrs:
+                    f[temp_path].attrs["tables"] = _rotated_tables(
+                        f[path].attrs["tables"], turns
+                    )
+                f[temp_path].attrs["stamp"] = _new_stamp()
+                if packed:
+                    f[temp_path].attrs["width"] = shape[1]
+                del f[path]
+                f.move(temp_path, path)
+            if done:
+                done()
+
+        Thread(target=thread_task, daemon=True).start()
+
     def insert_extract_data(
         self, drawing_id: str, img_id: str, data, meta_data
     ) -> bool:
@@ -175,7 +351,7 @@ class DataWriter:
         validated information)
         """
         new_id = self.__get_num_extractions(drawing_id, img_id)
-        with h5py.File(self.filename, "a") as f:
+        with open_file(self.filename, "a") as f:
             try:
                 f.create_dataset(
                     f"extracted_data/{drawing_id}/{img_id}/{new_id}", data=data
@@ -188,26 +364,54 @@ class DataWriter:
                     print(f"error in DataWriter - insert_extract_data \n {e}")
                 return False
 
-    def insert_user_data(self, drawing_id: str, data: dict) -> bool:
-        """Insert table data into the datafile"""
-        with h5py.File(self.filename, "a") as f:
-            for key in data.keys():
-                try:
-                    f.create_dataset(f"user_data/{drawing_id}", data=[])
-                except ValueError:
-                    # happens if already in datafile
-                    pass
-                try:
-                    f["user_data"][drawing_id].attrs[key] = data[key]
-                except ValueError as e:
-                    if self.debug:
-                        print(f"error in DataWriter - insert_user_data \n {e}")
-                    return False
+    def insert_user_data(self, drawing_id: str, section: str, data: dict) -> bool:
+        """Insert the table data of one section for a part into the datafile"""
+        return self.insert_user_data_batch({drawing_id: {section: data}})
+
+    def insert_user_data_batch(self, batch: dict) -> bool:
+        """
+        Insert table data for many parts with the file opened once,
+        batch is in form {part_id: {section: {field: data}}}
+        """
+        with open_file(self.filename, "a") as f:
+            _bump_version(f)
+            try:
+                user_table.write(f, batch)
+            except (KeyError, TypeError, ValueError) as e:
+                if self.debug:
+                    print(f"error in DataWriter - insert_user_data_batch \n {e}")
+                return False
+        return True
+
+    def save_search_index(self, index: SearchIndex) -> None:
+        """save the search index marked with the version of the file it matches"""
+        with open_file(self.filename, "a") as f:
+            index.save(f, int(f.attrs.get("version", 0)))
+
+    def insert_template(self, signature: str, cols: list, roles: List[str]) -> bool:
+        """
+        Save a table layout, cols is where its vertical rules are as fractions of
+        the table width and roles names what each column holds, like PART or QTY
+        """
+        with open_file(self.filename, "a") as f:
+            try:
+                templates = f.require_group("templates")
+                if signature in templates:
+                    del templates[signature]
+                template = templates.create_group(signature)
+                template.attrs["cols"] = np.array(cols, dtype=np.float32)
+                template.attrs["roles"] = np.array(roles, dtype=object).astype(
+                    h5py.string_dtype()
+                )
+            except ValueError as e:
+                if self.debug:
+                    print(f"error in DataWriter - insert_template \n {e}")
+                return False
         return True
 
     def del_img_arr(self, drawing_id: str) -> bool:
         """delete all of the images for an item in the data file"""
-        with h5py.File(self.filename, "a") as f:
+        with open_file(self.filename, "a") as f:
             try:
                 del f["images"][drawing_id]
             except KeyError as e:
@@ -218,7 +422,8 @@ class DataWriter:
 
     def del_drawing(self, part_id: str) -> bool:
         """delete a drawing from the ids table in the data file"""
-        with h5py.File(self.filename, "a") as f:
+        with open_file(self.filename, "a") as f:
+            _bump_version(f)
             try:
                 del f["ids"][part_id]
             except KeyError as e:
@@ -228,7 +433,7 @@ class DataWriter:
 
     def __get_num_extractions(self, drawing_id: str, img_id: str) -> int:
         """get the number of entries in the extraction"""
-        with h5py.File(self.filename, "r") as f:
+        with open_file(self.filename, "r") as f:
             if f"extracted_data/{drawing_id}/{img_id}" in f:
                 return len(f[f"extracted_data/{drawing_id}/{img_id}"])
             else:
@@ -241,22 +446,48 @@ class DataReader:
 
     Methods:
         + get_all_drawings          = returns a list of all part numbers in file
+        + iter_drawings             = the same as get_all_drawings, a chunk at a time
+        + count_drawings            = how many parts are in the file
         + get_img_arr               = returns all images for a part number
+        + get_img                   = returns one page, lazily if it is huge
+        + count_pages               = how many pages a drawing has
+        + get_tables                = the boxes of the tables found on the pages
+        - read_page                 = reads a page through the cache if there is one
+        - fill_cache                = decompresses a page into the cache in background
         + get_user_data             = get the table data that the user has input
+        + get_user_table            = get a section of the table data for every part
+        + get_user_rows             = get the table data of many parts at once
+        + find_parts                = ids of the parts with a value in a field
+        + get_search_index          = the saved search index, rebuilt if out of date
+        + get_templates             = every saved table layout
 
 
     Attributes:
         + debug
         + filename
+        + huge_pixels
+        + cache
+        - filling
+        - lock
     """
 
-    def __init__(self, file_path: str, debug=False) -> None:
+    def __init__(
+        self,
+        file_path: str,
+        debug=False,
+        huge_pixels=HUGE_PIXELS,
+        cache: PageCache = None,
+    ) -> None:
         self.debug = debug
         self.filename = file_path
+        self.huge_pixels = huge_pixels
+        self.cache = cache
+        self.__filling = set()  # ( dataset, stamp ) being put in the cache
+        self.__lock = Lock()
 
     def get_all_drawings(self) -> np.ndarray:
         """returns an array of form [ part_id, drawing_id, parent_id, children, part_name ]"""
-        with h5py.File(self.filename, "r") as f:
+        with open_file(self.filename, "r") as f:
             res = []
             for i in f["ids"]:
                 parent = f["ids"][i].attrs["parent"]
@@ -266,26 +497,64 @@ class DataReader:
                 res.append([i, parent, part_name, tag_color, children])
             return res
 
+    def count_drawings(self) -> int:
+        with open_file(self.filename, "r") as f:
+            return len(f["ids"])
+
+    def iter_drawings(self, chunk=PART_CHUNK) -> Iterator[List]:
+        """
+        yields the parts in chunks, each in the form of get_all_drawings. The file
+        is only held while a chunk is read, so other reads can go in between
+        """
+        with open_file(self.filename, "r") as f:
+            part_ids = list(f["ids"])
+        for start in range(0, len(part_ids), chunk):
+            with open_file(self.filename, "r") as f:
+                res = []
+                for i in part_ids[start : start + chunk]:
+                    try:
+                        attrs = f["ids"][i].attrs
+                    except KeyError:
+                        continue  # deleted since the ids were listed
+                    res.append(
+                        [
+                            i,
+                            attrs["parent"],
+                            attrs["part_name"],
+                            attrs["tag_color"],
+                            attrs["children"],
+                        ]
+                    )
+            yield res
+
     def get_img_arr(self, drawing_id: str) -> List:
         """returns all drawing files for a specified part"""
-        with h5py.File(self.filename, "r") as f:
+        with open_file(self.filename, "r") as f:
             try:
                 return [
-                    f["images"][drawing_id][i][:] for i in f["images"][drawing_id]
+                    _read(i, slice(None)) for i in f["images"][drawing_id].values()
                 ], list(f["images"][drawing_id])
             except KeyError as e:
                 if self.debug:
                     print(f"error in DataReader - get_img_arr \n {e}")
 
     def get_img(self, drawing_id: str, page: int):
-        with h5py.File(self.filename, "r") as f:
+        """
+        returns ( page, number of pages, rotation ) for a drawing, rotation is in
+        counter clockwise quarter turns. With a cache the page is memory mapped from
+        it, otherwise pages bigger than huge_pixels come back as a PageSource so
+        only the parts that are shown are read. A page that isn't cached yet is
+        read like that and put in the cache in the background
+        """
+        with open_file(self.filename, "r") as f:
             try:
                 print(f"drawingid - {drawing_id}")
                 print(f"page - {page}")
-                images = [f["images"][drawing_id][i] for i in f["images"][drawing_id]]
-                img = f["images"][drawing_id][drawing_id + f"-{page-1}"][:]
-                num_images = len(images)
-                return img, num_images
+                num_images = len(f["images"][drawing_id])
+                page_name = drawing_id + f"-{page-1}"
+                dataset = f["images"][drawing_id][page_name]
+                img = self.__read_page(dataset)
+                return img, num_images, int(dataset.attrs.get("rotation", 0))
             except KeyError as e:
                 if self.debug:
                     print(f"error in DataReader - get_img_arr \n {e}")
@@ -293,12 +562,244 @@ class DataReader:
                 if self.debug:
                     print(f"error in DataReader - get_img_arr \n {e}")
 
-    def get_user_data(self, drawing_id: str) -> List:
-        """returns the table data for a specified part"""
-        with h5py.File(self.filename, "r") as f:
-            # User data is stored in the attributes of the part_id group
+    def count_pages(self, drawing_id: str) -> int:
+        with open_file(self.filename, "r") as f:
             try:
-                return [i for i in f["user_data"][drawing_id].attrs.items()]
-            except KeyError as e:
-                if self.debug:
-                    print(f"error in DataReader - get_user_data \n {e}")
+                return len(f["images"][drawing_id])
+            except KeyError:
+                return 0
+
+    def get_tables(self, drawing_id: str, page=None) -> List[tuple]:
+        """
+        returns ( page, ( x1, y1, x2, y2 ), rotation ) for every table found on a
+        page of a drawing, or on every page when page is None, in page order.
+        Pages that haven't been searched for tables have none
+        """
+        res = []
+        with open_file(self.filename, "r") as f:
+            if drawing_id not in f["images"]:
+                return res
+            drawing = f["images"][drawing_id]
+            pages = range(1, len(drawing) + 1) if page is None else [page]
+            for pg in pages:
+                dataset = drawing.get(drawing_id + f"-{pg-1}")
+                if dataset is None:
+                    continue
+                rotation = int(dataset.attrs.get("rotation", 0))
+                for box in dataset.attrs.get("tables", []):
+                    res.append((pg, tuple(float(i) for i in box), rotation))
+        return res
+
+    def __read_page(self, dataset):
+        stamp = dataset.attrs.get("stamp")
+        if self.cache and stamp:
+            img = self.cache.get(dataset.name, stamp)
+            if img is not None:
+                return img
+            with self.__lock:
+                filling = (dataset.name, stamp) in self.__filling
+                self.__filling.add((dataset.name, stamp))
+            if not filling:
+                Thread(
+                    target=self.__fill_cache, args=(dataset.name, stamp), daemon=True
+                ).start()
+        if np.prod(_shape(dataset)) > self.huge_pixels:
+            return PageSource(self.filename, dataset.name)
+        return _read(dataset, slice(None))
+
+    def __fill_cache(self, name: str, stamp: str) -> None:
+        """
+        decompress a page into the cache one band at a time, the file is let go
+        between bands so the ui and the write queue aren't held up by it
+        """
+        cached, kept = None, False
+        try:
+            with open_file(self.filename, "r") as f:
+                shape, dtype = _shape(f[name]), f[name].dtype
+            cached = self.cache.create(name, stamp, shape, dtype)
+            for top in range(0, shape[0], BAND_ROWS):
+                with open_file(self.filename, "r") as f:
+                    if f[name].attrs.get("stamp") != stamp:
+                        return  # the page was rewritten, this copy is out of date
+                    cached[top : top + BAND_ROWS] = _read(
+                        f[name], slice(top, top + BAND_ROWS)
+                    )
+            cached.flush()
+            kept = True
+        except (KeyError, OSError, ValueError) as e:
+            if self.debug:
+                print(f"error in DataReader - fill_cache \n {e}")
+        finally:
+            if cached is not None:
+                del cached
+                self.cache.finish(name, stamp, kept)
+            with self.__lock:
+                self.__filling.discard((name, stamp))
+
+    def get_user_data(self, drawing_id: str) -> dict:
+        """returns the table data for a part in form {section: (('field', 'data'), )}"""
+        with open_file(self.filename, "r") as f:
+            return user_table.read_part(f, drawing_id)
+
+    def get_user_table(self, section: str, fields=None) -> tuple:
+        """
+        returns ( part_ids, fields, values ) for every part in a section of the table,
+        values is a 2d array with a row for each part and a column for each field
+        """
+        with open_file(self.filename, "r") as f:
+            return user_table.read_section(f, section, fields)
+
+    def get_user_rows(self, part_ids: List[str]) -> dict:
+        """
+        returns the table data of many parts in form {part_id: [data]}, the fields
+        of every section in order. Parts without table data are left out
+        """
+        with open_file(self.filename, "r") as f:
+            return user_table.read_rows(f, part_ids)
+
+    def find_parts(self, section: str, field: str, value: str) -> List[str]:
+        """returns the ids of the parts where a field of a section is value"""
+        with open_file(self.filename, "r") as f:
+            return user_table.find(f, section, field, value)
+
+    def get_search_index(self) -> SearchIndex:
+        """
+        returns the search index saved in the file, if the tree or table were saved
+        after it, it is built again from the part names and the user table
+        """
+        index = SearchIndex()
+        with open_file(self.filename, "r") as f:
+            version = f.attrs.get("version", 0)
+            saved = f.get("search_index")
+            if saved is not None and saved.attrs["version"] == version:
+                index.load(saved)
+                return index
+            for part_id, part in f["ids"].items():
+                index.set_text(part_id, "name", part.attrs["part_name"])
+            for section in user_table.SECTIONS:
+                part_ids, _, values = user_table.read_section(f, section)
+                for part_id, row in zip(part_ids, values):
+                    if any(row):
+                        index.set_text(part_id, section, section_text(row))
+        return index
+
+    def get_templates(self) -> List[tuple]:
+        """returns ( signature, cols, roles ) for every saved table layout"""
+        with open_file(self.filename, "r") as f:
+            return [
+                (
+                    signature,
+                    template.attrs["cols"].tolist(),
+                    [str(i) for i in template.attrs["roles"]],
+                )
+                for signature, template in f.get("templates", {}).items()
+            ]
+
+
+def _bump_version(f: h5py.File) -> None:
+    """the tree or table is being changed, saved search indexes are out of date"""
+    f.attrs["version"] = int(f.attrs.get("version", 0)) + 1
+
+
+def _new_stamp() -> str:
+    """a page is given a new stamp whenever its pixels are written"""
+    return uuid4().hex
+
+
+def _binarize(img: np.ndarray) -> np.ndarray:
+    """black and white version of a page, using an otsu threshold"""
+    import cv2  # only line art pages need it, so it isn't loaded on start
+
+    _, binary = cv2.threshold(img, 128, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+
+def _pack(img: np.ndarray) -> np.ndarray:
+    """pack a black and white page into 8 pixels per byte along its rows"""
+    return np.packbits(img > 0, axis=-1)
+
+
+def _is_packed(dataset) -> bool:
+    return bool(dataset.attrs.get("packed", False))
+
+
+def _shape(dataset) -> tuple:
+    """shape of the page a dataset holds, packed pages are wider than stored"""
+    if _is_packed(dataset):
+        return dataset.shape[:-1] + (int(dataset.attrs["width"]),)
+    return dataset.shape
+
+
+def _read(dataset, key) -> np.ndarray:
+    """
+    Slice a page dataset, bilevel pages are unpacked to 0 and 255 so they look like
+    any other page. Only the bytes covering the asked for columns are read
+    """
+    if not _is_packed(dataset):
+        return dataset[key]
+    rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+    start, stop, _ = cols.indices(int(dataset.attrs["width"]))
+    first = start // 8
+    bits = np.unpackbits(dataset[rows, first : -(-stop // 8)], axis=-1)
+    return bits[..., start - first * 8 : stop - first * 8] * np.uint8(255)
+
+
+def _rotated_band(dataset, turns: int, top: int, bottom: int) -> np.ndarray:
+    """rows [top:bottom] of np.rot90(dataset, turns), only reading what is needed"""
+    height, width = _shape(dataset)[:2]
+    if turns == 1:
+        cols = slice(width - bottom, width - top)
+        return np.rot90(_read(dataset, (slice(None), cols)))
+    if turns == 2:
+        return np.rot90(_read(dataset, slice(height - bottom, height - top)), 2)
+    return np.rot90(_read(dataset, (slice(None), slice(top, bottom))), 3)
+
+
+def _rotated_tables(boxes: np.ndarray, turns: int) -> np.ndarray:
+    """table boxes ( x1, y1, x2, y2 ) as fractions of np.rot90(page, turns)"""
+    res = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    for _ in range(turns % 4):
+        x1, y1, x2, y2 = res.T
+        res = np.stack((y1, 1 - x2, y2, 1 - x1), axis=1)
+    return res
+
+
+class PageSource:
+    """
+    Read only handle on a page dataset that is too big to hold in memory.
+    It is sliced like a numpy array, but each slice opens the file and reads only
+    the chunks that cover the requested rows and columns (unpacking bilevel pages)
+
+    Attributes:
+        + filename
+        + dataset
+        + shape
+        + dtype
+    """
+
+    def __init__(self, filename: str, dataset: str) -> None:
+        self.filename = filename
+        self.dataset = dataset
+        with open_file(self.filename, "r") as f:
+            self.shape = _shape(f[self.dataset])
+            self.dtype = f[self.dataset].dtype
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, key) -> np.ndarray:
+        with open_file(self.filename, "r") as f:
+            return _read(f[self.dataset], key)
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        """reads the whole page, only for things that really need all of it"""
+        img = self[:]
+        return img if dtype is None else img.astype(dtype)
@@ -0,0 +1,85 @@
+"""
+This module exports a project as a flat bill of materials
+
+Each part is one row in tree order with how deep it is in the tree, its parent,
+its OCR confidence tag and every field of the table. The parts are read from the
+user table EXPORT_CHUNK at a time and their rows streamed to the file one at a
+time, so the export never holds the table or the output in memory.
+
+.csv files are written with the csv module, .xlsx files need openpyxl, which is
+only imported when an xlsx file is exported and is used in its write only mode.
+Without openpyxl a .csv file is written next to where the .xlsx would have gone.
+"""
+import csv
+from importlib.util import find_spec
+from typing import Callable, Iterator, List
+
+from .data_manager import DataReader
+from .user_table import ROW_CHUNK, SECTIONS
+
+HEADER = ["Level", "Part", "Parent", "OCR Confidence"] + [
+    f"{section.title()}: {field}"
+    for section, fields in SECTIONS.items()
+    for field in fields
+]
+
+# parts read from the user table at once
+EXPORT_CHUNK = ROW_CHUNK
+
+
+def export_rows(reader: DataReader, outline: List[tuple]) -> Iterator[list]:
+    """
+    Passed the parts in form ( level, part_id, part_name, parent_name, tag_color ),
+    yields the header and then one row for each part
+    """
+    empty = [""] * (len(HEADER) - 4)
+    yield HEADER
+    for start in range(0, len(outline), EXPORT_CHUNK):
+        chunk = outline[start : start + EXPORT_CHUNK]
+        found = reader.get_user_rows([i[1] for i in chunk])
+        for level, part_id, part_name, parent_name, tag_color in chunk:
+            yield [level, part_name, parent_name, tag_color] + found.get(part_id, empty)
+
+
+def export_path(path: str) -> str:
+    """the path export writes for path, .csv in place of .xlsx without openpyxl"""
+    if path.lower().endswith(".xlsx") and find_spec("openpyxl") is None:
+        return path[:-5] + ".csv"
+    return path
+
+
+def export(
+    reader: DataReader, outline: List[tuple], path: str, progress: Callable = None
+) -> str:
+    """
+    Write the parts to a .csv or .xlsx file depending on the extension of path,
+    progress is called with the percent done each time it goes up by at least one.
+    Returns the path that was written
+    """
+    total = max(len(outline), 1)
+    rows = export_rows(reader, outline)
+    path = export_path(path)
+    if path.lower().endswith(".xlsx"):
+        from openpyxl import Workbook  # optional, only needed for xlsx
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Parts")
+        _stream(rows, sheet.append, total, progress)
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            _stream(rows, csv.writer(f).writerow, total, progress)
+    if progress:
+        progress(100)
+    return path
+
+
+def _stream(rows: Iterator[list], write: Callable, total: int, progress) -> None:
+    """write rows one at a time, the header row isn't counted for progress"""
+    done = 0
+    for i, row in enumerate(rows):
+        write(row)
+        percent = (i * 99) // total
+        if progress and percent > done:
+            done = percent
+            progress(percent)
@@ -0,0 +1,149 @@
+"""
+This module is a local cache of uncompressed pages for the data file
+
+The pages in the .bci file are gzip compressed, so every time one is viewed the
+whole page has to be decompressed again. The cache keeps an uncompressed .npy copy
+of each page that has been looked at in a local folder, which np.load can memory map.
+Reading a cached page, or cropping from it, then only touches the bytes that are used.
+
+Cache files are named after the dataset and its stamp attribute, the DataWriter gives
+a page a new stamp whenever its pixels change, so an old copy is never used.
+
+Cache folder:
+<temp dir>/bci_page_cache
+ |
+ |--- project_hash : folder
+ |       |
+ |       |--- dataset_hash-stamp.npy
+ |        ...
+  ...
+"""
+import hashlib
+import os
+import tempfile
+from threading import Lock
+from typing import Optional
+import numpy as np
+
+# size the cache for a project is kept under, least recently used pages go first
+CACHE_BYTES = 4 * 1024 ** 3
+
+
+class PageCache:
+    """
+    Memory mapped sidecar cache of decompressed pages for one project
+
+    Methods:
+        + get                       = memory map a cached page, None if not cached
+        + put                       = save a page into the cache
+        + create                    = make an empty cached page to be filled in
+        + finish                    = makes a page filled in after create usable
+        + evict                     = remove least recently used pages over max_bytes
+        - path                      = file path for a dataset and stamp
+        - remove_stale              = delete old versions of a dataset
+
+    Attributes:
+        + directory
+        + max_bytes
+        + debug
+        - lock
+    """
+
+    def __init__(
+        self, filename: str, max_bytes=CACHE_BYTES, directory=None, debug=False
+    ) -> None:
+        self.debug = debug
+        self.max_bytes = max_bytes
+        project = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:16]
+        root = directory or os.path.join(tempfile.gettempdir(), "bci_page_cache")
+        self.directory = os.path.join(root, project)
+        os.makedirs(self.directory, exist_ok=True)
+        self.__lock = Lock()
+
+    def get(self, dataset: str, stamp: str) -> Optional[np.memmap]:
+        """memory map the cached copy of a dataset if it matches the stamp"""
+        path = self.__path(dataset, stamp)
+        try:
+            page = np.load(path, mmap_mode="r")
+            os.utime(path)  # mark as recently used for eviction
+            return page
+        except (OSError, ValueError) as e:
+            if self.debug and os.path.exists(path):
+                print(f"error in PageCache - get \n {e}")
+            return None
+
+    def put(self, dataset: str, stamp: str, img: np.ndarray) -> None:
+        """write a page into the cache, replacing any older version of it"""
+        path = self.__path(dataset, stamp)
+        temp = path + ".tmp"
+        try:
+            with open(temp, "wb") as f:
+                np.save(f, img)
+            os.replace(temp, path)
+        except OSError as e:
+            if self.debug:
+                print(f"error in PageCache - put \n {e}")
+            return
+        self.__remove_stale(dataset, stamp)
+        self.evict()
+
+    def create(self, dataset: str, stamp: str, shape: tuple, dtype) -> np.memmap:
+        """
+        make a writable memory mapped page in the cache, for pages that are filled
+        in a band at a time. get doesn't see it until it is flushed, closed and
+        passed to finish
+        """
+        self.__remove_stale(dataset, stamp)
+        self.evict(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        return np.lib.format.open_memmap(
+            self.__path(dataset, stamp) + ".part", mode="w+", dtype=dtype, shape=shape
+        )
+
+    def finish(self, dataset: str, stamp: str, keep=True) -> None:
+        """move a page made with create to where get finds it, or drop it"""
+        path = self.__path(dataset, stamp)
+        try:
+            if keep:
+                os.replace(path + ".part", path)
+            else:
+                os.remove(path + ".part")
+        except OSError as e:
+            if self.debug:
+                print(f"error in PageCache - finish \n {e}")
+
+    def evict(self, extra_bytes=0) -> None:
+        """remove the least recently used pages until the cache fits in max_bytes"""
+        with self.__lock:
+            files = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(i[1] for i in files) + extra_bytes
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError as e:
+                    # a page that is still memory mapped can't be removed on windows
+                    if self.debug:
+                        print(f"error in PageCache - evict \n {e}")
+
+    def __path(self, dataset: str, stamp: str) -> str:
+        key = hashlib.sha1(dataset.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{key}-{stamp}.npy")
+
+    def __remove_stale(self, dataset: str, stamp: str) -> None:
+        key = hashlib.sha1(dataset.encode()).hexdigest()[:16]
+        current = os.path.basename(self.__path(dataset, stamp))
+        for name in os.listdir(self.directory):
+            if name.startswith(key + "-") and name != current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
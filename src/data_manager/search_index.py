@@ -0,0 +1,249 @@
+"""
+This module is the search index over the parts of a project
+
+Every part has a few pieces of text (its name and the table data of each section),
+they are joined and indexed by trigram: each three letter piece of the lowercased
+text points at the parts that contain it. A search intersects the parts of the
+trigrams of the query, then checks the few parts left actually contain it.
+
+The index is saved in the .bci file as arrays, with the parts of every trigram
+stored back to back (postings) and where each trigram starts in them (offsets).
+The saved arrays are searched as they are read, parts that are changed after the
+index is loaded go into a small in memory index that is searched alongside them,
+and the two are merged into new arrays when the index is saved again.
+
+Data structure in the .bci file:
+search_index : group --- attrs{version}
+ |
+ |--- part_ids : dataset (parts,)
+ |--- fields : dataset (parts,) --- names of the pieces of text of each part
+ |--- texts : dataset (parts,) --- the pieces of text of each part
+ |--- grams : dataset (grams,)
+ |--- offsets : dataset (grams + 1,)
+ |--- postings : dataset --- rows in part_ids
+"""
+from typing import Dict, Iterator, List
+import h5py
+import numpy as np
+
+# the pieces of text of a part are joined with this, it is never in a search
+SEP = "\x1f"
+
+STRING = h5py.string_dtype()
+
+
+def section_text(values) -> str:
+    """the text of a section of the table, its filled in values"""
+    return " ".join(i for i in values if i)
+
+
+def grams(text: str) -> set:
+    """trigrams of a lowercased text, short texts are their own gram"""
+    if len(text) < 3:
+        return {text} if text else set()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Trigram index of the text of every part
+
+    Methods:
+        + set_text                  = sets a piece of text of a part
+        + remove                    = removes a part from the index
+        + search                    = ids of the parts whose text contains the query
+        + load                      = reads a saved index from an open data file
+        + save                      = writes the whole index into an open data file
+        + merge                     = takes in an index read from the file in the
+                                      background, keeping the changes made here
+        - candidates                = saved rows that have every gram of the query
+        - saved_doc                 = the pieces of text of a saved part
+        - parts                     = every part and its pieces of text
+
+    Attributes:
+        + dirty
+        - ids
+        - fields
+        - texts
+        - rows
+        - offsets
+        - postings
+        - stale
+        - docs
+        - delta
+        - removed
+    """
+
+    def __init__(self) -> None:
+        self.dirty = False  # changed since it was loaded or saved
+        # saved index, as read from the file
+        self.__ids = np.empty(0, object)
+        self.__fields = np.empty(0, object)
+        self.__texts = np.empty(0, object)
+        self.__rows = {}  # part_id: row in the saved arrays
+        self.__offsets = {}  # gram: ( start, end ) in postings
+        self.__postings = np.empty(0, np.int32)
+        self.__stale = set()  # saved rows that were changed or removed since
+        # parts changed since the index was loaded
+        self.__docs = {}  # part_id: {field: text}
+        self.__delta = {}  # gram: {part_id}
+        self.__removed = set()  # parts removed since the index was loaded
+
+    def __len__(self) -> int:
+        return len(self.__ids) - len(self.__stale) + len(self.__docs)
+
+    def set_text(self, part_id: str, field: str, text: str) -> None:
+        """set the text of one field of a part, like its name or a table section"""
+        text = text.replace(SEP, " ")
+        doc = self.__docs.get(part_id)
+        if doc is None:
+            doc = self.__saved_doc(part_id)
+        if field in doc and doc[field] == text:
+            return
+        self.remove(part_id)
+        doc[field] = text
+        self.__docs[part_id] = doc
+        self.__removed.discard(part_id)
+        for gram in grams(SEP.join(doc.values()).lower()):
+            self.__delta.setdefault(gram, set()).add(part_id)
+        self.dirty = True
+
+    def remove(self, part_id: str) -> None:
+        """take a part out of the index"""
+        row = self.__rows.get(part_id)
+        if row is not None:
+            self.__stale.add(row)
+        doc = self.__docs.pop(part_id, None)
+        if doc is not None:
+            for gram in grams(SEP.join(doc.values()).lower()):
+                self.__delta[gram].discard(part_id)
+        self.__removed.add(part_id)
+        self.dirty = True
+
+    def search(self, query: str, limit=None) -> List[str]:
+        """
+        ids of the parts that have the query in any of their text, any case,
+        it stops looking once limit parts are found
+        """
+        query = query.lower().strip()
+        if not query or SEP in query:
+            return []
+        res = []
+        if len(query) >= 3:
+            found = set.intersection(
+                *(self.__delta.get(i, set()) for i in grams(query))
+            )
+        else:
+            found = set().union(*(j for i, j in self.__delta.items() if query in i))
+        for part_id in found:
+            if query in SEP.join(self.__docs[part_id].values()).lower():
+                res.append(part_id)
+        for row in self.__candidates(query):
+            if limit is not None and len(res) >= limit:
+                break
+            if row not in self.__stale and query in self.__texts[row].lower():
+                res.append(self.__ids[row])
+        return res if limit is None else res[:limit]
+
+    def load(self, group: h5py.Group) -> None:
+        """read an index saved with save"""
+        self.__ids = np.asarray(group["part_ids"].asstr()[:], dtype=object)
+        self.__fields = np.asarray(group["fields"].asstr()[:], dtype=object)
+        self.__texts = np.asarray(group["texts"].asstr()[:], dtype=object)
+        offsets = group["offsets"][:]
+        self.__offsets = {
+            gram: (offsets[i], offsets[i + 1])
+            for i, gram in enumerate(group["grams"].asstr()[:])
+        }
+        self.__postings = group["postings"][:]
+        self.__rows = {part_id: row for row, part_id in enumerate(self.__ids)}
+        self.__stale = set()
+        self.__docs = {}
+        self.__delta = {}
+        self.__removed = set()
+        self.dirty = False
+
+    def merge(self, other: "SearchIndex") -> None:
+        """
+        Take the contents of other, an index read from the file while this one was
+        already being changed. Fields set here replace the ones in other and parts
+        removed here stay removed
+        """
+        docs, removed = self.__docs, self.__removed
+        self.__ids, self.__fields = other.__ids, other.__fields
+        self.__texts = other.__texts
+        self.__rows, self.__offsets = other.__rows, other.__offsets
+        self.__postings, self.__stale = other.__postings, set(other.__stale)
+        self.__docs, self.__delta = other.__docs, other.__delta
+        self.__removed = set()
+        self.dirty = other.dirty
+        for part_id in removed:
+            self.remove(part_id)
+        for part_id, doc in docs.items():
+            for field, text in doc.items():
+                self.set_text(part_id, field, text)
+
+    def save(self, f: h5py.File, version: int) -> None:
+        """
+        merge the changes into the saved arrays and write them as the search_index
+        group, version is the version of the file the index matches
+        """
+        ids, fields, texts, postings = [], [], [], {}
+        for row, (part_id, doc) in enumerate(self.__parts()):
+            ids.append(part_id)
+            fields.append(SEP.join(doc.keys()))
+            texts.append(SEP.join(doc.values()))
+            for gram in grams(texts[-1].lower()):
+                postings.setdefault(gram, []).append(row)
+        gram_list = sorted(postings)
+        offsets = np.cumsum([0] + [len(postings[i]) for i in gram_list])
+        rows = [j for i in gram_list for j in postings[i]]
+        if "search_index" in f:
+            del f["search_index"]
+        group = f.create_group("search_index")
+        for name, data in [
+            ("part_ids", ids),
+            ("fields", fields),
+            ("texts", texts),
+            ("grams", gram_list),
+        ]:
+            data = np.array(data, dtype=object).reshape(len(data))
+            group.create_dataset(name, data=data, dtype=STRING)
+        group.create_dataset("offsets", data=offsets.astype(np.int64))
+        group.create_dataset(
+            "postings", data=np.array(rows, dtype=np.int32), compression="gzip"
+        )
+        group.attrs["version"] = version
+        self.load(group)
+
+    def __candidates(self, query: str) -> np.ndarray:
+        """saved rows that could have the query, they still have to be checked"""
+        if len(query) < 3:
+            spans = [j for i, j in self.__offsets.items() if query in i]
+            if not spans:
+                return np.empty(0, np.int32)
+            return np.unique(np.concatenate([self.__postings[i:j] for i, j in spans]))
+        spans = [self.__offsets.get(i) for i in grams(query)]
+        if None in spans:
+            return np.empty(0, np.int32)
+        res = None
+        for i, j in sorted(spans, key=lambda span: span[1] - span[0]):
+            rows = self.__postings[i:j]
+            res = rows if res is None else np.intersect1d(res, rows, assume_unique=True)
+            if len(res) == 0:
+                break
+        return res
+
+    def __saved_doc(self, part_id: str) -> Dict[str, str]:
+        row = self.__rows.get(part_id)
+        if row is None or row in self.__stale or not self.__fields[row]:
+            return {}
+        return dict(
+            zip(self.__fields[row].split(SEP), self.__texts[row].split(SEP))
+        )
+
+    def __parts(self) -> Iterator[tuple]:
+        for row, part_id in enumerate(self.__ids):
+            if row not in self.__stale:
+                yield part_id, self.__saved_doc(part_id)
+        yield from self.__docs.items()
@@ -0,0 +1,200 @@
+"""
+This module stores the table data the user fills in as columns
+
+Each section of the table (the tabs of the DrawingTable) is a single 2d dataset of
+strings, one row per part and one column per field. Every part has the same row in
+all the sections, the row of a part is its index in user_table/part_ids. The
+datasets are chunked a column at a time, so a query on one field like
+"all parts with Plating Spec X" only reads that field for every part.
+
+Data structure in the .bci file:
+user_table : group
+ |
+ |--- part_ids : dataset (rows,)
+ |--- drawing : dataset (rows, fields) --- attrs{fields: (fields)}
+ |--- material : dataset (rows, fields) --- attrs{fields: (fields)}
+  ...
+"""
+import os
+from typing import Dict, List
+import h5py
+import numpy as np
+
+# the fields of each section in the order they are shown and stored
+SECTIONS = {
+    "drawing": [
+        "Description",
+        "CAGE Code",
+        "Qty",
+        "Flag Notes",
+        "Drawing",
+        "Sheet No",
+        "DWG Rev",
+        "EO Numbers",
+        "ESDS",
+        "HCI",
+    ],
+    "material": ["Material", "Material Spec", "Type", "Class", "Grade", "Notes"],
+    "plating": ["Plating", "Plating Spec", "Type", "Class", "Grade", "Notes"],
+    "primer": ["Primer", "Primer Spec", "Type", "Class", "Grade", "Notes"],
+    "paint": ["Paint Spec", "Color", "Type", "Notes"],
+    "misc": [
+        "Welding (Y/N)",
+        "Heat Treatment (Y/N)",
+        "F-Code",
+        "Surface Finish/Roughness",
+        "Other Comments",
+    ],
+}
+
+# rows in a chunk of a section, a chunk is one field of this many parts
+ROW_CHUNK = 4096
+
+STRING = h5py.string_dtype()
+
+# rows of the parts of each file, {path: ( {part_id: row}, last part_id )}. Rows are
+# only ever appended, so only the ids added since the last read are read. The file
+# is only read with the FILE_LOCK held, which keeps this consistent too
+_ROWS = {}
+
+
+def create(f: h5py.File) -> None:
+    """make the empty user table, sections that are already there are left alone"""
+    table = f.require_group("user_table")
+    if "part_ids" not in table:
+        table.create_dataset(
+            "part_ids", shape=(0,), maxshape=(None,), dtype=STRING, chunks=(ROW_CHUNK,)
+        )
+    for section, fields in SECTIONS.items():
+        if section not in table:
+            dataset = table.create_dataset(
+                section,
+                shape=(0, len(fields)),
+                maxshape=(None, len(fields)),
+                dtype=STRING,
+                chunks=(ROW_CHUNK, 1),
+            )
+            dataset.attrs["fields"] = fields
+
+
+def part_rows(f: h5py.File) -> Dict[str, int]:
+    """
+    row of every part in the user table, only the rows appended since it was last
+    called for the file are read. It is shared, so it mustn't be changed
+    """
+    dataset = f["user_table/part_ids"]
+    key = os.path.realpath(f.filename)
+    rows, last = _ROWS.get(key, ({}, None))
+    if len(dataset) < len(rows) or (rows and dataset.asstr()[len(rows) - 1] != last):
+        rows, last = {}, None  # another file was made at the same path
+    if len(dataset) > len(rows):
+        start = len(rows)
+        part_ids = _column(dataset, slice(start, None))
+        rows.update((part_id, start + i) for i, part_id in enumerate(part_ids))
+        last = part_ids[-1]
+    _ROWS[key] = (rows, last)
+    return rows
+
+
+def write(f: h5py.File, batch: dict) -> None:
+    """
+    Write the data for many parts, batch is in form {part_id: {section: {field: data}}}.
+    Parts that aren't in the table yet get new rows, then every section is updated
+    with one read and one write of the rows that changed
+    """
+    table = f["user_table"]
+    rows = part_rows(f)
+    new = [i for i in batch if i not in rows]
+    if new:
+        start = len(rows)
+        for dataset in [table["part_ids"]] + [table[i] for i in SECTIONS]:
+            dataset.resize(start + len(new), axis=0)
+        table["part_ids"][start:] = np.array(new, dtype=object)
+        rows = part_rows(f)  # reads only the ids just added
+    for section, fields in SECTIONS.items():
+        changed = sorted(
+            (rows[part_id], sections[section])
+            for part_id, sections in batch.items()
+            if sections.get(section)
+        )
+        if not changed:
+            continue
+        index = [row for row, _ in changed]
+        block = _column(table[section], index)
+        for i, (_, data) in enumerate(changed):
+            for field, value in data.items():
+                if field in fields:
+                    block[i, fields.index(field)] = value
+        table[section][index] = block
+
+
+def read_part(f: h5py.File, part_id: str) -> Dict[str, List[tuple]]:
+    """the data for one part in form {section: (('field', 'data'), )}"""
+    row = part_rows(f).get(part_id)
+    if row is None:
+        return {}
+    return {
+        section: list(zip(fields, _column(f["user_table"][section], row)))
+        for section, fields in SECTIONS.items()
+    }
+
+
+def read_section(f: h5py.File, section: str, fields=None) -> tuple:
+    """
+    ( part_ids, fields, values ) of a whole section with one read per field,
+    values is a 2d array of strings with a row for each part
+    """
+    dataset = f["user_table"][section]
+    all_fields = list(dataset.attrs["fields"])
+    fields = all_fields if fields is None else list(fields)
+    values = np.stack(
+        [_column(dataset, (slice(None), all_fields.index(i))) for i in fields], axis=1
+    )
+    return _column(f["user_table/part_ids"]), fields, values
+
+
+def read_rows(f: h5py.File, part_ids: List[str]) -> Dict[str, list]:
+    """
+    the data of every section for the parts that have a row, in form
+    {part_id: [data]} with the fields in the order of SECTIONS, one read per section
+    """
+    rows = part_rows(f)
+    index = sorted({rows[i] for i in part_ids if i in rows})
+    if not index:
+        return {}
+    table = f["user_table"]
+    block = np.concatenate([_column(table[i], index) for i in SECTIONS], axis=1)
+    return {
+        part_id: list(values)
+        for part_id, values in zip(_column(table["part_ids"], index), block)
+    }
+
+
+def find(f: h5py.File, section: str, field: str, value: str) -> List[str]:
+    """ids of the parts where the field of a section is value, reads only that field"""
+    part_ids, _, values = read_section(f, section, [field])
+    return list(part_ids[values[:, 0] == value])
+
+
+def migrate(f: h5py.File) -> None:
+    """
+    Move the data from the old user_data group, where each part was a dataset with
+    the fields as attributes, into the user table. The old attributes had no section,
+    so a field goes into every section that has it, same as it was shown
+    """
+    if "user_data" not in f:
+        return
+    batch = {}
+    for part_id, dataset in f["user_data"].items():
+        attrs = dict(dataset.attrs.items())
+        batch[part_id] = {
+            section: {i: str(attrs[i]) for i in fields if i in attrs}
+            for section, fields in SECTIONS.items()
+        }
+    write(f, batch)
+    del f["user_data"]
+
+
+def _column(dataset: h5py.Dataset, key=slice(None)) -> np.ndarray:
+    """read strings from a dataset as str instead of bytes"""
+    return np.asarray(dataset.asstr()[key], dtype=object)
@@ -0,0 +1,141 @@
+"""
+This module writes table edits to the data file in the background
+"""
+from threading import Condition, Thread
+
+from .data_manager import FILE_LOCK, DataWriter
+
+# seconds between tries of a batch that couldn't be written
+RETRY_SECONDS = 5
+
+
+class WriteQueue:
+    """
+    Write behind queue for the user data of parts, owns the only thread that writes
+    user data to the file
+
+    Methods:
+        + put_user_data             = queues table data for a part, never waits on the file
+        + pending                   = table data for a part that isn't in the file yet
+        + overlay                   = puts the pending data on top of data read from the file
+        + read                      = reads data from the file with the pending data on top
+        + flush                     = waits until everything queued is in the file
+        + close                     = flushes and stops the writer thread
+        - run                       = writer thread, saves the queued data in batches
+        - write                     = saves the batch being written, True if it was
+
+    Attributes:
+        + debug
+        - data_writer
+        - bus
+        - queued
+        - writing
+        - failed
+        - closed
+        - condition
+        - thread
+    """
+
+    def __init__(self, data_writer: DataWriter, bus=None, debug=False) -> None:
+        self.debug = debug
+        self.__data_writer = data_writer
+        self.__bus = bus
+        self.__queued = {}  # {part_id: {section: {field: data}}} waiting to be written
+        self.__writing = {}  # the batch the writer thread is saving right now
+        self.__failed = False  # the last batch couldn't be written
+        self.__closed = False
+        self.__condition = Condition()
+        self.__thread = Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def put_user_data(self, part_id: str, section: str, data: dict) -> None:
+        """queue table data for a part, newer values replace older ones of the field"""
+        with self.__condition:
+            sections = self.__queued.setdefault(part_id, {})
+            sections.setdefault(section, {}).update(data)
+            self.__condition.notify_all()
+
+    def pending(self, part_id: str) -> dict:
+        """
+        the data for a part that has been queued but isn't in the file yet,
+        in form {section: {field: data}}
+        """
+        with self.__condition:
+            res = {}
+            for batch in (self.__writing, self.__queued):
+                for section, data in batch.get(part_id, {}).items():
+                    res.setdefault(section, {}).update(data)
+            return res
+
+    def overlay(self, part_id: str, data: dict) -> dict:
+        """
+        Passed the data read from the file for a part in form
+        {section: (('field', 'data'), )}, returns it with the edits that are still
+        queued applied on top
+        """
+        res = {section: dict(fields) for section, fields in data.items()}
+        for section, fields in self.pending(part_id).items():
+            res.setdefault(section, {}).update(fields)
+        return {section: list(fields.items()) for section, fields in res.items()}
+
+    def read(self, part_id: str, read) -> dict:
+        """
+        read(part_id) from the file with the queued edits laid on top. The file is
+        held until the overlay is taken, so a batch can't be written in between and
+        be missing from both
+        """
+        with FILE_LOCK:
+            return self.overlay(part_id, read(part_id))
+
+    def flush(self, timeout=None) -> bool:
+        """
+        block until everything queued has been written, False if it timed out or
+        the queued data can't be written
+        """
+        with self.__condition:
+            self.__condition.wait_for(
+                lambda: (not self.__queued and not self.__writing) or self.__failed,
+                timeout,
+            )
+            return not self.__queued and not self.__writing
+
+    def close(self, timeout=None) -> None:
+        """write everything that is queued and stop the writer thread"""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__thread.join(timeout)
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__queued or self.__closed)
+                if not self.__queued:
+                    return  # closed and nothing left to write
+                self.__writing, self.__queued = self.__queued, {}
+            saved = self.__write()
+            with self.__condition:
+                if not saved:
+                    # newer edits were queued while writing, they go on top
+                    for part_id, sections in self.__queued.items():
+                        for section, data in sections.items():
+                            batch = self.__writing.setdefault(part_id, {})
+                            batch.setdefault(section, {}).update(data)
+                    self.__queued = self.__writing
+                    if not self.__failed and self.__bus:
+                        self.__bus.post("write_failed", list(self.__queued))
+                self.__failed = not saved
+                self.__writing = {}
+                self.__condition.notify_all()
+                if not saved:
+                    if self.__closed:
+                        return  # nothing more can be done, it has been reported
+                    self.__condition.wait_for(lambda: self.__closed, RETRY_SECONDS)
+
+    def __write(self) -> bool:
+        try:
+            return self.__data_writer.insert_user_data_batch(self.__writing)
+        except Exception as e:  # the writer thread has to keep running
+            if self.debug:
+                print(f"error in WriteQueue - write \n {e}")
+            return False
@@ -1,14 +1,29 @@
 """
 Main image processing class
-Must be initialized with an image path
+Reads the tables of drawings with tesseract in background jobs
 """
-from threading import Thread
-from tkinter import Variable
-import pytesseract
+from itertools import zip_longest
+from time import perf_counter
+from typing import Callable, List
 import numpy as np
 
-from .helper import get_boxes
-from gui.components.loading_popup.loading_popup import LoadingPopup
+from gui.components.event_bus.event_bus import EventBus
+from gui.components.job_manager.job_manager import Job, JobManager
+from .ocr_profiles import (
+    BLANK,
+    DEFAULT,
+    FAST,
+    FAST_TEXT_HEIGHT,
+    RETRY,
+    RETRY_CONF,
+    RETRY_TEXT_HEIGHT,
+    OcrStats,
+    profile_for,
+    tesseract_config,
+)
+from .templates import header_roles
+
+TESSERACT_CMD = r"bin\Tesseract-OCR\tesseract.exe"
 
 
 class TableExtractor:
@@ -16,76 +31,187 @@ class TableExtractor:
     Runs OCR on table image
 
     Methods:
-        + extract_table        = run the extraction, return an array of extracted text
+        + extract_table        = queue the extraction, the table is posted when done
+        + extract_batch        = queue one job extracting many regions, merged in order
+        - extract              = the extraction job, returns the extracted text
+        - extract_regions      = the batch job, returns the merged table
+        - read_table           = finds the cells of a table image and OCRs them,
+                                 from a template when its layout is known
+        - read_cell            = OCRs a cell fast, then carefully if unsure of it,
+                                 scaled for the height of the text in its row
+        - finish               = keeps and posts a finished table
         - correct_bounding     = change bounding boxes from (x,y,w,h) -> (x1,y1,x2,y2)
-        - run_tesseract        = uses tesseract with a custom config
+        - run_tesseract        = uses tesseract with the config of an OCR profile
 
 
     Attributes:
+        + debug
         + data
-        + root
-        - image
+        + bus
+        + jobs
+        + templates
+        + stats
 
 
     """
 
-    def __init__(self, gui_root):
-        pytesseract.pytesseract.tesseract_cmd = r"bin\Tesseract-OCR\tesseract.exe"
-        self.data = Variable(value=None)
-        self.__image = None
-        self.root = gui_root
+    def __init__(self, bus: EventBus, jobs: JobManager, debug=False):
+        self.debug = debug
+        self.data = None  # the last table extracted
+        self.bus = bus
+        self.jobs = jobs
+        self.templates = None  # TemplateStore of the open file
+        self.stats = OcrStats()  # time spent in tesseract in the last extraction
 
-    def extract_table(self, img: np.ndarray, bounding_box: list) -> None:
+    def extract_table(self, img: np.ndarray, bounding_box: list) -> Job:
         """
-        Run table extraction and return array of shape(rows, columns)
+        Queue table extraction in the background, the table of shape
+        (rows, columns, 2) is posted as "ocr_done" when it is finished
         """
+        stats = OcrStats()
+        return self.jobs.submit(
+            "Extract table",
+            lambda job: self.__extract(img, bounding_box, job, stats),
+            done=lambda table: self.__finish(table, stats),
+            kind="ocr",
+        )
 
-        def thread_work(bounding_box):
-            loading = LoadingPopup(
-                self.root,
-                title="Running OCR",
-                desc="Extracting table data, please wait",
-            )
-            bounding_box = self.__correct_bounding(bounding_box)
-            self.__image = img[
-                int(bounding_box[1]) : int(bounding_box[3] + bounding_box[1]),
-                int(bounding_box[0]) : int(bounding_box[2] + bounding_box[0]),
-            ]
-            processed_image, bounding_boxes = get_boxes(self.__image)
-
-            load_length = len(bounding_boxes)
-            load_i = 0
-
-            row = []
-            for i in bounding_boxes:
-                for j in i:
-                    if len(j) == 0:
-                        row.append(["", -2])
-                    else:
-                        col = []
-                        for k in j:
-                            y, x, w, h = (
-                                k[0],
-                                k[1],
-                                k[2],
-                                k[3],
-                            )
-                            cropped_img = processed_image[x : x + h, y : y + w]
-                            col = self.__run_tesseract(cropped_img)
-                        row.append(col)
-                loading.change_progress(load_i * 100 / load_length)
-                load_i += 1
-
-            arr = np.array(row)
-            loading.change_progress(100)
-            self.data.set(
-                value=arr.reshape(
-                    (len(bounding_boxes), len(bounding_boxes[0]), 2)
-                ).tolist()
+    def extract_batch(self, regions: List[tuple], load_page: Callable) -> Job:
+        """
+        Queue one job extracting every region, in form
+        ( drawing_id, page, ( x1, y1, x2, y2 ), rotation ) with the box as fractions
+        of the unrotated page. load_page(drawing_id, page) returns the page array,
+        it is called once per page from the worker thread
+        """
+        stats = OcrStats()
+        return self.jobs.submit(
+            f"Extract {len(regions)} tables",
+            lambda job: self.__extract_regions(regions, load_page, job, stats),
+            done=lambda table: self.__finish(table, stats),
+            kind="ocr",
+        )
+
+    def __extract(
+        self, img: np.ndarray, bounding_box: list, job: Job, stats: OcrStats
+    ) -> list:
+        bounding_box = self.__correct_bounding(bounding_box)
+        image = img[
+            int(bounding_box[1]) : int(bounding_box[3] + bounding_box[1]),
+            int(bounding_box[0]) : int(bounding_box[2] + bounding_box[0]),
+        ]
+        table = self.__read_table(image, job.progress, stats)
+        job.detail = stats.counts()
+        return table
+
+    def __extract_regions(
+        self, regions: List[tuple], load_page, job: Job, stats: OcrStats
+    ) -> list:
+        regions = sort_regions(regions)
+        tables, loaded, page = [], None, None
+        for n, (drawing_id, pg, box, rotation) in enumerate(regions):
+            if loaded != (drawing_id, pg):
+                loaded, page = (drawing_id, pg), load_page(drawing_id, pg)
+            if page is None:
+                continue  # the page couldn't be read
+            tables.append(
+                self.__read_table(
+                    crop_region(page, box, rotation),
+                    lambda p, n=n: job.progress((n + p / 100) * 100 / len(regions)),
+                    stats,
+                )
             )
+        job.detail = stats.counts()
+        return merge_tables(tables)
+
+    def __read_table(
+        self, image: np.ndarray, progress: Callable, stats: OcrStats
+    ) -> list:
+        """
+        OCR a table image, progress is called with the percent done each row. The
+        columns named by the header row are read with their profile below it
+        """
+        from .helper import text_height
+
+        templates = self.templates
+        matched = templates.match(image) if templates is not None else None
+        if matched is None:
+            from .helper import get_boxes
+
+            processed_image, bounding_boxes = get_boxes(image)
+        else:
+            processed_image, bounding_boxes = image, matched[1]
+        known_roles = matched[0].roles if matched is not None else []
+        # role of each column, from the template or once the header has been read
+        roles = known_roles if any(known_roles) else None
+
+        load_length = len(bounding_boxes)
+        load_i = 0
+
+        row = []
+        cells = []  # ( x center, text ) of the cells read, row by row
+        for i in bounding_boxes:
+            cells.append([])
+            height = text_height(_row_strip(processed_image, i))
+            for n, j in enumerate(i):
+                profile = DEFAULT
+                if roles is not None and n < len(roles):
+                    profile = profile_for(roles[n])
+                if len(j) == 0:
+                    row.append(["", -2])
+                else:
+                    col = []
+                    for k in j:
+                        y, x, w, h = (
+                            k[0],
+                            k[1],
+                            k[2],
+                            k[3],
+                        )
+                        cropped_img = processed_image[x : x + h, y : y + w]
+                        col = self.__read_cell(cropped_img, profile, height, stats)
+                        cells[-1].append((y + w / 2, col[0]))
+                    row.append(col)
+            if roles is None:
+                texts = [k[0] for k in row[len(row) - len(i) :]]
+                roles = _header_roles(texts, known_roles)
+            progress(load_i * 100 / load_length)
+            load_i += 1
+
+        if matched is None and templates is not None:
+            templates.learn(image, cells)
+
+        arr = np.array(row)
+        return arr.reshape((len(bounding_boxes), len(bounding_boxes[0]), 2)).tolist()
+
+    def __read_cell(
+        self, cell: np.ndarray, profile: str, height: float, stats: OcrStats
+    ) -> list:
+        """
+        [ text, conf ] of a cell whose characters are height pixels tall. The cell
+        is trimmed to its text, blank cells aren't read, the rest are read with the
+        text FAST_TEXT_HEIGHT tall and again RETRY_TEXT_HEIGHT tall with the retry
+        psm if the confidence is low, the more confident reading is kept
+        """
+        from .helper import has_ink, scale_cell, text_scale, trim_cell
 
-        ocr_thread = Thread(target=thread_work, args=[bounding_box])
-        ocr_thread.start()
+        cell = trim_cell(cell)
+        if not has_ink(cell):
+            stats.record(profile, 0.0, BLANK)
+            return ["", -2]
+        scale = text_scale(height, FAST_TEXT_HEIGHT)
+        res = self.__run_tesseract(scale_cell(cell, scale), stats, profile, FAST)
+        if float(res[1]) >= RETRY_CONF:
+            return res
+        scale *= RETRY_TEXT_HEIGHT / FAST_TEXT_HEIGHT
+        retry = self.__run_tesseract(scale_cell(cell, scale), stats, profile, RETRY)
+        return retry if float(retry[1]) > float(res[1]) else res
+
+    def __finish(self, table: list, stats: OcrStats) -> None:
+        self.data = table
+        self.stats = stats
+        if self.debug:
+            print(f"OCR time by profile \n{self.stats.summary()}")
+        self.bus.post("ocr_done", table)
 
     def __correct_bounding(self, box: list) -> list:
         x, y, x2, y2 = 0, 0, 0, 0
@@ -102,16 +228,20 @@ class TableExtractor:
 
         return box
 
-    def __run_tesseract(self, image: np.ndarray) -> list:
-        tesseract_config = """-c tessedit_char_whitelist=
-            "01234567890ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz.-/ '"
-            --psm 7 --oem 1"""
+    def __run_tesseract(
+        self, image: np.ndarray, stats: OcrStats, profile=DEFAULT, tier=FAST
+    ) -> list:
+        import pytesseract
+
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        start = perf_counter()
         out = pytesseract.image_to_data(
             image,
             lang="eng",
-            config=tesseract_config,
+            config=tesseract_config(profile, tier),
             output_type=pytesseract.Output.DICT,
         )
+        stats.record(profile, perf_counter() - start, tier)
         ind = np.where(np.array(out.get("conf")) != "-1")
         text = ""
         conf = 0
@@ -123,3 +253,62 @@ class TableExtractor:
         if text == "" and conf == 0:
             conf = -2  # this denotes a empty space predition
         return [text, conf]
+
+
+def _header_roles(texts: List[str], known: List[str]):
+    """
+    the role of each column if the texts of a row name enough of them to be the
+    header. Columns it doesn't name keep the role known from a template. None
+    otherwise
+    """
+    named = header_roles(texts)
+    if named is None:
+        return None
+    return [i or j for i, j in zip_longest(named, known, fillvalue="")]
+
+
+def _row_strip(image: np.ndarray, row: list) -> np.ndarray:
+    """the part of the image around every cell of a row of [[ x, y, w, h ]]"""
+    boxes = np.array([k for j in row for k in j]).reshape(-1, 4)
+    if len(boxes) == 0:
+        return image[:0, :0]
+    x1, y1 = boxes[:, :2].min(axis=0)
+    x2, y2 = (boxes[:, :2] + boxes[:, 2:]).max(axis=0)
+    return image[y1:y2, x1:x2]
+
+
+def sort_regions(regions: List[tuple]) -> List[tuple]:
+    """
+    regions in the order their tables are read: drawings in the order they first
+    appear, then by page, then top to bottom and left to right on the page
+    """
+    drawings = {}
+    for region in regions:
+        drawings.setdefault(region[0], len(drawings))
+    return sorted(regions, key=lambda i: (drawings[i[0]], i[1], i[2][1], i[2][0]))
+
+
+def crop_region(page: np.ndarray, box: tuple, rotation: int) -> np.ndarray:
+    """
+    Cut a box given as fractions of the unrotated page out of it and turn it the
+    way it was seen, rotation is counter clockwise quarter turns like np.rot90
+    """
+    height, width = page.shape[:2]
+    x1, y1, x2, y2 = (
+        int(round(box[0] * width)),
+        int(round(box[1] * height)),
+        int(round(box[2] * width)),
+        int(round(box[3] * height)),
+    )
+    return np.ascontiguousarray(np.rot90(page[y1:y2, x1:x2], rotation))
+
+
+def merge_tables(tables: List[list]) -> list:
+    """
+    Stack tables of shape (rows, columns, ( text, conf )) into one, tables with
+    fewer columns are padded on the right with empty cells
+    """
+    columns = max((len(row) for table in tables for row in table), default=0)
+    return [
+        row + [["", "-2"]] * (columns - len(row)) for table in tables for row in table
+    ]
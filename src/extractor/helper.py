@@ -4,7 +4,7 @@ The main purpose of this module is to extract the bounding boxes of the table so
 OCR class can use them to perform OCR on the images
 
 Functions:
-    + get_boxes                = uses all private functions to extract the table 
+    + get_boxes                = uses all private functions to extract the table
                                  structure from the image
     - correct_rotation         = rotates to make the table straight, will only work
                                  if mostly straight already
@@ -21,12 +21,40 @@ Functions:
     - get_center               = gets the center pixel height of each row
     - get_shape_cnt            = gets the number of columns
     - get_final_boxes          = get the final boxes in the correct format
+    + get_column               = finds the columns of an OCR'd table with a header
+                                 and returns the cells under them
+    + find_tables              = finds the boxes of the ruled tables on a whole page
+    - downsample               = shrinks a page a band at a time for finding tables
+    - group_cells              = joins the cells that touch into tables
+    + text_height              = the usual height of the characters in a row of cells
+    + text_scale               = the scale that gives text a target height
+    + trim_cell                = cuts off rule pieces and white margins of a cell
+    + has_ink                  = if a trimmed cell has anything in it to read
+    + scale_cell               = scales a trimmed cell and gives it a white margin
 
 """
 from typing import Any, List
 import numpy as np
 import cv2
 
+# longest side of a page when looking for tables, rules stay a pixel or more wide
+TABLE_SCAN_SIDE = 1600
+
+# a group of fewer ruled cells than this is a box or a note, not a table
+MIN_TABLE_CELLS = 4
+
+# a cell with fewer dark pixels than this is blank
+MIN_INK = 6
+
+# white margin put around a scaled cell, tesseract reads text off the edge badly
+CELL_PAD = 10
+
+# pieces of ink shorter than this many pixels are specks or punctuation, not letters
+MIN_CHAR_HEIGHT = 3
+
+# cells are never scaled by more or less than this, however odd the text looks
+MAX_TEXT_SCALE = 4
+
 
 def get_boxes(image: np.ndarray) -> tuple((Any, list)):
     """
@@ -90,15 +118,19 @@ def _get_inverted(image: np.ndarray) -> np.ndarray:
     return 255 - inverted_image
 
 
-def _get_vertical_lines(image: np.ndarray, inverted_image: np.ndarray) -> np.ndarray:
-    kernel_len = np.array(image).shape[1] // 25
+def _get_vertical_lines(
+    image: np.ndarray, inverted_image: np.ndarray, divisor=25
+) -> np.ndarray:
+    kernel_len = max(np.array(image).shape[1] // divisor, 1)
     ver_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, kernel_len))
     vertical_lines = cv2.erode(inverted_image, ver_kernel, iterations=3)
     return cv2.dilate(vertical_lines, ver_kernel, iterations=3)
 
 
-def _get_horizontal_lines(image: np.ndarray, inverted_image: np.ndarray) -> np.ndarray:
-    kernel_len = np.array(image).shape[1] // 10
+def _get_horizontal_lines(
+    image: np.ndarray, inverted_image: np.ndarray, divisor=10
+) -> np.ndarray:
+    kernel_len = max(np.array(image).shape[1] // divisor, 1)
     hor_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (kernel_len, 1))
     horizontal_lines = cv2.erode(inverted_image, hor_kernel, iterations=3)
     return cv2.dilate(horizontal_lines, hor_kernel, iterations=3)
@@ -203,3 +235,181 @@ def _get_final_boxes(rows: List) -> List:
             lis[indexing].append(j)
         final_boxes.append(lis)
     return final_boxes
+
+
+def get_column(data: List, header: str = "PART") -> List[tuple]:
+    """
+    Passed an OCR'd table of shape (rows, columns, ( text, conf )), finds the columns
+    that have a cell containing header and returns every other non blank cell in them
+    top to bottom as ( text, conf ). The whole table is searched at once with numpy
+    """
+    cells = np.array(data, dtype=str)
+    if cells.ndim != 3 or cells.size == 0:
+        return []
+    text = np.char.strip(cells[..., 0])
+    is_header = np.char.find(text, header) >= 0
+    res = []
+    for col in np.flatnonzero(is_header.any(axis=0)):
+        rows = np.flatnonzero((text[:, col] != "") & ~is_header[:, col])
+        res.extend(zip(text[rows, col].tolist(), cells[rows, col, 1].tolist()))
+    return res
+
+
+def find_tables(page, min_cells=MIN_TABLE_CELLS) -> List[tuple]:
+    """
+    Finds the ruled tables on a whole page, returns their boxes as
+    ( x1, y1, x2, y2 ) fractions of the page, top to bottom.
+    The page is shrunk and its long rules are found with the same line morphology
+    as get_boxes, only with kernels sized for a page. The spaces closed in by the
+    rules are cells, cells that touch are grouped and a group with enough cells is
+    a table. The drawing border and the drawing area are too big to be cells
+    """
+    image = _downsample(page, TABLE_SCAN_SIDE)
+    height, width = image.shape[:2]
+    invert = _get_inverted(image)
+    lines = cv2.bitwise_or(
+        _get_vertical_lines(image, invert, 150),
+        _get_horizontal_lines(image, invert, 60),
+    )
+    lines = cv2.dilate(lines, np.ones((3, 3), np.uint8))  # close gaps at corners
+    _, _, stats, _ = cv2.connectedComponentsWithStats(
+        cv2.bitwise_not(lines), connectivity=4
+    )
+    x, y, w, h, area = stats[1:].T
+    is_cell = (
+        (w >= 4)
+        & (h >= 4)
+        & (area < width * height // 20)
+        & (area >= 0.6 * w * h)  # closed in on all sides, so nearly a rectangle
+        & (x > 0)
+        & (y > 0)
+        & (x + w < width)
+        & (y + h < height)
+    )
+    cells = np.stack([x, y, x + w, y + h], axis=1)[is_cell]
+    return [
+        (x1 / width, y1 / height, x2 / width, y2 / height)
+        for x1, y1, x2, y2 in _group_cells(cells, (height, width), min_cells)
+    ]
+
+
+def _downsample(page, side: int) -> np.ndarray:
+    """
+    shrink a page so its longest side is at most side, huge pages are read and
+    shrunk a band of rows at a time so they are never all in memory
+    """
+    height, width = page.shape[:2]
+    scale = min(side / max(height, width), 1.0)
+    if scale == 1.0:
+        return np.asarray(page, dtype=np.uint8)
+    new_width = max(int(width * scale), 1)
+    band = 2048
+    res, done = [], 0
+    for top in range(0, height, band):
+        bottom = min(top + band, height)
+        rows = int(bottom * scale) - done
+        if rows <= 0:
+            continue
+        res.append(
+            cv2.resize(
+                np.asarray(page[top:bottom], dtype=np.uint8),
+                (new_width, rows),
+                interpolation=cv2.INTER_AREA,
+            )
+        )
+        done += rows
+    return np.vstack(res)
+
+
+def _group_cells(cells: np.ndarray, shape: tuple, min_cells: int) -> List[tuple]:
+    """
+    Passed cells as rows of ( x1, y1, x2, y2 ), paints them a little bigger so
+    neighbours across a rule touch, then returns the box of each group of at least
+    min_cells cells, top to bottom. The boxes take in the outer rules too, the cells
+    are found from the rules when the table is extracted
+    """
+    mask = np.zeros(shape, np.uint8)
+    for x1, y1, x2, y2 in cells.tolist():
+        cv2.rectangle(mask, (x1 - 3, y1 - 3), (x2 + 2, y2 + 2), 255, -1)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+    if count <= 1:
+        return []
+    centers = ((cells[:, 1] + cells[:, 3]) // 2, (cells[:, 0] + cells[:, 2]) // 2)
+    per_group = np.bincount(labels[centers], minlength=count)
+    res = []
+    for label in np.flatnonzero(per_group[1:] >= min_cells) + 1:
+        x, y, w, h, _ = stats[label]
+        res.append(
+            (
+                max(x - 2, 0),
+                max(y - 2, 0),
+                min(x + w + 2, shape[1]),
+                min(y + h + 2, shape[0]),
+            )
+        )
+    return sorted(res, key=lambda i: (i[1], i[0]))
+
+
+def text_height(strip: np.ndarray) -> float:
+    """
+    Median height of the characters in a row of cells, from the connected pieces
+    of ink in it. Rules run most of the height or width of the row and specks are
+    tiny, both are left out. 0 if there are no characters
+    """
+    dark = (np.asarray(strip) < 128).astype(np.uint8)
+    if dark.size == 0:
+        return 0.0
+    _, _, stats, _ = cv2.connectedComponentsWithStats(dark, connectivity=8)
+    widths, heights = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    chars = heights[
+        (heights >= MIN_CHAR_HEIGHT)
+        & (heights < 0.8 * dark.shape[0])
+        & (widths < 0.5 * dark.shape[1])
+    ]
+    return float(np.median(chars)) if len(chars) else 0.0
+
+
+def text_scale(height: float, target: float) -> float:
+    """the scale that makes text of height target tall, 1 if the height is unknown"""
+    if height <= 0:
+        return 1.0
+    return float(np.clip(target / height, 1 / MAX_TEXT_SCALE, MAX_TEXT_SCALE))
+
+
+def trim_cell(cell: np.ndarray) -> np.ndarray:
+    """
+    Cut off the rows and columns along the edges that are mostly dark, pieces of
+    the rules around the cell, then the white margins around what is left
+    """
+    dark = cell < 128
+    if dark.size == 0:
+        return cell
+    rows = np.flatnonzero(dark.mean(axis=1) < 0.5)
+    cols = np.flatnonzero(dark.mean(axis=0) < 0.5)
+    if len(rows) == 0 or len(cols) == 0:
+        return cell[:0, :0]
+    cell = cell[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+    dark = cell < 128
+    rows = np.flatnonzero(dark.any(axis=1))
+    cols = np.flatnonzero(dark.any(axis=0))
+    if len(rows) == 0:
+        return cell[:0, :0]
+    return cell[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+
+
+def has_ink(cell: np.ndarray) -> bool:
+    """if a trimmed cell has enough dark pixels to be read"""
+    return int(np.count_nonzero(cell < 128)) >= MIN_INK
+
+
+def scale_cell(cell: np.ndarray, scale: float) -> np.ndarray:
+    """a trimmed cell scaled and given a white margin of CELL_PAD"""
+    if scale != 1:
+        cell = cv2.resize(
+            cell,
+            (max(int(cell.shape[1] * scale), 1), max(int(cell.shape[0] * scale), 1)),
+            interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC,
+        )
+    return cv2.copyMakeBorder(
+        cell, CELL_PAD, CELL_PAD, CELL_PAD, CELL_PAD, cv2.BORDER_CONSTANT, value=255
+    )
@@ -0,0 +1,136 @@
+"""
+Tesseract settings for each kind of column of a table
+
+Every cell used to be read with one broad whitelist as a line of text. Once the
+header shows a column holds quantities or part numbers, a narrower whitelist and
+reading the cell as a single word is both faster and right more often.
+
+Cells are read in tiers. Blank cells aren't read at all, every other cell is read
+once scaled so its text is FAST_TEXT_HEIGHT pixels tall, and only the cells read
+with less than RETRY_CONF are read again with their text RETRY_TEXT_HEIGHT tall and
+the retry_psm of their profile.
+
+The profiles are the config of the extractor, like TESSERACT_CMD. The time spent
+in tesseract is added up for each profile and tier so they can be compared.
+
+Functions:
+    + profile_for            = the profile used for a column role
+    + tesseract_config       = the tesseract command line options of a profile
+"""
+from threading import Lock
+from typing import List
+
+DEFAULT = "default"
+
+# tiers of reading a cell
+BLANK = "blank"
+FAST = "fast"
+RETRY = "retry"
+
+# cells read with a lower confidence than this in the fast tier are read again
+RETRY_CONF = 75
+
+# pixels tall the characters of a cell are scaled to in the fast tier, smaller
+# crops are quicker to read and tesseract still reads text this size well
+FAST_TEXT_HEIGHT = 22
+
+# pixels tall the characters are scaled to when a cell is read again
+RETRY_TEXT_HEIGHT = 32
+
+# psm 7 reads the cell as one line, psm 8 as one word and psm 6 as a block. oem 1
+# is the LSTM engine, the only one in the tessdata that ships with the application
+PROFILES = {
+    DEFAULT: {
+        "whitelist": "01234567890ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        "abcdefghijklmnopqrstuvwxyz.-/ '",
+        "psm": 7,
+        "retry_psm": 6,
+        "oem": 1,
+    },
+    "PART": {
+        "whitelist": "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ.-/",
+        "psm": 8,
+        "retry_psm": 7,
+        "oem": 1,
+    },
+    "QTY": {"whitelist": "0123456789", "psm": 8, "retry_psm": 7, "oem": 1},
+    "DESCRIPTION": {
+        "whitelist": "01234567890ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        "abcdefghijklmnopqrstuvwxyz.,-/&#\"' ",
+        "psm": 7,
+        "retry_psm": 6,
+        "oem": 1,
+    },
+}
+
+
+def profile_for(role: str) -> str:
+    """the profile of a column role, columns without a profile use the default"""
+    return role if role in PROFILES else DEFAULT
+
+
+def tesseract_config(profile: str, tier=FAST) -> str:
+    """the options of a profile, the retry tier reads with its retry_psm"""
+    settings = PROFILES[profile]
+    whitelist = settings["whitelist"].replace('"', '\\"')
+    psm = settings["retry_psm"] if tier == RETRY else settings["psm"]
+    return (
+        f'-c tessedit_char_whitelist="{whitelist}" '
+        f'--psm {psm} --oem {settings["oem"]}'
+    )
+
+
+class OcrStats:
+    """
+    Time spent reading cells with each profile in each tier, added to from the
+    worker threads
+
+    Methods:
+        + record            = adds the time one cell took
+        + report            = ( profile, tier, cells, seconds, ms per cell ) of each
+                              profile and tier
+        + tiers             = how many cells each tier handled
+        + counts            = the cells each tier handled as text
+        + summary           = the report as text
+
+    Attributes:
+        - cells
+        - seconds
+        - lock
+    """
+
+    def __init__(self) -> None:
+        self.__cells = {}  # ( profile, tier ): cells read
+        self.__seconds = {}  # ( profile, tier ): seconds in tesseract
+        self.__lock = Lock()
+
+    def record(self, profile: str, seconds: float, tier=FAST) -> None:
+        key = (profile, tier)
+        with self.__lock:
+            self.__cells[key] = self.__cells.get(key, 0) + 1
+            self.__seconds[key] = self.__seconds.get(key, 0.0) + seconds
+
+    def report(self) -> List[tuple]:
+        with self.__lock:
+            return [
+                (*i, j, self.__seconds[i], 1000 * self.__seconds[i] / j)
+                for i, j in sorted(self.__cells.items())
+            ]
+
+    def tiers(self) -> dict:
+        res = {BLANK: 0, FAST: 0, RETRY: 0}
+        for _, tier, cells, _, _ in self.report():
+            res[tier] += cells
+        return res
+
+    def counts(self) -> str:
+        return ", ".join(f"{j} {i}" for i, j in self.tiers().items())
+
+    def summary(self) -> str:
+        lines = [
+            f"{profile:<12} {tier:<6} {cells:>6} cells {seconds:>8.2f}s "
+            f"{per:>7.1f}ms/cell"
+            for profile, tier, cells, seconds, per in self.report()
+        ]
+        lines.append(self.counts())
+        return "\n".join(lines)
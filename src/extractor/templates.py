@@ -0,0 +1,234 @@
+"""
+Table layouts that are reused across drawings of the same format
+
+The drawings come from a few title block and parts list formats, so most tables
+have a grid that has been seen before. get_boxes finds the grid again every time
+with morphology and contour sorting, which is the slow part of reading a table.
+
+A table with full length rules is reduced to a signature: the projection profile
+of its ink across the table gives where the vertical rules are, their centers are
+taken as fractions of the table width (the outer rules) and rounded, and the
+rounded positions are hashed. Only the columns are in the signature, the same
+parts list has as many rows as the drawing has parts. A layout is saved under its
+signature with the role of each column, read from the header. A region with a
+known signature is cut straight into its cells between its own rules.
+
+Functions:
+    + grid_rules             = where the rules of a table image are, from its
+                               projection profile
+    + signature              = hash of the rounded positions of the column rules
+    + grid_cells             = the cells between the rules in the get_boxes format
+    + role_of                = the column role a header names, if any
+    + header_roles           = the roles a row names if it is a header row
+    + column_roles           = the role of every column of a grid from its header
+    - centers                = the centers of rules as fractions of the box
+    - runs                   = the runs of True in a mask
+    - ink                    = the dark pixels of an image
+"""
+from hashlib import sha1
+import re
+from threading import Lock
+from typing import List
+import numpy as np
+
+# a row or column of pixels is a rule if this fraction of it is ink
+RULE_FILL = 0.5
+
+# rules closer than this many pixels are one rule, like a double line
+MIN_CELL = 4
+
+# rule positions are rounded to this many steps across the table box
+SIGNATURE_STEPS = 100
+
+# a row is the header if it names the role of this many columns, so a title like
+# "PARTS LIST" in one cell above the header isn't taken for it
+HEADER_ROLES = 2
+
+# words in a header naming the role of its column, a word of the header has to
+# start with one of them, the first that matches is used
+ROLES = {
+    "DESCRIPTION": ("DESC", "NAME", "TITLE"),
+    "QTY": ("QTY", "QUANT", "REQ"),
+    "PART": ("PART", "DWG", "P/N"),
+}
+
+
+class TableTemplate:
+    """
+    A known table layout
+
+    Attributes:
+        + signature
+        + cols              = the centers of the vertical rules, fractions of the box
+        + roles             = what each column holds, "" if it isn't known
+    """
+
+    def __init__(self, signature: str, cols: list, roles: List[str]):
+        self.signature = signature
+        self.cols = cols
+        self.roles = roles
+
+
+class TemplateStore:
+    """
+    The layouts saved in a data file, read the first time a table is matched
+
+    match and learn are called from the extraction jobs on the worker threads
+
+    Methods:
+        + match             = the layout and cells of a table image if it is known
+        + learn             = saves the layout of a table read with get_boxes
+        - loaded            = the layouts, read from the file the first time
+
+    Attributes:
+        + debug
+        - data_reader
+        - data_writer
+        - templates
+        - lock
+    """
+
+    def __init__(self, data_reader, data_writer, debug=False) -> None:
+        self.debug = debug
+        self.__data_reader = data_reader
+        self.__data_writer = data_writer
+        self.__templates = None  # signature: TableTemplate
+        self.__lock = Lock()
+
+    def match(self, image: np.ndarray):
+        """
+        ( template, cells ) when the columns of the image are a known layout, the
+        cells are cut between the rules of the image in the format of get_boxes.
+        None if it isn't known
+        """
+        cols, rows = grid_rules(image)
+        if len(cols) < 2 or len(rows) < 2:
+            return None
+        template = self.__loaded().get(signature(cols))
+        if template is None:
+            return None
+        return template, grid_cells(cols, rows)
+
+    def learn(self, image: np.ndarray, header: List[tuple]) -> None:
+        """
+        Save the layout of a table whose rules run its full width and height. header
+        is the cells that were read, row by row as ( x center, text ), the roles are
+        taken from the first row that names any
+        """
+        cols, rows = grid_rules(image)
+        if len(cols) < 3 or len(rows) < 2:
+            return  # a single column or a box isn't worth a template
+        sig = signature(cols)
+        templates = self.__loaded()
+        if sig in templates:
+            return
+        template = TableTemplate(sig, _centers(cols), column_roles(cols, header))
+        with self.__lock:
+            templates[sig] = template
+        self.__data_writer.insert_template(sig, template.cols, template.roles)
+
+    def __loaded(self) -> dict:
+        with self.__lock:
+            if self.__templates is None:
+                self.__templates = {
+                    i[0]: TableTemplate(*i) for i in self.__data_reader.get_templates()
+                }
+            return self.__templates
+
+
+def grid_rules(image: np.ndarray) -> tuple:
+    """
+    ( cols, rows ) of a table image, each rule ( start, end ) in pixels. A rule is
+    a run of columns or rows of pixels that are mostly ink
+    """
+    dark = _ink(image)
+    if dark.ndim != 2 or dark.size == 0:
+        return [], []
+    cols = _runs(dark.mean(axis=0) >= RULE_FILL)
+    rows = _runs(dark.mean(axis=1) >= RULE_FILL)
+    return cols, rows
+
+
+def signature(cols: List[tuple]) -> str:
+    """
+    hash of the column rule centers as fractions of the width between the outer
+    rules, so the same layout at any size, with any margin and any number of rows
+    has the same signature
+    """
+    steps = np.round(np.array(_centers(cols)) * SIGNATURE_STEPS).astype(int).tolist()
+    return sha1(repr(steps).encode()).hexdigest()[:16]
+
+
+def grid_cells(cols: List[tuple], rows: List[tuple]) -> List:
+    """
+    the cells between the rules as rows of columns of [[ x, y, w, h ]], like
+    get_boxes returns them, the rules themselves are left out
+    """
+    return [
+        [
+            [[x1, y1, x2 - x1, y2 - y1]]
+            for x1, x2 in zip([i[1] for i in cols[:-1]], [i[0] for i in cols[1:]])
+        ]
+        for y1, y2 in zip([i[1] for i in rows[:-1]], [i[0] for i in rows[1:]])
+    ]
+
+
+def role_of(text: str) -> str:
+    """the role a header cell names, "" if it names none"""
+    words = re.findall(r"[A-Z/]+", text.upper())
+    for role, names in ROLES.items():
+        if any(i.startswith(j) for i in words for j in names):
+            return role
+    return ""
+
+
+def header_roles(texts: List[str]):
+    """the role of each cell of a row if it names HEADER_ROLES columns, else None"""
+    named = [role_of(i) for i in texts]
+    if sum(1 for i in named if i) < HEADER_ROLES:
+        return None
+    return named
+
+
+def column_roles(cols: List[tuple], header: List[tuple]) -> List[str]:
+    """
+    the role of each column between the rules, from the cells ( x center, text )
+    of the first row of the header that names any role. header is row by row
+    """
+    roles = [""] * (len(cols) - 1)
+    starts = [i[1] for i in cols[:-1]]
+    for row in header:
+        named = header_roles([text for _, text in row])
+        if named is None:
+            continue
+        for (x, _), role in zip(row, named):
+            col = int(np.searchsorted(starts, x)) - 1
+            if role and 0 <= col < len(roles) and not roles[col]:
+                roles[col] = role
+        break
+    return roles
+
+
+def _centers(rules: List[tuple]) -> List[float]:
+    centers = np.array(rules).mean(axis=1)
+    return ((centers - centers[0]) / max(centers[-1] - centers[0], 1)).tolist()
+
+
+def _runs(mask: np.ndarray) -> List[tuple]:
+    """( start, end ) of each run of True, runs closer than MIN_CELL are joined"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    res = []
+    for start, end in edges.reshape(-1, 2).tolist():
+        if res and start - res[-1][1] < MIN_CELL:
+            res[-1] = (res[-1][0], end)
+        else:
+            res.append((start, end))
+    return res
+
+
+def _ink(image: np.ndarray) -> np.ndarray:
+    """dark pixels, bilevel pages are True where they are white"""
+    image = np.asarray(image)
+    if image.dtype == bool:
+        return ~image
+    return image < 128
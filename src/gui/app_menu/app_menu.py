@@ -20,6 +20,8 @@ class AppMenu(Menu):
         - make_help_menu            =
         - save_exit_app             =
         - exit_app                  =
+        - export_file               =
+        - toggle_task_panel         =
         + placeholder_command       =
 
     Attributes:
@@ -61,7 +63,7 @@ class AppMenu(Menu):
         self.file.add_command(
             label="Save Project", command=self.__save_file, accelerator="Ctrl+S"
         )
-        self.file.add_command(label="Export to xlsx", command=self.placeholder_command)
+        self.file.add_command(label="Export to xlsx", command=self.__export_file)
         self.file.add_separator()
         self.file.add_command(label="Preferences", command=self.placeholder_command)
         self.file.add_separator()
@@ -120,6 +122,8 @@ class AppMenu(Menu):
         # Add Commands
         self.view.add_command(label="Zoom", command=self.placeholder_command)
         self.view.add_command(label="Adjust Windows", command=self.placeholder_command)
+        self.view.add_separator()
+        self.view.add_command(label="Task Panel", command=self.__toggle_task_panel)
 
         # Add Key Bindings
 
@@ -154,6 +158,12 @@ class AppMenu(Menu):
     def __save_file(self, *_):
         self.__gui.save_file()
 
+    def __export_file(self):
+        self.__gui.export_file()
+
+    def __toggle_task_panel(self):
+        self.__gui.toggle_task_panel()
+
     def __open_file(self, *_):
         self.__gui.open_file()
 
@@ -0,0 +1,86 @@
+"""
+This module passes events between the parts of the ui, always on the tk thread
+"""
+from threading import Lock
+from typing import Callable
+
+# ms between sending the events that were posted, one frame at 60fps
+FRAME_MS = 16
+
+
+class EventBus:
+    """
+    Thread safe publish / subscribe, handlers are always called on the tk thread
+
+    Methods:
+        + subscribe                 = calls handler with the args of every event of a topic
+        + unsubscribe               = stops calling a handler
+        + post                      = queues an event from any thread, never waits
+        + pump                      = sends every event posted so far to its handlers
+        + close                     = stops emptying the bus
+        - run                       = pumps once a frame with after()
+
+    Attributes:
+        + debug
+        - root
+        - handlers
+        - events
+        - coalesced
+        - lock
+        - after_id
+    """
+
+    def __init__(self, root, debug=False) -> None:
+        self.debug = debug
+        self.__root = root
+        self.__handlers = {}  # topic: [handler]
+        self.__events = []  # [topic, args] in the order they were posted
+        self.__coalesced = {}  # topic: its waiting event in events
+        self.__lock = Lock()
+        self.__after_id = self.__root.after(FRAME_MS, self.__run)
+
+    def subscribe(self, topic: str, handler: Callable) -> None:
+        """handler(*args) is called on the tk thread for each event of topic"""
+        self.__handlers.setdefault(topic, []).append(handler)
+
+    def unsubscribe(self, topic: str, handler: Callable) -> None:
+        if handler in self.__handlers.get(topic, []):
+            self.__handlers[topic].remove(handler)
+
+    def post(self, topic: str, *args, coalesce=False) -> None:
+        """
+        Queue an event, it is sent on the next frame. With coalesce an event of the
+        same topic that hasn't been sent yet is replaced, keeping its place in line
+        """
+        with self.__lock:
+            event = self.__coalesced.get(topic) if coalesce else None
+            if event is not None:
+                event[1] = args
+                return
+            event = [topic, args]
+            self.__events.append(event)
+            if coalesce:
+                self.__coalesced[topic] = event
+
+    def pump(self) -> None:
+        """send every event posted so far, must be called from the tk thread"""
+        with self.__lock:
+            events, self.__events, self.__coalesced = self.__events, [], {}
+        for topic, args in events:
+            for handler in list(self.__handlers.get(topic, [])):
+                try:
+                    handler(*args)
+                except Exception as e:  # one handler can't stop the others
+                    if self.debug:
+                        print(f"error in EventBus - pump {topic} \n {e}")
+
+    def close(self) -> None:
+        """stop emptying the bus and let go of the handlers"""
+        self.__handlers = {}
+        if self.__after_id is not None:
+            self.__root.after_cancel(self.__after_id)
+            self.__after_id = None
+
+    def __run(self) -> None:
+        self.pump()
+        self.__after_id = self.__root.after(FRAME_MS, self.__run)
@@ -0,0 +1,238 @@
+"""
+This module runs the long jobs of the application on a pool of background threads
+"""
+from heapq import heappop, heappush, heapify
+from itertools import count
+from threading import Condition, Thread
+from typing import Callable, List
+from weakref import ref
+
+from gui.components.event_bus.event_bus import EventBus
+
+# jobs that run at the same time, the rest wait in the queue
+MAX_WORKERS = 2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """raised inside a job that was cancelled, the next time it reports progress"""
+
+
+class Job:
+    """
+    One background job and where it is at
+
+    Methods:
+        + progress                  = sets the percent done, raises JobCancelled if the
+                                      job was cancelled
+        + finished                  = if the job has stopped for any reason
+        + run                       = does the work of the job, on a worker thread
+        + call_done                 = hands the result to done, on the tk thread
+
+    Attributes:
+        + job_id
+        + title
+        + kind
+        + priority
+        + state
+        + percent
+        + result
+        + error
+        + detail
+        + cancelled
+        - work
+        - done
+        - changed
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        title: str,
+        work: Callable,
+        done: Callable,
+        priority: int,
+        kind: str,
+        changed: Callable,
+    ) -> None:
+        self.job_id = job_id
+        self.title = title
+        self.kind = kind
+        self.priority = priority
+        self.state = QUEUED
+        self.percent = 0
+        self.result = None
+        self.error = ""
+        self.detail = ""  # how the job went, set by the job and shown in the task panel
+        self.cancelled = False
+        self.__work = work
+        self.__done = done
+        self.__changed = changed
+
+    def progress(self, percent) -> None:
+        """called by the job as it works, from its worker thread"""
+        if self.cancelled:
+            raise JobCancelled(self.title)
+        if int(percent) != int(self.percent):
+            self.percent = percent
+            self.__changed()
+
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED, CANCELLED)
+
+    def run(self):
+        return self.__work(self)
+
+    def call_done(self) -> None:
+        if self.__done is not None:
+            self.__done(self.result)
+
+
+class JobManager:
+    """
+    Bounded pool of worker threads running prioritized, cancellable jobs
+
+    Methods:
+        + submit                    = queues work(job) to run in the background
+        + cancel                    = stops a job, queued jobs never start
+        + set_priority              = changes the priority of a queued job
+        + jobs                      = every job, running then queued then finished
+        + clear_finished            = forgets the jobs that are finished
+        + close                     = stops the workers once the running jobs are done
+        - changed                   = posts that the jobs changed
+        - post                      = posts to the bus if it is still open
+        - work                      = worker thread, runs the next job in the queue
+        - finish                    = calls done of a finished job on the tk thread
+
+    Attributes:
+        + debug
+        + max_workers
+        - bus
+        - jobs
+        - queue
+        - workers
+        - ids
+        - order
+        - closed
+        - condition
+    """
+
+    def __init__(self, bus: EventBus, max_workers=MAX_WORKERS, debug=False) -> None:
+        self.debug = debug
+        self.max_workers = max_workers
+        # held weakly, the tk interpreter behind the bus mustn't be freed on a worker
+        self.__bus = ref(bus)
+        self.__jobs = {}  # job_id: job, in the order they were submitted
+        self.__queue = []  # heap of ( -priority, order, job ) waiting for a worker
+        self.__workers = []
+        self.__ids = count(1)
+        self.__order = count()
+        self.__closed = False
+        self.__condition = Condition()
+        bus.subscribe("job_finished", self.__finish)
+
+    def submit(self, title: str, work: Callable, done=None, priority=0, kind="") -> Job:
+        """
+        Queue work(job) to run on a worker thread, jobs with a higher priority run
+        first. done(result) is called on the tk thread if the job finishes
+        """
+        job = Job(next(self.__ids), title, work, done, priority, kind, self.__changed)
+        with self.__condition:
+            self.__jobs[job.job_id] = job
+            heappush(self.__queue, (-priority, next(self.__order), job))
+            if len(self.__workers) < self.max_workers:
+                worker = Thread(target=self.__work, daemon=True)
+                self.__workers.append(worker)
+                worker.start()
+            self.__condition.notify()
+        self.__changed()
+        return job
+
+    def cancel(self, job_id: int) -> None:
+        """a queued job is dropped, a running job stops the next time it reports"""
+        with self.__condition:
+            job = self.__jobs.get(job_id)
+            if job is None or job.finished():
+                return
+            job.cancelled = True
+            if job.state == QUEUED:
+                job.state = CANCELLED
+                self.__queue = [i for i in self.__queue if i[2] is not job]
+                heapify(self.__queue)
+        self.__changed()
+
+    def set_priority(self, job_id: int, priority: int) -> None:
+        with self.__condition:
+            job = self.__jobs.get(job_id)
+            if job is None or job.state != QUEUED:
+                return
+            job.priority = priority
+            self.__queue = [(-i[2].priority, i[1], i[2]) for i in self.__queue]
+            heapify(self.__queue)
+        self.__changed()
+
+    def jobs(self) -> List[Job]:
+        """running jobs, then queued jobs in the order they will run, then the rest"""
+        with self.__condition:
+            running = [i for i in self.__jobs.values() if i.state == RUNNING]
+            queued = [i[2] for i in sorted(self.__queue)]
+            finished = [i for i in self.__jobs.values() if i.finished()]
+        return running + queued + finished
+
+    def clear_finished(self) -> None:
+        with self.__condition:
+            self.__jobs = {k: v for k, v in self.__jobs.items() if not v.finished()}
+        self.__changed()
+
+    def close(self) -> None:
+        """queued jobs are cancelled, running jobs are left to finish"""
+        bus = self.__bus()
+        if bus is not None:
+            bus.unsubscribe("job_finished", self.__finish)
+        with self.__condition:
+            self.__closed = True
+            for _, _, job in self.__queue:
+                job.cancelled = True
+                job.state = CANCELLED
+            self.__queue = []
+            self.__condition.notify_all()
+
+    def __changed(self) -> None:
+        self.__post("jobs", coalesce=True)
+
+    def __post(self, topic: str, *args, coalesce=False) -> None:
+        bus = self.__bus()
+        if bus is not None:
+            bus.post(topic, *args, coalesce=coalesce)
+
+    def __work(self) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: self.__queue or self.__closed)
+                if self.__closed:
+                    return
+                job = heappop(self.__queue)[2]
+                job.state = RUNNING
+            self.__changed()
+            try:
+                job.result = job.run()
+                job.state = DONE
+                job.percent = 100
+            except JobCancelled:
+                job.state = CANCELLED
+            except Exception as e:  # the worker has to keep running
+                job.state = FAILED
+                job.error = str(e)
+                if self.debug:
+                    print(f"error in JobManager - work {job.title} \n {e}")
+            self.__post("job_finished", job)
+            self.__changed()
+
+    def __finish(self, job: Job) -> None:
+        if job.state == DONE:
+            job.call_done()
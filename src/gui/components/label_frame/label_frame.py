@@ -15,7 +15,7 @@ class LabelFrame(Frame):
     Methods:
         + make_label          = creates label for label type
         + make_viewport       = creates all components for viewport type
-        - refresh_pg          = refreshes the viewport page
+        + set_pages           = shows the page number and page count of the viewport
         - refresh_label       = refreshed the label text
 
     Attributes:
@@ -40,8 +40,6 @@ class LabelFrame(Frame):
         self.label_text.trace_add("write", self.__refresh_label)
 
         if viewport:
-            self.master.cur_pg.trace_add("write", self.__refresh_pg)
-            self.master.total_pg.trace_add("write", self.__refresh_pg)
             self.make_viewport_label()
         else:
             self.make_label()
@@ -70,7 +68,7 @@ class LabelFrame(Frame):
         )
         self.pg = Label(
             self,
-            text=f"Pg. {self.master.cur_pg.get()} of {self.master.total_pg.get()}",
+            text="Pg. 1 of 1",
             bg=self.__label_bg,
             fg=self.__label_fg,
         )
@@ -98,11 +96,9 @@ class LabelFrame(Frame):
         self.pg.grid(row=1, column=1, pady=(0, 10))
         self.prev_btn.grid(row=0, column=0, rowspan=2)
 
-    def __refresh_pg(self, *_):
+    def set_pages(self, cur_pg: int, total_pg: int):
         self.pg.grid_forget()
-        self.pg.configure(
-            text=f"Pg. {self.master.cur_pg.get()} of {self.master.total_pg.get()}"
-        )
+        self.pg.configure(text=f"Pg. {cur_pg} of {total_pg}")
         self.pg.grid(row=1, column=1, pady=(0, 10))
 
     def __refresh_label(self, *_):
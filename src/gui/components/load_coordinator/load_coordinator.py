@@ -0,0 +1,143 @@
+"""
+This module loads data for the ui in the background, keeping only the latest request
+"""
+from queue import Empty, SimpleQueue
+from threading import Condition, Thread
+from typing import Callable
+
+# ms between checks for finished loads while there are loads going
+POLL_MS = 15
+
+
+class LoadCoordinator:
+    """
+    Debounced, cancellable background loads that render on the tk thread
+
+    Methods:
+        + request                   = load in the background after delay ms, then render
+        + cancel                    = drop any request for a key that hasn't rendered
+        + is_current                = if a request is still the newest for its key
+        + close                     = stops the workers and the polling
+        - start                     = hands a debounced request to the worker of its key
+        - work                      = worker thread, runs the newest load of a key
+        - poll                      = renders finished loads if nothing newer came in
+
+    Attributes:
+        + debug
+        + delay
+        - root
+        - generation
+        - timers
+        - latest
+        - workers
+        - finished
+        - loading
+        - poll_id
+        - closed
+        - condition
+    """
+
+    def __init__(self, root, delay=120, debug=False) -> None:
+        self.debug = debug
+        self.delay = delay
+        self.__root = root
+        self.__generation = {}  # key: number of the newest request
+        self.__timers = {}  # key: after id of the request being debounced
+        self.__latest = {}  # key: ( generation, load, render ) waiting for its worker
+        self.__workers = {}
+        self.__finished = SimpleQueue()  # ( key, generation, render, result )
+        self.__loading = 0  # requests handed to workers that haven't come back
+        self.__poll_id = None
+        self.__closed = False
+        self.__condition = Condition()
+
+    def request(self, key: str, load: Callable, render: Callable) -> int:
+        """
+        Call load in a worker thread once requests for key stop for delay ms, then
+        render(result) on the tk thread if this is still the newest request.
+        Must be called from the tk thread, returns the generation of the request
+        """
+        generation = self.__generation.get(key, 0) + 1
+        self.__generation[key] = generation
+        if key in self.__timers:
+            self.__root.after_cancel(self.__timers.pop(key))
+        self.__timers[key] = self.__root.after(
+            self.delay, self.__start, key, generation, load, render
+        )
+        return generation
+
+    def cancel(self, key: str) -> None:
+        """the last request for key won't render, if it is loading it still finishes"""
+        self.__generation[key] = self.__generation.get(key, 0) + 1
+        if key in self.__timers:
+            self.__root.after_cancel(self.__timers.pop(key))
+
+    def is_current(self, key: str, generation: int) -> bool:
+        return self.__generation.get(key) == generation
+
+    def close(self, timeout=1) -> None:
+        """
+        Drop the requests that haven't rendered and stop the workers, waiting up to
+        timeout seconds for each one in a load. Must be called from the tk thread
+        """
+        for key in list(self.__timers):
+            self.cancel(key)
+        if self.__poll_id is not None:
+            self.__root.after_cancel(self.__poll_id)
+            self.__poll_id = None
+        with self.__condition:
+            self.__closed = True
+            self.__latest.clear()
+            self.__condition.notify_all()
+        for worker in self.__workers.values():
+            worker.join(timeout)
+        self.__workers.clear()
+
+    def __start(self, key: str, generation: int, load: Callable, render: Callable):
+        self.__timers.pop(key, None)
+        with self.__condition:
+            replaced = key in self.__latest  # the worker never picked the older one up
+            self.__latest[key] = (generation, load, render)
+            if key not in self.__workers:
+                worker = Thread(target=self.__work, args=(key,), daemon=True)
+                self.__workers[key] = worker
+                worker.start()
+            self.__condition.notify_all()
+        if not replaced:
+            self.__loading += 1
+            if self.__loading == 1:
+                self.__poll_id = self.__root.after(POLL_MS, self.__poll)
+
+    def __work(self, key: str) -> None:
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(lambda: key in self.__latest or self.__closed)
+                if self.__closed:
+                    return
+                generation, load, render = self.__latest.pop(key)
+            result = None
+            if self.is_current(key, generation):
+                try:
+                    result = load()
+                except Exception as e:  # the worker has to keep running
+                    generation = None
+                    if self.debug:
+                        print(f"error in LoadCoordinator - work \n {e}")
+            self.__finished.put((key, generation, render, result))
+
+    def __poll(self) -> None:
+        self.__poll_id = None
+        while True:
+            try:
+                key, generation, render, result = self.__finished.get_nowait()
+            except Empty:
+                break
+            self.__loading -= 1
+            if self.is_current(key, generation):
+                try:
+                    render(result)
+                except Exception as e:  # polling has to go on for the next loads
+                    if self.debug:
+                        print(f"error in LoadCoordinator - poll {key} \n {e}")
+        if self.__loading:
+            self.__poll_id = self.__root.after(POLL_MS, self.__poll)
@@ -1,5 +1,8 @@
 """
 This module is a popup window which displays a loading bar
+
+It doesn't grab the app, long work in the background is shown in the task panel
+instead, this is only for short work done on the tk thread
 """
 from tkinter import Label, Toplevel
 from tkinter.ttk import Progressbar
@@ -27,7 +30,6 @@ class LoadingPopup(Toplevel):
         text_color="white",
     ):
         Toplevel.__init__(self, master)
-        self.grab_set()
         self.__master = master
         self.title(title)
         x = int(master.winfo_screenwidth() / 2 - 125)
@@ -43,9 +45,8 @@ class LoadingPopup(Toplevel):
         self.__master.update_idletasks()
 
     def change_progress(self, percent):
-        """give the progress bar a percentage complete to show"""
+        """give the progress bar a percentage complete to show, only on the tk thread"""
         self.__progress["value"] = percent
         self.__master.update_idletasks()
         if percent == 100:
-            self.grab_release()
             self.destroy()
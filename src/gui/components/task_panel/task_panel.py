@@ -0,0 +1,106 @@
+"""
+This module is the panel listing the background jobs
+
+It is docked along the bottom of the window and can be hidden from the View menu.
+It redraws whenever the job manager posts that the jobs changed.
+"""
+from tkinter import Button, Frame
+from tkinter.ttk import Treeview
+from gui.components.event_bus.event_bus import EventBus
+from gui.components.job_manager.job_manager import JobManager
+from gui.components.label_frame.label_frame import LabelFrame
+
+
+class TaskPanel(Frame):
+    """
+    Running, queued and finished imports, extractions and exports
+
+    Methods:
+        + refresh              = redraws the list of jobs
+        - selected             = ids of the jobs selected in the list
+        - cancel               = cancels the selected jobs
+        - raise_priority       = moves the selected queued jobs up the queue
+        - lower_priority       = moves the selected queued jobs down the queue
+        - move                 = changes the priority of the selected jobs by step
+        - clear                = removes the finished jobs from the list
+
+    Attributes:
+        + debug
+        - jobs
+        - label_frame
+        - job_list
+    """
+
+    def __init__(self, master, jobs: JobManager, bus: EventBus, debug=False):
+        self.debug = debug
+        Frame.__init__(self, master)
+        self.__jobs = jobs
+
+        # Define Frames
+        self.__label_frame = LabelFrame(self, "Tasks")
+        button_frame = Frame(self)
+        self.__job_list = Treeview(
+            self,
+            columns=("state", "progress", "detail"),
+            height=4,
+            selectmode="extended",
+        )
+        self.__job_list.heading("#0", text="Task")
+        self.__job_list.heading("state", text="State")
+        self.__job_list.heading("progress", text="Progress")
+        self.__job_list.heading("detail", text="Details")
+        self.__job_list.column("state", width=90, stretch=False)
+        self.__job_list.column("progress", width=70, stretch=False, anchor="e")
+
+        # Define Elements
+        for text, command in [
+            ("Cancel", self.__cancel),
+            ("Move Up", self.__raise_priority),
+            ("Move Down", self.__lower_priority),
+            ("Clear Finished", self.__clear),
+        ]:
+            Button(button_frame, text=text, command=command).pack(side="left")
+
+        # Pack Frames
+        self.__label_frame.pack(side="top", fill="x")
+        button_frame.pack(side="bottom", fill="x")
+        self.__job_list.pack(side="top", fill="both", expand=True)
+
+        bus.subscribe("jobs", self.refresh)
+
+    def refresh(self):
+        """show every job, the selection is kept for the jobs still listed"""
+        selected = set(self.__job_list.selection())
+        self.__job_list.delete(*self.__job_list.get_children(""))
+        for job in self.__jobs.jobs():
+            iid = str(job.job_id)
+            self.__job_list.insert(
+                "",
+                "end",
+                iid=iid,
+                text=job.title,
+                values=(job.state, f"{int(job.percent)}%", job.detail or job.error),
+            )
+            if iid in selected:
+                self.__job_list.selection_add(iid)
+
+    def __selected(self) -> list:
+        return [int(i) for i in self.__job_list.selection()]
+
+    def __cancel(self):
+        for job_id in self.__selected():
+            self.__jobs.cancel(job_id)
+
+    def __raise_priority(self):
+        self.__move(1)
+
+    def __lower_priority(self):
+        self.__move(-1)
+
+    def __move(self, step: int):
+        priorities = {i.job_id: i.priority for i in self.__jobs.jobs()}
+        for job_id in self.__selected():
+            self.__jobs.set_priority(job_id, priorities[job_id] + step)
+
+    def __clear(self):
+        self.__jobs.clear_finished()
@@ -1,17 +1,27 @@
 """
 This module in the main entry point for the drawing tree application
 """
+import os
 from tkinter import Button, PhotoImage, Tk, Frame, Label
 from tkinter.filedialog import askopenfilename, asksaveasfilename
+from tkinter.messagebox import showerror
 from tkinter.ttk import PanedWindow, Style
 from random import randint
-from PIL import ImageTk
+from PIL import Image
 from h5py import File
-import cv2
+import numpy as np
 
 from data_manager.data_manager import DataWriter, DataReader
+from data_manager import exporter
+from data_manager.page_cache import PageCache
+from data_manager.write_queue import WriteQueue
+from gui.components.event_bus.event_bus import EventBus
+from gui.components.job_manager.job_manager import JobCancelled, JobManager
+from gui.components.load_coordinator.load_coordinator import LoadCoordinator
 from gui.components.loading_popup.loading_popup import LoadingPopup
+from gui.components.task_panel.task_panel import TaskPanel
 from extractor.extractor import TableExtractor
+from extractor.templates import TemplateStore
 from .treeview.treeview import DrawingTreeview
 from .viewport.viewport import DrawingViewport
 from .table.table import DrawingTable
@@ -31,7 +41,10 @@ class GUI:
     Methods:
         + run                       = runs application with no starter file given
         + run_file                  = runs application with file given from command line
-        + save_file                 = saves the current tree and table
+        + save_file                 = saves what changed in the tree, table and search index
+        + export_file               = exports every part and its table data to xlsx or csv
+        + toggle_task_panel         = shows or hides the panel of background jobs
+        - export_to                 = exports to path once the tree is all read in
         - on_closing                = makes sure the application exits correctly
         - initialize_dashboard      = creates the main application dashboard and all widgets
         - render_dashboard          = pulls data from treeview and updates the table and viewport
@@ -39,6 +52,14 @@ class GUI:
         - render_entry              = renders the application entry if no file given,
                                       asks user to open or create a file
         - set_style                 = sets the application style and styles the paned window view
+        - read_gray                 = reads an image file as a grayscale array
+        - write_drawings            = adds the pages of a pdf to a part in the background
+        - on_pages_added            = shows the pages once a pdf is added
+        - find_tables               = finds the tables on the pages of a drawing
+        - on_page_rewritten         = reloads a page once its rotation is saved to it
+        - add_ocr_items             = adds the parts of an OCR'd table to the tree
+        - on_write_failed           = tells the user table edits couldn't be saved
+        - save_search_index         = saves the search index if it matches the file
 
     Attributes:
         + debug
@@ -48,8 +69,14 @@ class GUI:
         + filename
         - loading
         - entry_frame
+        - bus
+        - jobs
+        - task_panel
+        - extractor
         - data_reader
         - data_writer
+        - write_queue
+        - loader
         - main_pw
         - tree_pane
         - drawing_pane
@@ -87,10 +114,24 @@ class GUI:
         self.__entry_frame = Frame(self.root, bg="black")
 
         # Define Variables
-        self.__extractor = TableExtractor(self.root)
-        self.__extractor.data.trace_add("write", self.__add_ocr_items)
+        self.__bus = EventBus(self.root, debug=self.debug)
+        self.__bus.subscribe("cur_item", self.__refresh_table)
+        self.__bus.subscribe("cur_drawing", self.__refresh_viewport)
+        self.__bus.subscribe("added_drawing", self.__write_drawings)
+        self.__bus.subscribe("page_rewritten", self.__on_page_rewritten)
+        self.__bus.subscribe("ocr_done", self.__add_ocr_items)
+        self.__bus.subscribe("write_failed", self.__on_write_failed)
+        self.__jobs = JobManager(self.__bus, debug=self.debug)
+        self.__task_panel = TaskPanel(
+            self.root, self.__jobs, self.__bus, debug=self.debug
+        )
+        # packed once, the dashboard packs after it so the panel keeps the bottom
+        self.__task_panel.pack(side="bottom", fill="x")
+        self.__extractor = TableExtractor(self.__bus, self.__jobs, debug=self.debug)
         self.__data_writer = None
         self.__data_reader = None
+        self.__write_queue = None
+        self.__loader = None
         self.__main_pw = None
         self.__tree_pane = None
         self.__drawing_pane = None
@@ -98,7 +139,7 @@ class GUI:
         self.__drawing_browser = None
         self.__drawing_viewport = None
         self.__drawing_table = None
-        self.drawing_img = cv2.imread(r"data\images\new_img.png", 0)
+        self.drawing_img = self.__read_gray(r"data\images\new_img.png")
         self.part_info = None
         self.filename = None
 
@@ -123,8 +164,50 @@ class GUI:
         self.__data_writer.save_drawings(tree_data, tree_deleted)
         loading.change_progress(randint(50, 90))
         self.__drawing_table.save_data()
+        self.__save_search_index()
         loading.change_progress(100)
 
+    def export_file(self):
+        """
+        save, then export the parts to a file as a background job, the tree is
+        copied first so the export doesn't read the model while it is being edited
+        """
+        path = asksaveasfilename(
+            title="Export Parts",
+            defaultextension=".xlsx",
+            filetypes=[("Excel file", ".xlsx"), ("CSV file", ".csv")],
+            initialfile=self.filename.split("/")[-1].rsplit(".", 1)[0],
+        )
+        if path == "":
+            return
+        self.__export_to(path)
+
+    def __export_to(self, path: str):
+        if self.__drawing_browser.streaming:
+            # only export once the whole tree is read in
+            self.root.after(100, self.__export_to, path)
+            return
+        self.save_file()
+        outline = self.__drawing_browser.get_outline()
+        data_reader = self.__data_reader
+        written = exporter.export_path(path)
+
+        def work(job):
+            try:
+                return exporter.export(data_reader, outline, path, job.progress)
+            except JobCancelled:
+                if os.path.exists(written):
+                    os.remove(written)  # don't leave half a file behind
+                raise
+
+        self.__jobs.submit(f"Export {os.path.basename(path)}", work, kind="export")
+
+    def toggle_task_panel(self):
+        if self.__task_panel.winfo_ismapped():
+            self.__task_panel.pack_forget()
+        else:
+            self.__task_panel.pack(side="bottom", fill="x", before=self.__main_pw)
+
     def open_file(self):
         """open file when there is already one open"""
         self.save_file()
@@ -148,14 +231,38 @@ class GUI:
         self.__drawing_table.pack_forget()
 
     def __on_closing(self):
-        """exit app cleanly"""
+        """exit app cleanly, table edits that are still queued are written first"""
+        if self.__write_queue:
+            self.__drawing_table.save_data()
+            self.__save_search_index()
+            self.__write_queue.close()
+        if self.__loader:
+            self.__loader.close()
+        self.__jobs.close()
+        self.__bus.close()
         self.root.destroy()
 
     def __initialize_dashboard(self):
         self.root.title(f"BCI Drawing Tree Tool    -    {self.filename.split('/')[-1]}")
         # Define adjustable window areas
-        self.__data_writer = DataWriter(self.filename, debug=self.debug)
-        self.__data_reader = DataReader(self.filename, debug=self.debug)
+        page_cache = PageCache(self.filename, debug=self.debug)
+        self.__data_writer = DataWriter(
+            self.filename, debug=self.debug, cache=page_cache
+        )
+        self.__data_reader = DataReader(
+            self.filename, debug=self.debug, cache=page_cache
+        )
+        if self.__write_queue:
+            self.__write_queue.close()  # finish writing to the last file
+        self.__write_queue = WriteQueue(
+            self.__data_writer, self.__bus, debug=self.debug
+        )
+        self.__extractor.templates = TemplateStore(
+            self.__data_reader, self.__data_writer, debug=self.debug
+        )
+        if self.__loader:
+            self.__loader.close()  # stop the workers loading from the last file
+        self.__loader = LoadCoordinator(self.root, debug=self.debug)
         self.__main_pw = PanedWindow(orient="horizontal")
         self.__tree_pane = PanedWindow(self.__main_pw, orient="horizontal", width=300)
         self.__drawing_pane = PanedWindow(
@@ -165,7 +272,7 @@ class GUI:
 
         # Define Elements
         self.__drawing_browser = DrawingTreeview(
-            self.__tree_pane, self.__data_reader, debug=self.debug
+            self.__tree_pane, self.__data_reader, self.__bus, debug=self.debug
         )
         self.__drawing_viewport = DrawingViewport(
             self.__drawing_pane,
@@ -173,10 +280,15 @@ class GUI:
             self.__data_writer,
             self.__data_reader,
             self.__extractor,
+            self.__loader,
+            self.__bus,
             debug=self.debug,
         )
         self.__drawing_table = DrawingTable(
-            self.__table_pane, self.__data_writer, debug=self.debug
+            self.__table_pane,
+            self.__write_queue,
+            self.__drawing_browser.search_index,
+            debug=self.debug,
         )
 
         self.__main_pw.add(self.__tree_pane)
@@ -191,35 +303,108 @@ class GUI:
 
         self.__main_pw.pack(fill="both", expand=True)
 
-        # Define traced variables
-        self.__drawing_browser.cur_item.trace_add("write", self.__refresh_table)
-        self.__drawing_browser.cur_drawing.trace_add("write", self.__refresh_viewport)
-        self.__drawing_browser.added_drawing.trace_add("write", self.__write_drawings)
-
         self.root.protocol("WM_DELETE_WINDOW", self.__on_closing)
 
-    def __write_drawings(self, *_):
-        part_id, pdf_path = self.__drawing_browser.added_drawing.get()
-        self.__data_writer.insert_images(part_id, pdf_path, self.root)
+    def __write_drawings(self, part_id: str, pdf_path: str, bilevel: bool):
+        """add the pages of a pdf as a background job, more can be queued meanwhile"""
+        if pdf_path == "":
+            return
+        data_writer = self.__data_writer
+        self.__jobs.submit(
+            f"Import {os.path.basename(pdf_path)}",
+            lambda job: data_writer.insert_images(
+                part_id, pdf_path, job.progress, bilevel=bilevel
+            ),
+            done=lambda _: self.__on_pages_added(part_id, pdf_path),
+            kind="import",
+        )
+
+    def __on_pages_added(self, part_id: str, pdf_path: str):
+        self.__refresh_viewport(self.__drawing_browser.cur_drawing)
+        self.__find_tables(part_id, pdf_path)
+
+    def __find_tables(self, part_id: str, pdf_path: str):
+        """look for the ruled tables on every page of a drawing in the background"""
+        data_reader, data_writer = self.__data_reader, self.__data_writer
+
+        def work(job):
+            from extractor.helper import find_tables  # loads opencv
+
+            total = data_reader.count_pages(part_id)
+            for pg in range(1, total + 1):
+                loaded = data_reader.get_img(part_id, pg)
+                if loaded is not None:
+                    data_writer.set_tables(
+                        part_id, f"{part_id}-{pg-1}", find_tables(loaded[0])
+                    )
+                job.progress(pg * 100 / total)
+
+        def done(_):
+            cur_drawing = self.__drawing_browser.cur_drawing
+            if cur_drawing and cur_drawing[0] == part_id:
+                self.__refresh_viewport(cur_drawing)
+
+        self.__jobs.submit(
+            f"Find tables in {os.path.basename(pdf_path)}",
+            work,
+            done=done,
+            priority=-1,
+            kind="find_tables",
+        )
 
-    def __refresh_table(self, *_):
+    def __on_page_rewritten(self, drawing_id: str, page_name: str):
+        self.__drawing_viewport.page_rewritten(drawing_id, page_name)
+
+    def __refresh_table(self, cur_item: tuple):
         try:
             # Change variables
-            part_id = self.__drawing_browser.cur_item.get()[0]
-            part_name = self.__drawing_browser.cur_item.get()[1]
-            # Update Table
-            table_data = self.__data_reader.get_user_data(part_id)
-            self.__drawing_table.change_part(part_id, part_name, table_data)
+            part_id = cur_item[0]
+            part_name = cur_item[1]
         except IndexError as e:
             # happens if the user clicks on somewhere that is not a tree item
             if self.debug:
                 print(f"error in gui - __refresh_table \n{e}")
+            return
+
+        def show(table_data):
+            self.__drawing_table.change_part(part_id, part_name, table_data)
+
+        # edits to the part shown are queued before it is read, and the queue is
+        # laid on top in the same read so a batch written meanwhile isn't lost
+        self.__drawing_table.save_data()
+        queue, reader = self.__write_queue, self.__data_reader
+        # Update Table, only the last part picked is read and shown
+        self.__loader.request(
+            "table", lambda: queue.read(part_id, reader.get_user_data), show
+        )
 
-    def __refresh_viewport(self, *_):
+    def __save_search_index(self):
+        """
+        Table writes in the background change the version of the file, so the index
+        is saved once they are all written, marked with the version they left. It
+        isn't saved while table edits can't be written or the tree has unsaved
+        changes, it would hold text the file doesn't
+        """
+        written = self.__write_queue.flush()
+        browser = self.__drawing_browser
+        # the index isn't all read in until the tree is
+        if browser.streaming or not browser.search_index.dirty:
+            return
+        if written and not browser.has_changes():
+            self.__data_writer.save_search_index(browser.search_index)
+
+    def __on_write_failed(self, part_ids: list):
+        showerror(
+            "Table edits not saved",
+            f"The edits to {len(part_ids)} part(s) couldn't be written to "
+            f"{os.path.basename(self.filename)}, they are kept and tried again.",
+        )
+
+    def __refresh_viewport(self, cur_drawing: tuple):
         # Change variables
         try:
-            drawing_id = self.__drawing_browser.cur_drawing.get()[0]
-            drawing_name = self.__drawing_browser.cur_drawing.get()[1]
+            drawing_id = cur_drawing[0]
+            drawing_name = cur_drawing[1]
 
             # Update Viewport
             try:
@@ -336,29 +521,19 @@ class GUI:
             self.__unrender_all()
             self.run_file(self.filename)
 
-    def __add_ocr_items(self, *_):
-        data = self.__extractor.data.get()
-        for row in data:
-            for col in row:
-                if "PART" in col[0]:
-                    part_ind = row.index(col)
-                    print(f"part index is {row.index(col)}")
-                    for i in data:
-                        if (
-                            i[part_ind][0].strip() != ""
-                            and "PART" not in i[part_ind][0]
-                        ):
-                            self.__drawing_browser.add_extracted_part(i[part_ind])
-                # if "DESCRIPTION" in col[0]:
-                #     desc_ind = row.index(col)
-                #     print(f"description index is {row.index(col)}")
-                #     descs = []
-                #     for i in data:
-                #         descs.append(i[desc_ind])
-                #     if (
-                #         i[desc_ind][0].strip() != ""
-                #         and "DESCRIPTION" not in i[desc_ind][0]
-                #     ):
-                #         print(
-                #             f"Item = {i[desc_ind][0].strip()} conf = {i[desc_ind][1]}"
-                #         )
+    @staticmethod
+    def __read_gray(path: str):
+        """grayscale image as an array, None if it can't be read (same as cv2.imread)"""
+        try:
+            with Image.open(path) as img:
+                return np.array(img.convert("L"))
+        except OSError:
+            return None
+
+    def __add_ocr_items(self, data: list):
+        """add the parts under the PART column of an OCR'd table to the tree at once"""
+        from extractor.helper import get_column  # loads opencv, only once OCR is used
+
+        parts = get_column(data, "PART")
+        if parts:
+            self.__drawing_browser.add_extracted_parts(parts)
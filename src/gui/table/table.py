@@ -3,7 +3,8 @@ This module contains the main part information table
 """
 from tkinter import Frame, ttk
 from gui.components.label_frame.label_frame import LabelFrame
-from data_manager.data_manager import DataWriter
+from data_manager.search_index import SearchIndex, section_text
+from data_manager.write_queue import WriteQueue
 from .tabs.tabs import (
     DrawingInfoTab,
     MaterialTab,
@@ -20,23 +21,32 @@ class DrawingTable(Frame):
 
     Methods:
         + change_part          = switches the information in the table for the part that is shown
+        + save_data            = queues the edited fields of the current part to be written
 
     Attributes:
         + debug
         + drawing_id
         + part_id
-        - data_writer
+        - write_queue
+        - search_index
         - label_frame
         - table_frame
         - sections
 
     """
 
-    def __init__(self, master: Frame, data_writer: DataWriter, debug=False):
+    def __init__(
+        self,
+        master: Frame,
+        write_queue: WriteQueue,
+        search_index: SearchIndex,
+        debug=False,
+    ):
         self.debug = debug
         Frame.__init__(self, master)
 
-        self.__data_writer = data_writer
+        self.__write_queue = write_queue
+        self.__search_index = search_index
         self.drawing_id = None
         self.part_id = None
 
@@ -51,13 +61,14 @@ class DrawingTable(Frame):
         paint_info = PaintTab(self.__table_frame, debug=self.debug)
         misc_info = MiscTab(self.__table_frame, debug=self.debug)
 
+        # keys are the sections of the user table in the data file
         self.__sections = {
-            "drawing_info": drawing_info,
-            "material_info": material_info,
-            "plating_info": plating_info,
-            "primer_info": primer_info,
-            "paint_info": paint_info,
-            "misc_info": misc_info,
+            "drawing": drawing_info,
+            "material": material_info,
+            "plating": plating_info,
+            "primer": primer_info,
+            "paint": paint_info,
+            "misc": misc_info,
         }
 
         self.__table_frame.add(drawing_info, text="Drawing")
@@ -71,21 +82,28 @@ class DrawingTable(Frame):
         self.__label_frame.pack(side="top", fill="x")
         self.__table_frame.pack(side="bottom", fill="both", expand=True)
 
-    def change_part(self, part_id: str, part_name: str, data: list):
+    def change_part(self, part_id: str, part_name: str, data: dict):
         """render and unrender current frame
         also save old information and query for any part information in the file"""
         self.__label_frame.label_text.set(value="Part " + part_name)
-        if self.part_id:
-            for i in self.__sections.items():
-                self.__data_writer.insert_user_data(self.part_id, i[1].get_info())
+        self.save_data()
 
-        for i in self.__sections.items():
-            i[1].set_info(data)
+        for section, tab in self.__sections.items():
+            tab.set_info(data.get(section, ()))
 
         self.part_id = part_id
 
     def save_data(self):
-        """save the current table data"""
+        """
+        queue the current table data to be written in the background, only fields that
+        were edited are written
+        """
         if self.part_id:
-            for i in self.__sections.items():
-                self.__data_writer.insert_user_data(self.part_id, i[1].get_info())
+            for section, tab in self.__sections.items():
+                changes = tab.get_changes()
+                if changes:
+                    self.__write_queue.put_user_data(self.part_id, section, changes)
+                    self.__search_index.set_text(
+                        self.part_id, section, section_text(tab.get_info().values())
+                    )
+                    tab.mark_saved()
@@ -4,6 +4,7 @@ This module is the tab classes for the main parts table
 from tkinter import Frame, Label
 from typing import List
 from gui.components.table.table import Table
+from data_manager.user_table import SECTIONS
 
 
 class InputTab(Frame):
@@ -13,10 +14,13 @@ class InputTab(Frame):
     Methods:
         + get_info             = gets information for specified part from file
         + set_info             = sets information for specified part from file
+        + get_changes          = gets the fields edited since set_info or mark_saved
+        + mark_saved           = takes what is in the table as saved
 
     Attributes:
         + items
         - table
+        - saved
 
     """
 
@@ -26,6 +30,7 @@ class InputTab(Frame):
         self.columnconfigure(0, weight=1)
         self.columnconfigure(1, weight=1)
         self.items = items
+        self.__saved = {}  # what is in the file for the fields that are shown
 
         header = Label(
             self,
@@ -52,7 +57,10 @@ class InputTab(Frame):
         return info
 
     def set_info(self, data: List):
-        """sets the information into the table when passed a list of shape (('field', 'data'), )"""
+        """sets the information into the table when passed a list of shape (('field', 'data'), )
+        fields that aren't in data are cleared"""
+        for i in self.__table.rows:
+            i.delete(0, "end")
         try:
             for i in data:
                 try:
@@ -64,6 +72,19 @@ class InputTab(Frame):
         except TypeError as e:
             if self.debug:
                 print(f"error in Infotab - set_info \n{e}")
+        self.mark_saved()
+
+    def get_changes(self) -> dict:
+        """returns only the fields that were edited since they were last saved"""
+        return {
+            key: value
+            for key, value in self.get_info().items()
+            if self.__saved.get(key, "") != value
+        }
+
+    def mark_saved(self):
+        """what is in the table now is what is in the file"""
+        self.__saved = self.get_info()
 
 
 class DrawingInfoTab(InputTab):
@@ -74,18 +95,7 @@ class DrawingInfoTab(InputTab):
             self,
             master,
             "Drawing Information",
-            [
-                "Description",
-                "CAGE Code",
-                "Qty",
-                "Flag Notes",
-                "Drawing",
-                "Sheet No",
-                "DWG Rev",
-                "EO Numbers",
-                "ESDS",
-                "HCI",
-            ],
+            SECTIONS["drawing"],
             debug,
         )
 
@@ -98,7 +108,7 @@ class MaterialTab(InputTab):
             self,
             master,
             "Material Information",
-            ["Material", "Material Spec", "Type", "Class", "Grade", "Notes"],
+            SECTIONS["material"],
             debug,
         )
 
@@ -111,7 +121,7 @@ class PlatingTab(InputTab):
             self,
             master,
             "Plating Information",
-            ["Plating", "Plating Spec", "Type", "Class", "Grade", "Notes"],
+            SECTIONS["plating"],
             debug,
         )
 
@@ -124,7 +134,7 @@ class PrimerTab(InputTab):
             self,
             master,
             "Primer Information",
-            ["Primer", "Primer Spec", "Type", "Class", "Grade", "Notes"],
+            SECTIONS["primer"],
             debug,
         )
 
@@ -137,7 +147,7 @@ class PaintTab(InputTab):
             self,
             master,
             "Paint Information",
-            ["Paint Spec", "Color", "Type", "Notes"],
+            SECTIONS["paint"],
             debug,
         )
 
@@ -150,12 +160,6 @@ class MiscTab(InputTab):
             self,
             master,
             "Miscellaneous Information",
-            [
-                "Welding (Y/N)",
-                "Heat Treatment (Y/N)",
-                "F-Code",
-                "Surface Finish/Roughness",
-                "Other Comments",
-            ],
+            SECTIONS["misc"],
             debug,
         )
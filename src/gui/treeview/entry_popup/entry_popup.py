@@ -6,12 +6,16 @@ from tkinter.ttk import Treeview
 
 
 class EntryPopup(Entry):
-    def __init__(self, parent: Treeview, iid: str, text: str, debug=False, **kw):
+    def __init__(
+        self, parent: Treeview, iid: str, text: str, command, debug=False, **kw
+    ):
         self.debug = debug
-        """If relwidth is set, then width is ignored"""
+        """If relwidth is set, then width is ignored,
+        command is called with ( iid, text ) when the edit is done"""
         super().__init__(parent, **kw)
         self.parent = parent
         self.iid = iid
+        self.command = command
 
         self.insert(0, text)
         # self['state'] = 'readonly'
@@ -28,10 +32,8 @@ class EntryPopup(Entry):
 
     def __on_return(self, _) -> None:
         try:
-            self.parent.item(self.iid, text=self.get())
-            tags = self.parent.item(self.iid, "tags")
-            self.parent.item(self.iid, tags=(tags[0], self.get(), ""))
-        except TclError as e:
+            self.command(self.iid, self.get())
+        except (TclError, KeyError) as e:
             # occurs when click outside of item
             if self.debug:
                 print(f"error in EntryPopup - __on_return \n{e}")
@@ -0,0 +1,251 @@
+"""
+This module is the in memory model of the part tree
+
+The treeview only shows the parts, everything that needs to know about the tree
+(saving, searching, exporting) reads it from here so it never has to go back
+through tk to ask the widget
+"""
+from bisect import bisect_right
+from math import inf
+from typing import Iterator, List
+
+
+class PartRecord:
+    """
+    A single part in the tree
+
+    Attributes:
+        + part_id
+        + parent
+        + name
+        + tag
+        + children
+    """
+
+    __slots__ = ("part_id", "parent", "name", "tag", "children")
+
+    def __init__(
+        self, part_id: str, parent: str, name: str, tag="", children=None
+    ) -> None:
+        self.part_id = part_id
+        self.parent = parent
+        self.name = name
+        self.tag = tag
+        self.children = children if children is not None else []
+
+    def row(self) -> tuple:
+        """the part as it is saved ( parent, part_id, part_name, tag_color, children )"""
+        return (self.parent, self.part_id, self.name, self.tag, tuple(self.children))
+
+
+class PartModel:
+    """
+    Authoritative copy of the part tree, parts are kept by id and the top level parts
+    are the children of the root id ""
+
+    Methods:
+        + load                      = builds the model from the rows in the data file
+        + begin_load                = empties the model to be loaded a chunk at a time
+        + load_chunk                = adds a chunk of rows, in any order
+        + end_load                  = drops rows whose parent never came
+        + new_id                    = creates an id that hasn't been used before
+        + add                       = adds a part under a parent
+        + remove                    = removes a part, its children move up to its parent
+        + rename                    = changes the name of a part
+        + set_tag                   = changes the tag color of a part
+        + children                  = ids of the children of a part
+        + walk                      = parts depth first in tree order
+        + rows                      = all parts in the form they are saved in
+        + outline                   = parts in tree order with how deep they are
+        + pop_changes               = parts changed and ids deleted since the last call
+        + has_changes               = if any part changed since pop_changes was called
+        - touch                     = marks parts as changed
+
+    Attributes:
+        + item_id
+        - parts
+        - roots
+        - dirty
+        - deleted
+        - waiting
+        - order
+        - positions
+    """
+
+    def __init__(self) -> None:
+        self.item_id = 0
+        self.__parts = {}
+        self.__roots = []
+        self.__dirty = set()
+        self.__deleted = []
+        # only used while loading a chunk at a time
+        self.__waiting = {}  # parent_id: rows that came before their parent
+        self.__order = {}  # part_id: {child_id: place in the saved children}
+        self.__positions = {}  # part_id: places of the children added so far
+
+    def __len__(self) -> int:
+        return len(self.__parts)
+
+    def __contains__(self, part_id: str) -> bool:
+        return part_id in self.__parts
+
+    def __getitem__(self, part_id: str) -> PartRecord:
+        return self.__parts[part_id]
+
+    def load(self, items: List) -> None:
+        """
+        Passed a list of items in form [ part_id, parent_id, part_name, tag_color, children ]
+        parts are indexed by id and walked depth first with a stack, so every part is
+        looked at once. Parts that can't be reached from the top level are dropped
+        """
+        index = {i[0]: i for i in items}
+        self.__parts = {}
+        self.__roots = []
+        self.__dirty = set()
+        self.__deleted = []
+        stack = [("", i) for i in reversed(items) if i[1] == ""]
+        while stack:
+            parent, (part_id, _, name, tag, children) = stack.pop()
+            if part_id in self.__parts:
+                continue  # a part can only be in the tree once
+            self.__parts[part_id] = PartRecord(part_id, parent, name, tag)
+            self.children(parent).append(part_id)
+            stack.extend((part_id, index[i]) for i in reversed(children) if i in index)
+        self.item_id = max([self.item_id] + [int(i) for i in self.__parts])
+
+    def begin_load(self) -> None:
+        """empty the model so it can be loaded with load_chunk"""
+        self.load([])
+        self.__waiting, self.__order, self.__positions = {}, {"": {}}, {"": []}
+
+    def load_chunk(self, items: List) -> List[tuple]:
+        """
+        Passed a chunk of items in form [ part_id, parent_id, part_name, tag_color,
+        children ], in any order. Parts go in as soon as their parent is in, at their
+        place in the parent's saved children, parts that come before their parent
+        wait for it. Returns ( record, index in its parent's children ) for every
+        part added, parents before their children, in the order they were added
+        """
+        added = []
+        stack = list(reversed(items))
+        while stack:
+            item = stack.pop()
+            part_id, parent, name, tag, children = item
+            if part_id in self.__parts:
+                continue  # a part can only be in the tree once
+            if parent != "" and parent not in self.__parts:
+                self.__waiting.setdefault(parent, []).append(item)
+                continue
+            place = self.__order[parent].get(part_id, inf)
+            positions = self.__positions[parent]
+            index = bisect_right(positions, place)
+            positions.insert(index, place)
+            self.children(parent).insert(index, part_id)
+            record = self.__parts[part_id] = PartRecord(part_id, parent, name, tag)
+            self.__order[part_id] = {j: i for i, j in enumerate(children)}
+            self.__positions[part_id] = []
+            self.item_id = max(self.item_id, int(part_id))
+            added.append((record, index))
+            stack.extend(reversed(self.__waiting.pop(part_id, [])))
+        return added
+
+    def end_load(self) -> None:
+        """parts still waiting for a parent can't be reached, they are dropped"""
+        self.__waiting, self.__order, self.__positions = {}, {}, {}
+
+    def new_id(self) -> str:
+        """creates a new item id that hasn't been used before"""
+        self.item_id += 1
+        return str(self.item_id)
+
+    def add(self, part_id: str, parent: str, name: str, tag="", index=None) -> None:
+        """add a part at index in its parent's children, or at the end"""
+        self.__parts[part_id] = PartRecord(part_id, parent, name, tag)
+        siblings = self.children(parent)
+        index = len(siblings) if index is None else index
+        siblings.insert(index, part_id)
+        self.item_id = max(self.item_id, int(part_id))
+        self.__touch(part_id, parent)
+        if parent in self.__positions:
+            # while loading, keep the places of the children in step with them
+            positions = self.__positions[parent]
+            positions.insert(index, positions[index] if index < len(positions) else inf)
+            self.__positions[part_id] = []
+            self.__order[part_id] = {}
+
+    def remove(self, part_id: str) -> List[str]:
+        """
+        remove a part, its children take its place in the parent.
+        Returns the new children of the parent
+        """
+        record = self.__parts.pop(part_id)
+        siblings = self.children(record.parent)
+        index = siblings.index(part_id)
+        siblings[index : index + 1] = record.children
+        for i in record.children:
+            self.__parts[i].parent = record.parent
+        if record.parent in self.__positions:
+            # while loading, the children moved up take the place of the part
+            positions = self.__positions[record.parent]
+            positions[index : index + 1] = [positions[index]] * len(record.children)
+        self.__deleted.append(part_id)
+        self.__dirty.discard(part_id)
+        self.__touch(record.parent, *record.children)
+        return siblings
+
+    def rename(self, part_id: str, name: str) -> None:
+        self.__parts[part_id].name = name
+        self.__touch(part_id)
+
+    def set_tag(self, part_id: str, tag: str) -> None:
+        self.__parts[part_id].tag = tag
+        self.__touch(part_id)
+
+    def children(self, part_id: str) -> List[str]:
+        """ids of the children of a part, or of the top level parts for the root id"""
+        if part_id == "":
+            return self.__roots
+        return self.__parts[part_id].children
+
+    def walk(self, part_id="") -> Iterator[PartRecord]:
+        """parts under part_id depth first in the order they are shown"""
+        stack = self.children(part_id)[::-1]
+        while stack:
+            record = self.__parts[stack.pop()]
+            yield record
+            stack.extend(record.children[::-1])
+
+    def rows(self) -> List[tuple]:
+        """every part in form ( parent, part_id, part_name, tag_color, children )"""
+        return [i.row() for i in self.__parts.values()]
+
+    def outline(self, part_id="") -> List[tuple]:
+        """
+        parts under part_id in the order they are shown, top level parts are level 0
+        form = ( level, part_id, part_name, parent_name, tag_color )
+        """
+        levels = {part_id: -1}
+        res = []
+        for record in self.walk(part_id):
+            levels[record.part_id] = level = levels[record.parent] + 1
+            parent = self.__parts[record.parent].name if record.parent else ""
+            res.append((level, record.part_id, record.name, parent, record.tag))
+        return res
+
+    def pop_changes(self) -> tuple:
+        """
+        ( rows of the parts changed, ids of the parts deleted ) since this was last
+        called, the rows are in the same form as rows
+        """
+        rows = [self.__parts[i].row() for i in self.__dirty if i in self.__parts]
+        deleted = self.__deleted
+        self.__dirty = set()
+        self.__deleted = []
+        return rows, deleted
+
+    def has_changes(self) -> bool:
+        return bool(self.__dirty or self.__deleted)
+
+    def __touch(self, *part_ids: str) -> None:
+        """the root id \"\" isn't saved, so it is never dirty"""
+        self.__dirty.update(i for i in part_ids if i != "")
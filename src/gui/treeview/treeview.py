@@ -2,17 +2,30 @@
 This module is the main part tree for the application
 """
 
-from tkinter import Frame, TclError, Variable, Event, filedialog
-from tkinter.ttk import Treeview, Style
-from typing import List
-import numpy as np
+from queue import Empty, SimpleQueue
+from threading import Thread
+from tkinter import Frame, StringVar, TclError, Event, filedialog
+from tkinter.ttk import Entry, Treeview, Style
+from typing import Iterable, List
 
 
 from data_manager.data_manager import DataReader
+from data_manager.search_index import SearchIndex
+from gui.components.event_bus.event_bus import EventBus
 from gui.components.auto_scrollbar.auto_scrollbar import AutoScrollbar
 from gui.components.label_frame.label_frame import LabelFrame
 from gui.components.rc_menu.rc_menu import RightClickMenu
 from gui.treeview.entry_popup.entry_popup import EntryPopup
+from gui.treeview.part_model.part_model import PartModel, PartRecord
+
+# trees with more parts than this are inserted into the treeview as they are opened
+LAZY_PARTS = 2000
+
+# most parts a search shows, with the parts they are under
+SEARCH_LIMIT = 1000
+
+# ms between checks for chunks of parts read in the background
+STREAM_POLL_MS = 20
 
 
 class DrawingTreeview(Frame):
@@ -24,29 +37,56 @@ class DrawingTreeview(Frame):
 
     Methods:
         + read_data          = read data in from the main datafile and recreate tree
-        + save_data          = save the tree data to the main datafile as a linked list
+        + stream_data        = read the tree from the datafile in the background and
+                               show it a chunk at a time
+        + get_parts          = get the tree data from the model to save as a linked list
+        + get_outline        = get every part in tree order with its level for exporting
+        + has_changes        = if the tree changed since it was last saved
+        + add_extracted_part = add one OCR'd part under the part with focus
+        + add_extracted_parts = add many OCR'd parts under the part with focus at once
         - make_menu          = create the right click dropdown menu
         - user_add_item      = allows the user to add an item to the tree the has edit box
         - user_add_child     = allows the user to add an item child to the tree then has edit box
         - remove_item        = removes an item and shifts it's children to the deleted items parent
         - edit_item          = brings up an edit box that allows the user to change the part name
-        - add_file           = user selects pdf, treeview changes a variable for added_drawing
+        - add_file           = user selects pdf, posts it as added_drawing
+        - add_bilevel_file   = add_file, but the drawing is stored black and white
         - no_drawing         = marks the item as no drawing
         - double_click       = brings up edit box on double click
         - single_click       = shifts focus to the selected tree item
+        - set_cur_item       = posts cur_item if the part shown in the table changed
+        - set_cur_drawing    = posts cur_drawing if the part shown in the viewport changed
+        - on_select          = shows the part that was selected with the keyboard
         - edit_popup         = edit item helper - creates the popup to edit the item text
-        - id_creator         = creates a new item id that hasn't been used before
-        - app_add_item       = applications way of adding items on file load
-        - read_data_helper   = recursive helper
-        - save_data_helper   = recursive helper
+        - rename             = renames a part when the edit popup is done
+        - part_tags          = gets ( part_id, part_name, tag_color ) from the model
+        - app_add_item       = applications way of adding a new item
+        - app_add_items      = shows a batch of items from the model
+        - show_tree          = shows the whole model, lazily if it is big
+        - poll_stream        = takes in the chunks read in the background
+        - show_chunk         = shows the parts of a chunk that are in view
+        - on_search          = shows only the parts that match the search box
+        - shown_walk         = parts in tree order, only going into the ones shown
+        - conf_tag           = tag color for an OCR confidence
+        - load_children      = inserts the children of a lazy part when it is opened
+        - on_open            = loads a lazy part when it is opened
 
     Attributes:
         + debug
+        + lazy_parts
         + item_id
+        + bus
         + cur_item
-        + added_drawing
-        - deleted
+        + cur_drawing
+        + search_index
+        + streaming
         - data_reader
+        - parts
+        - unloaded
+        - loaded
+        - lazy
+        - query
+        - label_frame
         - drawing_tree
         - drop_menu
     """
@@ -55,10 +95,14 @@ class DrawingTreeview(Frame):
         self,
         master: Frame,
         data_reader: DataReader,
+        bus: EventBus,
         debug=False,
+        lazy_parts=LAZY_PARTS,
     ):
         self.debug = debug
+        self.bus = bus
         self.master = master
+        self.lazy_parts = lazy_parts
         Frame.__init__(self, master)
 
         style = Style()
@@ -72,15 +116,21 @@ class DrawingTreeview(Frame):
         )
         style.map("Treeview", background=[("selected", "#004F98")])
 
-        self.item_id = 0
-        self.cur_item = Variable(value=("", ""))
-        self.cur_drawing = Variable(value=("", ""))
-        self.added_drawing = Variable(value=("", ""))
-        self.__deleted = []
+        # what the table and viewport show, changes are posted to the bus
+        self.cur_item = ("", "")
+        self.cur_drawing = ("", "")
         self.__data_reader = data_reader
+        self.__parts = PartModel()  # the treeview only shows what is in here
+        self.__unloaded = set()  # lazy parts whose children are not in the tree yet
+        self.__loaded = set()  # parts whose children are all in the tree
+        self.__lazy = False
+        self.search_index = SearchIndex()  # filled in by stream_data
+        self.streaming = False  # parts are still being read in the background
+        self.__query = StringVar(value="")
 
         # Define Frames
-        label_frame = LabelFrame(self, "Drawing Tree")
+        self.__label_frame = LabelFrame(self, "Drawing Tree")
+        search_box = Entry(self, textvariable=self.__query)
         tree_frame = Frame(self)
 
         # Configure Treeframe
@@ -99,6 +149,8 @@ class DrawingTreeview(Frame):
         # Bind Buttons
         self.__drawing_tree.bind("<Double-1>", self.__double_click)
         self.__drawing_tree.bind("<ButtonRelease-1>", self.__single_click)
+        self.__drawing_tree.bind("<<TreeviewSelect>>", self.__on_select)
+        self.__drawing_tree.bind("<<TreeviewOpen>>", self.__on_open)
 
         # Configure Elements
         self.__drawing_tree.configure(
@@ -113,6 +165,8 @@ class DrawingTreeview(Frame):
         self.__drawing_tree.tag_configure("85", background="#FFFF00")
         self.__drawing_tree.tag_configure("70", background="#F08080")
         self.__drawing_tree.tag_configure("50", background="#B22222")
+        self.__drawing_tree.tag_configure("match", font=("Arial", 10, "bold"))
+        self.__query.trace_add("write", self.__on_search)
 
         # Pack Elements
         scrolly.grid(row=0, column=1, sticky="ns")
@@ -120,49 +174,176 @@ class DrawingTreeview(Frame):
         self.__drawing_tree.grid(row=0, column=0, sticky="nsew")
 
         # Pack Frames
-        label_frame.pack(side="top", fill="x")
+        self.__label_frame.pack(side="top", fill="x")
+        search_box.pack(side="top", fill="x", padx=5, pady=5)
         tree_frame.pack(side="bottom", fill="both", expand=True)
 
-        self.read_data(self.__data_reader.get_all_drawings())
+        self.stream_data()
+
+    @property
+    def item_id(self) -> int:
+        """highest part id used so far"""
+        return self.__parts.item_id
 
     def read_data(self, items: List) -> None:
         """
-        Passed a list of items in form [ part_id, parent_id, part_name, children ]
-        need to recursively go through and add items for each of
+        Passed a list of items in form [ part_id, parent_id, part_name, tag_color, children ]
+        the part model is built from them and then shown in the treeview.
+        Trees with more than lazy_parts parts only get their top level inserted, the
+        rest is inserted from the model as parts are opened
         """
-        for i in items:
-            if i[1] == "":
-                self.__read_data_helper(items, i)
+        self.__parts.load(items)
+        self.__lazy = False
+        self.__show_tree()
+
+    def stream_data(self, done=None) -> None:
+        """
+        Read the parts and the search index from the data file in a background
+        thread. The tree is shown as the chunks come in, so the window can be used
+        right away. done is called once everything is in
+        """
+        self.streaming = True
+        self.__parts.begin_load()
+        self.__drawing_tree.delete(*self.__drawing_tree.get_children(""))
+        self.__unloaded, self.__loaded = set(), set()
+        self.__label_frame.label_text.set(value="Loading Parts...")
+        chunks = SimpleQueue()
+
+        def thread_task():
+            try:
+                chunks.put(("count", self.__data_reader.count_drawings()))
+                for chunk in self.__data_reader.iter_drawings():
+                    chunks.put(("parts", chunk))
+                chunks.put(("index", self.__data_reader.get_search_index()))
+            except (KeyError, OSError) as e:
+                if self.debug:
+                    print(f"error in treeview - stream_data \n{e}")
+            chunks.put(("done", None))
+
+        Thread(target=thread_task, daemon=True).start()
+        self.after(STREAM_POLL_MS, self.__poll_stream, chunks, done)
+
+    def __poll_stream(self, chunks: SimpleQueue, done):
+        """one chunk of parts is shown each time, so the ui keeps up"""
+        while True:
+            try:
+                kind, data = chunks.get_nowait()
+            except Empty:
+                break
+            if kind == "count":
+                self.__lazy = data > self.lazy_parts
+            elif kind == "parts":
+                self.__show_chunk(self.__parts.load_chunk(data))
+                break
+            elif kind == "index":
+                self.search_index.merge(data)
+            else:
+                self.__parts.end_load()
+                self.streaming = False
+                self.__label_frame.label_text.set(value="Drawing Tree")
+                if self.__query.get().strip():
+                    self.__on_search()
+                if done:
+                    done()
+                return
+        self.after(STREAM_POLL_MS, self.__poll_stream, chunks, done)
+
+    def __show_chunk(self, added: List[tuple]):
+        """
+        insert the parts that were just added to the model at their place. Big trees
+        only get their top two levels inserted, like show_tree, deeper parts get a
+        placeholder under their parent and are inserted when it is opened
+        """
+        if self.__query.get().strip():
+            return  # the search is run again once everything is in
+        call = self.__drawing_tree.tk.call
+        tree = str(self.__drawing_tree)
+        for record, index in added:
+            parent = record.parent
+            if self.__lazy and parent != "" and parent not in self.__loaded:
+                if parent not in self.__unloaded and self.__drawing_tree.exists(parent):
+                    self.__unloaded.add(parent)
+                    call(tree, "insert", parent, "end", "-text", "Loading...")
+                continue
+            call(
+                tree,
+                "insert",
+                parent,
+                index,
+                "-id",
+                record.part_id,
+                "-text",
+                record.name,
+                "-tags",
+                (record.tag,),
+                "-open",
+                not self.__lazy or parent == "",
+            )
+            if not self.__lazy or parent == "":
+                self.__loaded.add(record.part_id)
+
+    def __show_tree(self):
+        """show the whole model, big trees only get their top two levels inserted"""
+        self.__unloaded, self.__loaded = set(), set()
+        if self.__lazy or len(self.__parts) > self.lazy_parts:
+            roots = self.__parts.children("")
+            self.__loaded.update(roots)
+            self.__app_add_items([self.__parts[i] for i in roots], lazy=True)
+            for i in roots:
+                self.__load_children(i)
+                self.__drawing_tree.item(i, open=True)
+            return
+        self.__app_add_items(self.__parts.walk())
 
     def get_parts(self) -> tuple:
         """returns tree information partid into the main ids section of the datafile
-        form = ( parent, part_id, part_name, children ), (deleted items)
+        form = ( parent, part_id, part_name, tag_color, children ), (deleted items)
+        only the parts changed since the last call are returned, this only reads the
+        part model, the treeview isn't touched
         """
-        parts = []
-        self.__save_data_helper("", parts)
-        data = (parts, self.__deleted)
-        self.__deleted = []
-        return data
+        return self.__parts.pop_changes()
+
+    def has_changes(self) -> bool:
+        return self.__parts.has_changes()
+
+    def get_outline(self) -> list:
+        """
+        returns every part in the order it is shown
+        form = ( level, part_id, part_name, parent_name, tag_color )
+        """
+        return self.__parts.outline()
 
     def add_extracted_part(self, part: tuple):
         """adds a part from an extracted tuple of form ( part_name, conf )"""
-        parent = self.__drawing_tree.item(self.__drawing_tree.focus(), "tags")[0]
-        print(f"parent - {parent}")
-        part_id = self.__id_creator()
-
-        if float(part[1]) > 95:
-            tag_color = ""
-        elif float(part[1]) > 85:
-            tag_color = "95"
-        elif float(part[1]) > 70:
-            tag_color = "85"
-        elif float(part[1]) > 50:
-            tag_color = "70"
-        else:
-            tag_color = "50"
-        print(part[1])
+        self.add_extracted_parts([part])
 
-        self.__app_add_item(part_id, parent, part[0].strip(), tag_color=tag_color)
+    def add_extracted_parts(self, parts: List[tuple]):
+        """
+        adds parts from extracted tuples of form ( part_name, conf ) under the part
+        that has focus, they go into the model first and are shown in one batch
+        """
+        parent = self.__drawing_tree.focus()
+        self.__load_children(parent)
+        records = []
+        for name, conf in parts:
+            part_id = self.__parts.new_id()
+            self.__parts.add(part_id, parent, name.strip(), self.__conf_tag(conf))
+            self.search_index.set_text(part_id, "name", name.strip())
+            records.append(self.__parts[part_id])
+        self.__app_add_items(records)
+
+    @staticmethod
+    def __conf_tag(conf) -> str:
+        """tag color for the OCR confidence of a part, sure parts get no color"""
+        if float(conf) > 95:
+            return ""
+        if float(conf) > 85:
+            return "95"
+        if float(conf) > 70:
+            return "85"
+        if float(conf) > 50:
+            return "70"
+        return "50"
 
     def __make_menu(self):
         self.__drop_menu = RightClickMenu(self.__drawing_tree)
@@ -175,50 +356,41 @@ class DrawingTreeview(Frame):
         self.__drop_menu.add_command(label="Edit", command=self.__edit_item)
         self.__drop_menu.add_separator()
         self.__drop_menu.add_command(label="Add Drawing File", command=self.__add_file)
+        self.__drop_menu.add_command(
+            label="Add Line Art Drawing File", command=self.__add_bilevel_file
+        )
         self.__drop_menu.add_command(
             label="Mark As No Drawing", command=self.__no_drawing
         )
 
     def __user_add_item(self):
-        new_id = self.__id_creator()
-        self.__drawing_tree.insert(
-            parent=self.__drawing_tree.parent(self.__drop_menu.selection),
-            index="end",
-            iid=new_id,
-            text="new part",
-            tags=(new_id, "part_name", ""),
-        )
+        new_id = self.__parts.new_id()
+        parent = self.__parts[self.__drop_menu.selection].parent
+        self.__app_add_item(new_id, parent, "new part")
         self.__edit_popup(new_id, "#0")
 
     def __user_add_child(self):
-        new_id = self.__id_creator()
+        self.__load_children(self.__drop_menu.selection)
+        new_id = self.__parts.new_id()
         self.__drawing_tree.item(self.__drop_menu.selection, open=True)
-        self.__drawing_tree.insert(
-            parent=self.__drop_menu.selection,
-            index="end",
-            iid=new_id,
-            text="new part",
-            tags=(new_id, "part_name", ""),
-        )
+        self.__app_add_item(new_id, self.__drop_menu.selection, "new part")
         self.__edit_popup(new_id, "#0")
 
     def __remove_item(self):
-        children = np.array(
-            self.__drawing_tree.get_children(self.__drop_menu.selection)
-        )
-        parent = self.__drawing_tree.parent(self.__drop_menu.selection)
-        old_children = np.array(self.__drawing_tree.get_children(parent))
-        del_index = np.where(old_children == self.__drop_menu.selection)[0]
-        old_children = np.delete(old_children, del_index)
-        children = np.insert(old_children, del_index, children, axis=0)
-
-        # mark as deleted, for deleting in file on save
-        tags = self.__drawing_tree.item(self.__drop_menu.selection, "tags")
-        self.__deleted.append(tags[0])
+        part_id = self.__drop_menu.selection
+        self.__load_children(part_id)
+        parent = self.__parts[part_id].parent
+
+        # the model marks it as deleted, for deleting in file on save
+        children = self.__parts.remove(part_id)
+        self.search_index.remove(part_id)
+        if self.__query.get().strip():
+            self.__on_search()  # the children may not be shown in the search
+            return
         if len(children) > 0:
             self.__drawing_tree.set_children(parent, *children)
         try:
-            self.__drawing_tree.delete(self.__drop_menu.selection)
+            self.__drawing_tree.delete(part_id)
         except TclError as e:
             if self.debug:
                 print(f"error in treeview - __remove_item \n{e}")
@@ -228,9 +400,10 @@ class DrawingTreeview(Frame):
         column = self.__drop_menu.column
         self.__edit_popup(rowid, column)
 
-    def __add_file(self):
+    def __add_file(self, bilevel=False):
         """
         Filebox popup leading to pdf drawing, utilize pdf2image to convert, then save to file
+        bilevel drawings are stored as black and white
         ** this needs to move to the gui **
         """
 
@@ -240,23 +413,22 @@ class DrawingTreeview(Frame):
             filetypes=[("pdf file", ".pdf")],
         )
         part_id = self.__drop_menu.selection
-        self.added_drawing.set(value=(part_id, pdf_path))
+        self.bus.post("added_drawing", part_id, pdf_path, bilevel)
 
-        # store in variable of shape ( part_id, pdf_path ) trace from gui
+    def __add_bilevel_file(self):
+        self.__add_file(bilevel=True)
 
     def set_focus(self):
-        new_curr_drawing = self.__drawing_tree.item(self.__drawing_tree.focus(), "tags")
-        if self.cur_drawing.get() != new_curr_drawing:
-            self.cur_drawing.set(new_curr_drawing)
+        self.__set_cur_drawing(self.__part_tags(self.__drawing_tree.focus()))
 
     def __no_drawing(self):
         try:
             # what row and column was clicked on
             rowid = self.__drop_menu.selection
-            tags = self.__drawing_tree.item(rowid, "tags")
-            self.__drawing_tree.item(rowid, tags=(tags[0], tags[1], "none"))
+            self.__parts.set_tag(rowid, "none")
+            self.__drawing_tree.item(rowid, tags=("none",))
 
-        except ValueError as e:
+        except KeyError as e:
             # occurs when double click not on an item
             if self.debug:
                 print(f"error in treeview - __no_drawing \n{e}")
@@ -268,7 +440,7 @@ class DrawingTreeview(Frame):
         """
         region = self.__drawing_tree.identify("region", event.x, event.y)
         if region == "heading":
-            self.cur_drawing.set("root_drawing")
+            self.__set_cur_drawing("root_drawing")
             # go to the root drawing image
         else:
             self.set_focus()
@@ -283,18 +455,30 @@ class DrawingTreeview(Frame):
         #     # occurs when double click not on an item
         #     pass
 
+    def __on_select(self, _: Event):
+        """the selection moved with the keyboard, show the part in the table"""
+        new_curr_item = self.__part_tags(self.__drawing_tree.focus())
+        if new_curr_item:
+            self.__set_cur_item(new_curr_item)
+
     def __single_click(self, event: Event):
         region = self.__drawing_tree.identify("region", event.x, event.y)
         if region == "heading":
-            self.cur_item.set("root_drawing")
+            self.__set_cur_item("root_drawing")
             # go to the root drawing image
         else:
-            new_curr_item = self.__drawing_tree.item(
-                self.__drawing_tree.focus(), "tags"
-            )
-            if self.cur_item.get() != new_curr_item:
-                # Determine if current item is different than before
-                self.cur_item.set(new_curr_item)
+            self.__set_cur_item(self.__part_tags(self.__drawing_tree.focus()))
+
+    def __set_cur_item(self, new_curr_item):
+        # Determine if current item is different than before
+        if self.cur_item != new_curr_item:
+            self.cur_item = new_curr_item
+            self.bus.post("cur_item", new_curr_item, coalesce=True)
+
+    def __set_cur_drawing(self, new_curr_drawing):
+        if self.cur_drawing != new_curr_drawing:
+            self.cur_drawing = new_curr_drawing
+            self.bus.post("cur_drawing", new_curr_drawing, coalesce=True)
 
     def __edit_popup(self, rowid: str, col: str):
         _, y, _, _ = self.__drawing_tree.bbox(rowid, col)
@@ -302,44 +486,108 @@ class DrawingTreeview(Frame):
         # place Entry popup properly
         text = self.__drawing_tree.item(rowid, "text")
 
-        entry_popup = EntryPopup(self.__drawing_tree, rowid, text, debug=self.debug)
+        entry_popup = EntryPopup(
+            self.__drawing_tree, rowid, text, self.__rename, debug=self.debug
+        )
         entry_popup.place(x=20, y=y + 10, anchor="w", relwidth=1)
 
-    def __id_creator(self):
-        self.item_id += 1
-        return str(self.item_id)
+    def __rename(self, part_id: str, part_name: str):
+        """renaming a part clears its tag color, the user has checked it"""
+        self.__parts.rename(part_id, part_name)
+        self.__parts.set_tag(part_id, "")
+        self.search_index.set_text(part_id, "name", part_name)
+        self.__drawing_tree.item(part_id, text=part_name, tags=("",))
+
+    def __part_tags(self, part_id: str) -> tuple:
+        """( part_id, part_name, tag_color ) of a part from the model"""
+        if part_id not in self.__parts:
+            return ()
+        record = self.__parts[part_id]
+        return (record.part_id, record.name, record.tag)
 
     def __app_add_item(
         self, part_id: str, parent_id: str, part_name: str, tag_color=""
     ):
-        """This is for adding items on file load"""
+        """Add a new part to the end of its parent"""
+        self.__parts.add(part_id, parent_id, part_name, tag_color)
+        self.search_index.set_text(part_id, "name", part_name)
         self.__drawing_tree.insert(
             parent=parent_id,
             index="end",
             iid=part_id,
             text=part_name,
-            tags=(part_id, part_name, tag_color),
+            tags=(tag_color,),
+            open=True,
         )
-        if int(part_id) > self.item_id:
-            self.item_id = int(part_id)
-        self.__drawing_tree.item(part_id, open=True)
 
-    def __read_data_helper(
-        self,
-        items: List,
-        item: List,
-    ):
-        self.__app_add_item(item[0], item[1], item[2], item[3])
-        for i in item[4]:
-            for j in items:
-                if i == j[0]:
-                    self.__read_data_helper(items, j)
-
-    def __save_data_helper(self, item: str, parts: List):
-        children = self.__drawing_tree.get_children(item)
-        for i in children:
-            tags = self.__drawing_tree.item(i, "tags")
-            parts.append(
-                (item, tags[0], tags[1], tags[2], self.__drawing_tree.get_children(i))
+    def __app_add_items(self, records: Iterable[PartRecord], lazy=False):
+        """
+        Show parts that are already in the model in one batch, parents have to come
+        before their children. This goes straight to tk to skip the option formatting
+        ttk does for every insert.
+        Lazy parts are closed and get a placeholder child until they are opened
+        """
+        call = self.__drawing_tree.tk.call
+        tree = str(self.__drawing_tree)
+        for record in records:
+            call(
+                tree,
+                "insert",
+                record.parent,
+                "end",
+                "-id",
+                record.part_id,
+                "-text",
+                record.name,
+                "-tags",
+                (record.tag,),
+                "-open",
+                not lazy,
             )
-            self.__save_data_helper(i, parts)
+            if lazy and record.children:
+                self.__unloaded.add(record.part_id)
+                call(tree, "insert", record.part_id, "end", "-text", "Loading...")
+
+    def __load_children(self, part_id: str):
+        """insert the children of a lazy part in place of its placeholder"""
+        if part_id not in self.__unloaded:
+            return
+        self.__unloaded.remove(part_id)
+        self.__loaded.add(part_id)
+        self.__drawing_tree.delete(*self.__drawing_tree.get_children(part_id))
+        self.__app_add_items(
+            [self.__parts[i] for i in self.__parts.children(part_id)], lazy=True
+        )
+
+    def __on_search(self, *_):
+        """
+        show the parts whose name or table data has the text in the search box and
+        the parts they are under, matches are bold. An empty search shows every part
+        """
+        self.__drawing_tree.delete(*self.__drawing_tree.get_children(""))
+        query = self.__query.get()
+        if not query.strip():
+            self.__show_tree()
+            return
+        self.__unloaded, self.__loaded = set(), set()
+        matches = self.search_index.search(query, SEARCH_LIMIT)
+        matches = [i for i in matches if i in self.__parts]
+        shown = set()
+        for part_id in matches:
+            while part_id and part_id not in shown:
+                shown.add(part_id)
+                part_id = self.__parts[part_id].parent
+        self.__app_add_items(self.__shown_walk(shown))
+        for part_id in matches:
+            self.__drawing_tree.item(part_id, tags=(self.__parts[part_id].tag, "match"))
+
+    def __shown_walk(self, shown: set) -> Iterable[PartRecord]:
+        """parts in shown in tree order, parts that aren't shown aren't gone into"""
+        stack = [i for i in reversed(self.__parts.children("")) if i in shown]
+        while stack:
+            record = self.__parts[stack.pop()]
+            yield record
+            stack.extend(i for i in reversed(record.children) if i in shown)
+
+    def __on_open(self, _):
+        self.__load_children(self.__drawing_tree.focus())
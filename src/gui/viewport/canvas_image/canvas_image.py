@@ -14,7 +14,9 @@ import tkinter as tk
 
 from tkinter import Event, ttk, Button, Frame, Label
 from PIL import Image, ImageTk
+import numpy as np
 
+from data_manager.data_manager import HUGE_PIXELS
 from gui.components.auto_scrollbar.auto_scrollbar import AutoScrollbar
 from extractor.extractor import TableExtractor
 
@@ -27,17 +29,26 @@ class CanvasImage:
 
     Methods:
         + refresh_img            = switches the image shown
+        + rotate                 = rotates the view of the image
+        - reset_view             = zooms out and places the image container
         + smaller                = resizes the image proportionally
         + grid                   = grids the canvas
         + pack                   = cannot use pack
         + place                  = cannot use place
         - create_box_buttons     = creates the buttons that appear to confirm bounding box
+        + clear_box              = removes the highlight box and its buttons
+        + show_tables            = outlines the tables found on the page
+        - draw_tables            = draws the outlines in the current rotation
+        - table_at               = the outlined table under a point of the canvas
         - scroll_x               = scroll img x
         - scroll_y               = scroll img y
+        - band                   = gets a band of the full size image as a PIL image
         - show_image             = shows the image on the canvas and allows zoom and pan
+        - to_tk                  = scales a tile and converts it for the canvas
         - on_button_press        = starts bounding box drawing
         - on_move_press          = expands rectangle as the cursor is moves
-        - on_button_release      = finishes the bounding box
+        - on_button_release      = finishes the bounding box, a click on an outlined
+                                   table highlights the whole table
         - move_from              = pan the image start
         - move_to                = pan the image end
         + outside                = detects if cursor is outside of image bounds
@@ -45,6 +56,9 @@ class CanvasImage:
         - keystroke              = attaches numpad to pan directions
         - get_img_mouse_pos      = gets the mouse position relative to image pixels
         + crop                   = crops the image
+        - table_crop             = gets the highlighted table as it is seen
+        - view_box               = the highlight box in the unrotated image pixels
+        + selected_box           = the highlight box as fractions of the page, for batches
         + destroy                = exits the app cleanly
 
     Attributes:
@@ -67,27 +81,41 @@ class CanvasImage:
         + ok_btn
         + del_btn
         - huge
-        - huge_size
+        + huge_pixels
+        - base_size
         - band_width
-        - offset
-        - tile
+        - mode
+        + rotation
+        - src_width
+        - src_height
         + imwidth
         + imheight
         - reduction
         + table_box
+        - tables
 
     """
 
-    def __init__(self, parent: Frame, img, extractor: TableExtractor, width=650):
+    def __init__(
+        self,
+        parent: Frame,
+        img,
+        extractor: TableExtractor,
+        width=650,
+        huge_pixels=HUGE_PIXELS,
+    ):
         """Initialize the ImageFrame"""
         self.__extractor = extractor
         self.width = width
+        self.huge_pixels = huge_pixels  # pages bigger than this are read in bands
+        self.__base_size = 4096  # longest side of the first pyramid image when huge
         self.__previous_state = 0  # previous state of the keyboard
         self.__imframe = ttk.Frame(parent)  # placeholder of the ImageFrame object
         self.__reduction = 2  # reduction degree of image pyramid
         self.__image = None
         self.container = None
         self.rect = None
+        self.__tables = []  # ( x1, y1, x2, y2 ) fractions of the unrotated page
         self.start_x = None
         self.start_y = None
         self.__scale = None
@@ -154,8 +182,11 @@ class CanvasImage:
         self.__create_box_buttons()
         self.refresh_img(img)
 
-    def refresh_img(self, img):
-        """Refreshes the image shown on the canvas"""
+    def refresh_img(self, img, rotation=0):
+        """
+        Refreshes the image shown on the canvas, rotation is how many counter
+        clockwise quarter turns the image is viewed with
+        """
         self.canvas.grid_forget()
         self.canvas.update()
 
@@ -173,57 +204,73 @@ class CanvasImage:
         loading.update()
 
         # print(img)
-        self.path = img  # np array of image
+        self.__tables = []
+        self.path = img  # np array of image, or a PageSource when the page is huge
 
-        self.imscale = 1.0  # scale for the canvas image zoom, public for outer classes
-
-        self.ok_btn.place_forget()
-        self.del_btn.place_forget()
-        if self.rect:
-            self.canvas.delete(self.rect)
-        self.rect = None
-        self.start_x = None
-        self.start_y = None
-        # Decide if this image huge or not
-        self.__huge = False  # huge or not
-        self.__huge_size = 14000  # define size of the huge image
+        self.rotation = rotation % 4  # view rotation, the image is never rotated
+        # Decide if this image huge or not, huge pages are never fully in memory
+        self.__huge = not isinstance(self.path, np.ndarray)  # lazy page from the file
         self.__band_width = 1024  # width of the tile band
         Image.MAX_IMAGE_PIXELS = (
             1000000000  # suppress DecompressionBombError for the big image
         )
-        with warnings.catch_warnings():  # suppress DecompressionBombWarning
-            warnings.simplefilter("ignore")
-            self.__image = Image.fromarray(self.path)  # open image, but down't load it
-        self.imwidth, self.imheight = self.__image.size  # public for outer classes
-        if (
-            self.imwidth * self.imheight > self.__huge_size * self.__huge_size
-            and self.__image.tile[0][0] == "raw"
-        ):  # only raw images could be tiled
-            self.__huge = True  # image is huge
-            self.__offset = self.__image.tile[0][2]  # initial tile offset
-            self.__tile = [
-                self.__image.tile[0][0],  # it have to be 'raw'
-                [0, 0, self.imwidth, 0],  # tile extent (a rectangle)
-                self.__offset,
-                self.__image.tile[0][3],
-            ]  # list of arguments to the decoder
-        # Create image pyramid
-        self.__pyramid = (
-            [self.smaller()] if self.__huge else [Image.fromarray(self.path)]
-        )
+        self.__src_height, self.__src_width = self.path.shape[:2]
+        if self.__src_width * self.__src_height > self.huge_pixels:
+            self.__huge = True  # image is huge, only read bands of it
+        self.__image = None
+        if not self.__huge:
+            with warnings.catch_warnings():  # suppress DecompressionBombWarning
+                warnings.simplefilter("ignore")
+                # grayscale pages come in as "L" and bool pages as "1", no copy is made
+                self.__image = Image.fromarray(self.path)
+        self.__mode = _pyramid_mode(self.__band(0, 1).mode)  # mode of reduced images
+        # Create image pyramid, huge images are streamed down to the base size
+        self.__pyramid = [self.smaller()] if self.__huge else [self.__image]
         # Set ratio coefficient for image pyramid
         self.__ratio = (
-            max(self.imwidth, self.imheight) / self.__huge_size if self.__huge else 1.0
+            max(self.__src_width, self.__src_height) / self.__base_size
+            if self.__huge
+            else 1.0
         )
-        self.__curr_img = 0  # current image from the pyramid
-        self.__scale = self.imscale * self.__ratio  # image pyramide scale
         w, h = self.__pyramid[-1].size
         while w > 512 and h > 512:  # top pyramid image is around 512 pixels in size
             w /= self.__reduction  # divide on reduction degree
             h /= self.__reduction  # divide on reduction degree
             self.__pyramid.append(
-                self.__pyramid[-1].resize((int(w), int(h)), self.__filter)
+                _to_mode(self.__pyramid[-1], self.__mode).resize(
+                    (int(w), int(h)), self.__filter
+                )
             )
+        self.__reset_view()
+        loading.grid_forget()
+        self.canvas.grid(row=0, column=0, sticky="nswe")
+        self.canvas.update()
+        self.canvas.focus_set()  # set focus on the canvas
+
+    def rotate(self, turns: int):
+        """
+        Rotate the view by counter clockwise quarter turns. Only the coordinates are
+        transformed, the pyramid is reused as is
+        """
+        self.rotation = (self.rotation + turns) % 4
+        self.__reset_view()
+
+    def __reset_view(self):
+        """Zoom out and put the image in its container in the current rotation"""
+        self.imwidth, self.imheight = _rotated_size(
+            (self.__src_width, self.__src_height), self.rotation
+        )  # size of the image as it is seen, public for outer classes
+        self.imscale = 1.0  # scale for the canvas image zoom, public for outer classes
+
+        self.ok_btn.place_forget()
+        self.del_btn.place_forget()
+        if self.rect:
+            self.canvas.delete(self.rect)
+        self.rect = None
+        self.start_x = None
+        self.start_y = None
+        self.__curr_img = 0  # current image from the pyramid
+        self.__scale = self.imscale * self.__ratio  # image pyramide scale
         # Put image into container rectangle and use it to set proper coordinates to the image
         if self.container:
             self.canvas.delete(self.container)
@@ -232,50 +279,45 @@ class CanvasImage:
         )
 
         self.table_box = [0, 0, 0, 0]
+        self.__draw_tables()
         self.__show_image()  # show image on the canvas
-        loading.grid_forget()
-        self.canvas.grid(row=0, column=0, sticky="nswe")
-        self.canvas.update()
-        self.canvas.focus_set()  # set focus on the canvas
 
     def smaller(self):
         """Resize image proportionally and return smaller image"""
-        w1, h1 = float(self.imwidth), float(self.imheight)
-        w2, h2 = float(self.__huge_size), float(self.__huge_size)
+        w1, h1 = float(self.__src_width), float(self.__src_height)
+        w2, h2 = float(self.__base_size), float(self.__base_size)
         aspect_ratio1 = w1 / h1
         aspect_ratio2 = w2 / h2  # it equals to 1.0
         if aspect_ratio1 == aspect_ratio2:
-            image = Image.new("RGB", (int(w2), int(h2)))
+            image = Image.new(self.__mode, (int(w2), int(h2)))
             k = h2 / h1  # compression ratio
             w = int(w2)  # band length
         elif aspect_ratio1 > aspect_ratio2:
-            image = Image.new("RGB", (int(w2), int(w2 / aspect_ratio1)))
+            image = Image.new(self.__mode, (int(w2), int(w2 / aspect_ratio1)))
             k = h2 / w1  # compression ratio
             w = int(w2)  # band length
         else:  # aspect_ratio1 < aspect_ration2
-            image = Image.new("RGB", (int(h2 * aspect_ratio1), int(h2)))
+            image = Image.new(self.__mode, (int(h2 * aspect_ratio1), int(h2)))
             k = h2 / h1  # compression ratio
             w = int(h2 * aspect_ratio1)  # band length
-        i, j = 0, 1
-        while i < self.imheight:
-            band = min(self.__band_width, self.imheight - i)  # width of the tile band
-            self.__tile[1][3] = band  # set band width
-            self.__tile[2] = (
-                self.__offset + self.imwidth * i * 3
-            )  # tile offset (3 bytes per pixel)
-            self.__image.close()
-            self.__image = Image.fromarray(self.path)  # reopen / reset image
-            self.__image.size = (self.imwidth, band)  # set size of the tile band
-            self.__image.tile = [self.__tile]  # set tile
-            cropped = self.__image.crop((0, 0, self.imwidth, band))  # crop tile band
+        i = 0
+        while i < self.__src_height:
+            band = min(self.__band_width, self.__src_height - i)  # width of tile band
+            cropped = _to_mode(self.__band(i, i + band), self.__mode)
             image.paste(
                 cropped.resize((w, int(band * k) + 1), self.__filter), (0, int(i * k))
             )
-            self.__image.close()
             i += band
-            j += 1
         return image
 
+    def __band(self, top: int, bottom: int, left=0, right=None) -> Image.Image:
+        """
+        Get a band of rows of the full size image, in the mode it is stored in.
+        For a huge page only this band is read from the file
+        """
+        right = self.__src_width if right is None else right
+        return Image.fromarray(self.path[top:bottom, left:right])
+
     def grid(self, **kw):
         """Put CanvasImage widget on the parent widget"""
         self.__imframe.grid(**kw)  # place CanvasImage widget on the grid
@@ -291,19 +333,57 @@ class CanvasImage:
         """Exception: cannot use place with this widget"""
         raise Exception("Cannot use place with the widget " + self.__class__.__name__)
 
+    def clear_box(self):
+        self.ok_btn.place_forget()
+        self.del_btn.place_forget()
+        self.canvas.delete(self.rect)
+        self.rect = None
+
+    def show_tables(self, boxes: List[tuple]):
+        """
+        Outline the tables found on the page, boxes are ( x1, y1, x2, y2 ) as
+        fractions of the unrotated page. Clicking in one highlights it
+        """
+        self.__tables = list(boxes)
+        self.__draw_tables()
+
+    def __draw_tables(self):
+        """the outlines are canvas items, so they zoom and pan with the image"""
+        self.canvas.delete("table")
+        cx1, cy1, cx2, cy2 = self.canvas.coords(self.container)
+        width, height = self.__src_width, self.__src_height
+        for x1, y1, x2, y2 in self.__tables:
+            box = _rotate_box(
+                (x1 * width, y1 * height, x2 * width, y2 * height),
+                (width, height),
+                self.rotation,
+            )
+            self.canvas.create_rectangle(
+                cx1 + box[0] * (cx2 - cx1) / self.imwidth,
+                cy1 + box[1] * (cy2 - cy1) / self.imheight,
+                cx1 + box[2] * (cx2 - cx1) / self.imwidth,
+                cy1 + box[3] * (cy2 - cy1) / self.imheight,
+                outline="green",
+                dash=(4, 4),
+                width=2,
+                tags="table",
+            )
+
+    def __table_at(self, x: float, y: float):
+        """canvas coords of the smallest outlined table around ( x, y ), or None"""
+        outlines = [self.canvas.coords(i) for i in self.canvas.find_withtag("table")]
+        found = [i for i in outlines if i[0] <= x <= i[2] and i[1] <= y <= i[3]]
+        if not found:
+            return None
+        return min(found, key=lambda i: (i[2] - i[0]) * (i[3] - i[1]))
+
     def __create_box_buttons(self):
         def del_rect():
-            self.ok_btn.place_forget()
-            self.del_btn.place_forget()
-            self.canvas.delete(self.rect)
-            self.rect = None
+            self.clear_box()
 
         def commit_rect():
-            self.ok_btn.place_forget()
-            self.del_btn.place_forget()
-            self.canvas.delete(self.rect)
-            self.rect = None
-            self.__extractor.extract_table(self.path, self.table_box)
+            self.clear_box()
+            self.__extractor.extract_table(*self.__table_crop())
 
         ok_img = Image.open("data/images/check.png")
         ok_img = ImageTk.PhotoImage(ok_img)
@@ -389,33 +469,33 @@ class CanvasImage:
             int(x2 - x1) > 0 and int(y2 - y1) > 0
         ):  # show image if it is in the visible area
             if self.__huge and self.__curr_img < 0:  # show huge image
-                h = int((y2 - y1) / self.imscale)  # height of the tile band
-                self.__tile[1][3] = h  # set the tile band height
-                self.__tile[2] = (
-                    self.__offset + self.imwidth * int(y1 / self.imscale) * 3
-                )
-                self.__image.close()
-                self.__image = Image.open(self.path)  # reopen / reset image
-                self.__image.size = (self.imwidth, h)  # set size of the tile band
-                self.__image.tile = [self.__tile]
-                image = self.__image.crop(
-                    (int(x1 / self.imscale), 0, int(x2 / self.imscale), h)
+                box = _unrotate_box(
+                    (
+                        int(x1 / self.imscale),
+                        int(y1 / self.imscale),
+                        int(x2 / self.imscale),
+                        int(y2 / self.imscale),
+                    ),
+                    (self.__src_width, self.__src_height),
+                    self.rotation,
                 )
+                image = self.__band(box[1], box[3], box[0], box[2])
             else:  # show normal image
-                image = self.__pyramid[
-                    max(0, self.__curr_img)
-                ].crop(  # crop current img from pyramid
+                pyramid_img = self.__pyramid[max(0, self.__curr_img)]
+                box = _unrotate_box(
                     (
                         int(x1 / self.__scale),
                         int(y1 / self.__scale),
                         int(x2 / self.__scale),
                         int(y2 / self.__scale),
-                    )
+                    ),
+                    pyramid_img.size,
+                    self.rotation,
                 )
+                image = pyramid_img.crop(box)  # crop current img from pyramid
+            image = _rotate(image, self.rotation)
 
-            imagetk = ImageTk.PhotoImage(
-                image.resize((int(x2 - x1), int(y2 - y1)), self.__filter)
-            )
+            imagetk = self.__to_tk(image, (int(x2 - x1), int(y2 - y1)))
             imageid = self.canvas.create_image(
                 max(
                     box_canvas[0], box_img_int[0]
@@ -432,6 +512,14 @@ class CanvasImage:
                 imagetk  # keep an extra reference to prevent garbage-collection
             )
 
+    def __to_tk(self, image: Image.Image, size: tuple) -> ImageTk.PhotoImage:
+        """
+        Resize a tile for the screen in the mode of the page. The pyramid and the
+        reduced image of smaller() are put in that mode with _to_mode as well
+        """
+        image = _to_mode(image, self.__mode)
+        return ImageTk.PhotoImage(image.resize(size, self.__filter))
+
     def __on_button_press(self, event: Event):
         # save mouse drag start position
 
@@ -500,9 +588,24 @@ class CanvasImage:
         self.table_box[3] = y - self.table_box[1]
         # print(self.table_box)
 
-    def __on_button_release(self, _):
-        """Reset the cursor style"""
+    def __on_button_release(self, event: Event):
+        """Reset the cursor style, a click inside a found table highlights it"""
         self.canvas["cursor"] = "tcross"
+        if event.num != 1 or not self.rect or self.start_x is None:
+            return
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        if abs(x - self.start_x) > 3 or abs(y - self.start_y) > 3:
+            return  # a box was dragged out
+        coords = self.__table_at(x, y)
+        if coords is None:
+            return
+        self.canvas.coords(self.rect, *coords)
+        cx1, cy1, cx2, cy2 = self.canvas.coords(self.container)
+        x1 = (coords[0] - cx1) * self.imwidth / (cx2 - cx1)
+        y1 = (coords[1] - cy1) * self.imheight / (cy2 - cy1)
+        x2 = (coords[2] - cx1) * self.imwidth / (cx2 - cx1)
+        y2 = (coords[3] - cy1) * self.imheight / (cy2 - cy1)
+        self.table_box = [x1, y1, x2 - x1, y2 - y1]
 
     def __move_from(self, event: Event):
         """Remember previous coordinates for scrolling with the mouse"""
@@ -623,7 +726,7 @@ class CanvasImage:
         can_width = self.canvas.winfo_width()
         can_height = self.canvas.winfo_height()
 
-        pyramid_adjust = 2 ** self.__curr_img
+        pyramid_adjust = 2**self.__curr_img
 
         spacing_x = ((box_canvas[0] - box_image[0]) / self.__scale) * pyramid_adjust
         spacing_y = ((box_canvas[1] - box_image[1]) / self.__scale) * pyramid_adjust
@@ -649,26 +752,120 @@ class CanvasImage:
         return img_x, img_y
 
     def crop(self, bbox: List):
-        """Crop rectangle from the image and return it"""
+        """Crop rectangle (in the rotated view) from the image and return it"""
+        box = _unrotate_box(bbox, (self.__src_width, self.__src_height), self.rotation)
         if self.__huge:  # image is huge and not totally in RAM
-            band = bbox[3] - bbox[1]  # width of the tile band
-            self.__tile[1][3] = band  # set the tile height
-            self.__tile[2] = (
-                self.__offset + self.imwidth * bbox[1] * 3
-            )  # set offset of the band
-            self.__image.close()
-            self.__image = Image.open(self.path)  # reopen / reset image
-            self.__image.size = (self.imwidth, band)  # set size of the tile band
-            self.__image.tile = [self.__tile]
-            return self.__image.crop((bbox[0], 0, bbox[2], band))
+            return _rotate(self.__band(box[1], box[3], box[0], box[2]), self.rotation)
+
+        return _rotate(self.__pyramid[0].crop(box), self.rotation)
+
+    def __table_crop(self) -> tuple:
+        """
+        The pixels under the highlight box as they are seen, for OCR.
+        Returns ( image, bounding box of the table in that image )
+        """
+        box = self.__view_box()
+        img = np.ascontiguousarray(
+            np.rot90(self.path[box[1] : box[3], box[0] : box[2]], self.rotation)
+        )
+        return img, [0, 0, img.shape[1], img.shape[0]]
+
+    def __view_box(self) -> tuple:
+        x1, x2 = sorted((self.table_box[0], self.table_box[0] + self.table_box[2]))
+        y1, y2 = sorted((self.table_box[1], self.table_box[1] + self.table_box[3]))
+        view_box = (
+            max(int(x1), 0),
+            max(int(y1), 0),
+            min(int(x2), self.imwidth),
+            min(int(y2), self.imheight),
+        )
+        return _unrotate_box(
+            view_box, (self.__src_width, self.__src_height), self.rotation
+        )
 
-        return self.__pyramid[0].crop(bbox)
+    def selected_box(self):
+        """
+        The highlight box as ( ( x1, y1, x2, y2 ) as fractions of the unrotated page,
+        rotation ), so the same region can be cut out of other pages of the drawing.
+        None if nothing is highlighted
+        """
+        if not self.rect:
+            return None
+        x1, y1, x2, y2 = self.__view_box()
+        if x2 <= x1 or y2 <= y1:
+            return None
+        width, height = self.__src_width, self.__src_height
+        return (x1 / width, y1 / height, x2 / width, y2 / height), self.rotation
 
     def destroy(self):
         """ImageFrame destructor"""
-        self.__image.close()
+        if self.__image:
+            self.__image.close()
         map(lambda i: i.close, self.__pyramid)  # close all pyramid images
         del self.__pyramid[:]  # delete pyramid list
         del self.__pyramid  # delete pyramid variable
         self.canvas.destroy()
         self.__imframe.destroy()
+
+
+def _pyramid_mode(mode: str) -> str:
+    """
+    Mode used for the reduced pyramid images, bilevel pages are kept as "L" once
+    they are scaled since antialiasing makes grays (PIL only scales "1" with NEAREST)
+    """
+    if mode in ("1", "L", "I;16", "I", "F"):
+        return "L"
+    return mode
+
+
+def _to_mode(image: Image.Image, mode: str) -> Image.Image:
+    """Convert an image only if it is not already in the given mode"""
+    if image.mode == mode:
+        return image
+    return image.convert(mode)
+
+
+def _rotated_size(size: tuple, turns: int) -> tuple:
+    """( width, height ) of an image after counter clockwise quarter turns"""
+    return (size[1], size[0]) if turns % 2 else size
+
+
+def _unrotate_box(box: tuple, size: tuple, turns: int) -> tuple:
+    """
+    Map a box ( x1, y1, x2, y2 ) in the rotated view back onto the unrotated image
+    of size ( width, height ). Turns are counter clockwise like np.rot90
+    """
+    x1, y1, x2, y2 = box
+    width, height = size
+    if turns == 1:
+        return (width - y2, x1, width - y1, x2)
+    if turns == 2:
+        return (width - x2, height - y2, width - x1, height - y1)
+    if turns == 3:
+        return (y1, height - x2, y2, height - x1)
+    return (x1, y1, x2, y2)
+
+
+def _rotate_box(box: tuple, size: tuple, turns: int) -> tuple:
+    """
+    Map a box ( x1, y1, x2, y2 ) on the unrotated image of size ( width, height )
+    into the rotated view, the inverse of _unrotate_box
+    """
+    x1, y1, x2, y2 = box
+    width, height = size
+    if turns == 1:
+        return (y1, width - x2, y2, width - x1)
+    if turns == 2:
+        return (width - x2, height - y2, width - x1, height - y1)
+    if turns == 3:
+        return (height - y2, x1, height - y1, x2)
+    return (x1, y1, x2, y2)
+
+
+def _rotate(image: Image.Image, turns: int) -> Image.Image:
+    """Rotate a PIL image by counter clockwise quarter turns"""
+    if turns == 0:
+        return image
+    return image.transpose(
+        (Image.ROTATE_90, Image.ROTATE_180, Image.ROTATE_270)[turns - 1]
+    )
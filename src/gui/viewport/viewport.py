@@ -4,11 +4,12 @@ https://stackoverflow.com/questions/59696557/tkinter-button-different-commands-o
 It is pretty heavily modified however
 """
 
-from tkinter import Frame, Menu, Variable
-import numpy as np
+from tkinter import Frame, Menu
 from data_manager.data_manager import DataWriter, DataReader
 from extractor.extractor import TableExtractor
+from gui.components.event_bus.event_bus import EventBus
 from gui.components.label_frame.label_frame import LabelFrame
+from gui.components.load_coordinator.load_coordinator import LoadCoordinator
 from .canvas_image.canvas_image import CanvasImage
 
 
@@ -20,19 +21,44 @@ class DrawingViewport(Frame):
 
     Methods:
         + show_imgs            = shows the drawing that is passed to it
+        + page_rewritten       = reloads a page that was rewritten if it is shown
         - make_menu            = make right click menu
         - right_click_popup    = create the menu popup
-        - rotate_clock         = rotate image clockwise and save new image
-        - rotate_counter       = rotate image counterclockwise and save new image
+        - set_page             = go to a page and load it
+        - change_page          = load the current page in the background
+        - show_page            = put a loaded page into the canvas, or clear it if
+                                 the drawing has no pages yet
+        - rotate_clock         = rotate view clockwise and save the rotation
+        - rotate_counter       = rotate view counterclockwise and save the rotation
+        - rotate               = rotate the view and save the rotation
+        - compact_rotation     = rotate the saved image to match the view in background
+        - add_region           = queue the highlighted region of this page for a batch
+        - add_region_all_pages = queue the highlighted region of every page for a batch
+        - add_pages            = queue the highlighted region on the pages given
+        - add_found_tables     = queue the tables found on this page for a batch
+        - add_found_tables_all_pages = queue the tables found on every page for a batch
+        - add_tables           = queue tables read from the file for a batch
+        - extract_batch        = extract every queued region as one job
+        - clear_batch          = forget the queued regions
+        - batch_changed        = shows how many regions are queued in the menu
+        - load_page            = reads a page for the batch job, on its worker thread
         - next_pg              = switch viewport image to the next in the drawing
         - prev_pg              = switch viewport image to the previous in the drawing
 
     Attributes:
         + debug
+        + bus
         + images
         + img_names
         + drawing_id
+        + cur_pg
+        + total_pg
+        - blank
+        - batch
+        - shown
         - data_manager
+        - loader
+        - extractor
         - view_frame
         - control_frame
         - canvas
@@ -47,9 +73,12 @@ class DrawingViewport(Frame):
         data_writer: DataWriter,
         data_reader: DataReader,
         extractor: TableExtractor,
+        loader: LoadCoordinator,
+        bus: EventBus,
         debug=False,
     ):
         self.debug = debug
+        self.bus = bus
 
         """Initialize the main Frame"""
         Frame.__init__(self, master)
@@ -57,11 +86,15 @@ class DrawingViewport(Frame):
         # Define Variables
         self.__data_writer = data_writer  # fix this from writing
         self.__data_reader = data_reader
+        self.__loader = loader
+        self.__extractor = extractor
+        self.__batch = []  # ( drawing_id, page, box, rotation ) waiting to be extracted
         self.image = None
         self.drawing_id = ""
-        self.cur_pg = Variable(value=1)
-        self.cur_pg.trace_add("write", self.__change_page)
-        self.total_pg = Variable(value=1)
+        self.__shown = ("", "")  # ( drawing_id, page_name ) of the page in the canvas
+        self.__blank = path  # shown when a drawing has no pages to show
+        self.cur_pg = 1
+        self.total_pg = 1
 
         # Define Frames
         self.__view_frame = Frame(self)
@@ -86,15 +119,44 @@ class DrawingViewport(Frame):
     def show_imgs(self, drawing_id: str, drawing_name: str):
         self.drawing_id = drawing_id
         self.__control_frame.label_text.set(value="Drawing " + drawing_name)
-        self.cur_pg.set(value=1)
+        self.__set_page(1)
+
+    def __set_page(self, pg: int):
+        self.cur_pg = pg
+        self.__control_frame.set_pages(self.cur_pg, self.total_pg)
+        self.__change_page()
 
     def __change_page(self, *_):
-        self.image, total_imgs = self.__data_reader.get_img(
-            self.drawing_id, self.cur_pg.get()
+        """
+        pages are read in the background, when pages are flipped or drawings are
+        picked quickly only the last one is shown
+        """
+        drawing_id, page = self.drawing_id, self.cur_pg
+        self.__loader.request(
+            "page",
+            lambda: (
+                drawing_id,
+                page,
+                self.__data_reader.get_img(drawing_id, page),
+                self.__data_reader.get_tables(drawing_id, page),
+            ),
+            self.__show_page,
         )
-        if total_imgs != self.total_pg.get():
-            self.total_pg.set(value=total_imgs)
-        self.__canvas.refresh_img(self.image)
+
+    def __show_page(self, loaded: tuple):
+        if loaded[2] is None:
+            # an assembly, or a part whose pages are still being imported
+            self.image, self.total_pg, self.__shown = None, 1, ("", "")
+            self.__control_frame.set_pages(self.cur_pg, self.total_pg)
+            self.__canvas.refresh_img(self.__blank)
+            return
+        drawing_id, page, (self.image, total_imgs, rotation), tables = loaded
+        if total_imgs != self.total_pg:
+            self.total_pg = total_imgs
+            self.__control_frame.set_pages(self.cur_pg, self.total_pg)
+        self.__shown = (drawing_id, drawing_id + f"-{page - 1}")
+        self.__canvas.refresh_img(self.image, rotation)
+        self.__canvas.show_tables([i[1] for i in tables])
 
     def __make_menu(self):
         self.__drop_menu = Menu(self.__view_frame, tearoff=0)
@@ -104,6 +166,31 @@ class DrawingViewport(Frame):
         self.__drop_menu.add_command(
             label="Rotate Counter Clockwise", command=self.__rotate_counter
         )
+        self.__drop_menu.add_separator()
+        self.__drop_menu.add_command(
+            label="Save Rotation To Image", command=self.__compact_rotation
+        )
+        self.__drop_menu.add_separator()
+        self.__drop_menu.add_command(
+            label="Add Region To Batch", command=self.__add_region
+        )
+        self.__drop_menu.add_command(
+            label="Add Region On Every Page To Batch",
+            command=self.__add_region_all_pages,
+        )
+        self.__drop_menu.add_command(
+            label="Add Found Tables To Batch", command=self.__add_found_tables
+        )
+        self.__drop_menu.add_command(
+            label="Add Found Tables On Every Page To Batch",
+            command=self.__add_found_tables_all_pages,
+        )
+        self.__drop_menu.add_command(
+            label="Extract Batch", command=self.__extract_batch, state="disabled"
+        )
+        self.__drop_menu.add_command(
+            label="Clear Batch", command=self.__clear_batch, state="disabled"
+        )
         self.__canvas.canvas.bind("<Button-3>", self.__right_click_popup)
 
     def __right_click_popup(self, event):
@@ -113,27 +200,93 @@ class DrawingViewport(Frame):
             self.__drop_menu.grab_release()
 
     def __rotate_clock(self):
-        self.image = np.rot90(self.image, 3)
-        self.__canvas.refresh_img(self.image)
-        self.__data_writer.insert_image(
-            self.drawing_id, self.drawing_id + f"-{self.cur_pg.get()}", self.image
-        )
+        self.__rotate(-1)
 
     def __rotate_counter(self):
-        self.image = np.rot90(self.image)
-        self.__canvas.refresh_img(self.image)
-        self.__data_writer.insert_image(
-            self.drawing_id, self.drawing_id + f"-{self.cur_pg.get()}", self.image
+        self.__rotate(1)
+
+    def __rotate(self, turns: int):
+        """rotation is only a view transform, it is saved as an attribute of the page"""
+        self.__canvas.rotate(turns)
+        if self.__shown[1]:
+            self.__data_writer.set_rotation(*self.__shown, self.__canvas.rotation)
+
+    def page_rewritten(self, drawing_id: str, page_name: str):
+        if self.__shown == (drawing_id, page_name):
+            self.__change_page()
+
+    def __compact_rotation(self):
+        """rewrite the page pixels in its rotation in the background"""
+        drawing_id, page_name = self.__shown
+        if not page_name:
+            return
+
+        def done():
+            # called from the writer thread, the reload happens on the tk thread
+            self.bus.post("page_rewritten", drawing_id, page_name)
+
+        self.__data_writer.compact_rotation(drawing_id, page_name, done)
+
+    def __add_region(self):
+        self.__add_pages([self.cur_pg])
+
+    def __add_region_all_pages(self):
+        self.__add_pages(range(1, self.total_pg + 1))
+
+    def __add_pages(self, pages):
+        selected = self.__canvas.selected_box()
+        if selected is None or not self.drawing_id:
+            return
+        box, rotation = selected
+        self.__batch.extend((self.drawing_id, pg, box, rotation) for pg in pages)
+        self.__canvas.clear_box()
+        self.__batch_changed()
+
+    def __add_found_tables(self):
+        self.__add_tables(self.cur_pg)
+
+    def __add_found_tables_all_pages(self):
+        self.__add_tables(None)
+
+    def __add_tables(self, page):
+        """
+        queue the tables found on a page, or every page when page is None, in the
+        rotation each page is seen in
+        """
+        if not self.drawing_id:
+            return
+        drawing_id = self.drawing_id
+        for pg, box, rotation in self.__data_reader.get_tables(drawing_id, page):
+            self.__batch.append((drawing_id, pg, box, rotation))
+        self.__batch_changed()
+
+    def __extract_batch(self):
+        if self.__batch:
+            self.__extractor.extract_batch(self.__batch, self.__load_page)
+        self.__clear_batch()
+
+    def __clear_batch(self):
+        self.__batch = []
+        self.__batch_changed()
+
+    def __batch_changed(self):
+        count = len(self.__batch)
+        state = "normal" if count else "disabled"
+        self.__drop_menu.entryconfigure(
+            "Extract Batch*", label=f"Extract Batch ({count} regions)", state=state
         )
+        self.__drop_menu.entryconfigure("Clear Batch", state=state)
+
+    def __load_page(self, drawing_id: str, page: int):
+        loaded = self.__data_reader.get_img(drawing_id, page)
+        return None if loaded is None else loaded[0]
 
     def __next_pg(self):
-        pg = self.cur_pg.get()
-        if pg < self.total_pg.get():
-            self.cur_pg.set(pg + 1)
+        if self.cur_pg < self.total_pg:
+            self.__set_page(self.cur_pg + 1)
             # self.__canvas.refresh_img(self.images[pg - 1])
 
     def __prev_pg(self):
-        pg = self.cur_pg.get()
-        if pg > 1:
-            self.cur_pg.set(pg - 1)
+        if self.cur_pg > 1:
+            self.__set_page(self.cur_pg - 1)
             # self.__canvas.refresh_img(self.images[pg - 1])
@@ -0,0 +1,106 @@
+"""
+This module reports what the application spends its start up time on
+
+Run it from the src folder:
+    python startup_report.py                = import time report and start up benchmark
+    python startup_report.py gui.gui 20     = report for one module, top 20 packages
+
+The import report runs python with -X importtime in a fresh process and adds up the
+time by top level package. The benchmark times fresh processes from start until the
+Tk window has been drawn, so slow imports show up before they are shipped.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from typing import List
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+
+# these are only needed for OCR and adding pdfs, they should never load on start
+HEAVY_MODULES = ["cv2", "pytesseract", "pdf2image", "PyPDF2"]
+
+STARTUP_CODE = """
+import time
+start = time.perf_counter()
+from gui.gui import GUI
+app = GUI()
+app.root.update()
+print(time.perf_counter() - start)
+app.root.destroy()
+"""
+
+
+def import_times(module="gui.gui") -> List[tuple]:
+    """
+    import module in a new process with -X importtime, returns
+    ( package, self seconds, number of modules ) for each top level package,
+    slowest first
+    """
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        package = name.strip().split(".")[0]
+        seconds, count = totals.get(package, (0.0, 0))
+        totals[package] = (seconds + int(self_us) / 1e6, count + 1)
+    return sorted(
+        ((k, v[0], v[1]) for k, v in totals.items()), key=lambda i: i[1], reverse=True
+    )
+
+
+def loaded_modules(module="gui.gui") -> List[str]:
+    """every module loaded in a new process after importing module"""
+    res = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sys.modules)"],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return res.stdout.split()
+
+
+def startup_time(runs=5) -> float:
+    """median seconds from starting python until the first window is drawn"""
+    times = []
+    for _ in range(runs):
+        res = subprocess.run(
+            [sys.executable, "-c", STARTUP_CODE],
+            cwd=SRC,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        times.append(float(res.stdout.split()[-1]))
+    return statistics.median(times)
+
+
+def main(argv: List[str]) -> None:
+    module = argv[1] if len(argv) > 1 else "gui.gui"
+    top = int(argv[2]) if len(argv) > 2 else 15
+    packages = import_times(module)
+    total = sum(i[1] for i in packages)
+    print(f"importing {module} took {total:.3f}s")
+    for package, seconds, count in packages[:top]:
+        print(f"  {package:<24}{seconds:8.3f}s {count:5d} modules")
+    heavy = [i for i in HEAVY_MODULES if i in loaded_modules(module)]
+    if heavy:
+        print(f"loaded on start but only needed later: {', '.join(heavy)}")
+    try:
+        print(f"start up until the window is drawn: {startup_time():.3f}s")
+    except subprocess.CalledProcessError as e:
+        # no display to open a window on
+        print(f"start up benchmark failed \n{e.stderr.strip().splitlines()[-1]}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,22 @@
+"""
+Fixtures shared by the tests of the ui components
+"""
+import gc
+from tkinter import Tcl
+
+import pytest
+
+
+@pytest.fixture
+def root():
+    """
+    a tcl interpreter that is freed on the test thread when the test ends, a Tcl
+    without tk has no destroy command so its pending callbacks are cancelled and
+    the last reference is collected here rather than on a worker thread
+    """
+    interp = Tcl()
+    yield interp
+    for i in interp.tk.splitlist(interp.tk.call("after", "info")):
+        interp.after_cancel(i)
+    del interp
+    gc.collect()
@@ -0,0 +1,46 @@
+"""
+Tests for the event bus between the parts of the ui
+"""
+import os
+import sys
+import time
+from threading import Thread, get_ident
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from gui.components.event_bus.event_bus import EventBus
+
+
+def test_events_from_threads_are_sent_on_the_tk_thread_and_coalesced(root) -> None:
+    bus = EventBus(root)
+    received = []
+    bus.subscribe("progress", lambda percent: received.append((percent, get_ident())))
+    bus.subscribe("done", lambda data: received.append((data, get_ident())))
+
+    def work():
+        for i in range(100):
+            bus.post("progress", i, coalesce=True)
+        bus.post("done", "table")
+
+    worker = Thread(target=work)
+    worker.start()
+    worker.join()
+    end = time.time() + 5
+    while len(received) < 2 and time.time() < end:
+        root.update()
+        time.sleep(0.005)
+    bus.close()
+
+    assert received == [(99, get_ident()), ("table", get_ident())]
+
+
+def test_events_that_are_not_coalesced_are_all_sent_in_order(root) -> None:
+    bus = EventBus(root)
+    received = []
+    bus.subscribe("added_drawing", lambda *args: received.append(args))
+    bus.post("added_drawing", "1", "a.pdf", False)
+    bus.post("added_drawing", "2", "b.pdf", True)
+    bus.pump()
+    bus.close()
+
+    assert received == [("1", "a.pdf", False), ("2", "b.pdf", True)]
@@ -0,0 +1,96 @@
+"""
+Tests for the background jobs of the application
+"""
+import os
+import sys
+import time
+from threading import Event
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from gui.components.event_bus.event_bus import EventBus
+from gui.components.job_manager.job_manager import (
+    CANCELLED,
+    DONE,
+    JobManager,
+)
+
+
+@pytest.fixture
+def manager(root):
+    """( bus, make ), every JobManager made is closed before the root is destroyed"""
+    bus = EventBus(root)
+    managers = []
+
+    def make(**kwargs):
+        managers.append(JobManager(bus, **kwargs))
+        return managers[-1]
+
+    yield bus, make
+    for i in managers:
+        i.close()
+    bus.close()
+
+
+def wait_for(root, check) -> None:
+    end = time.time() + 5
+    while not check() and time.time() < end:
+        root.update()
+        time.sleep(0.005)
+
+
+def test_jobs_run_by_priority_and_can_be_cancelled(root, manager) -> None:
+    _, make = manager
+    jobs = make(max_workers=1)
+    release, started, ran, finished = Event(), Event(), [], []
+
+    def blocking(job):
+        started.set()
+        release.wait(5)
+        return "first"
+
+    def counting(job):
+        ran.append(job.title)
+        for i in range(100):
+            job.progress(i)
+        return job.title
+
+    first = jobs.submit("first", blocking, done=finished.append)
+    started.wait(5)
+    low = jobs.submit("low", counting, done=finished.append)
+    high = jobs.submit("high", counting, done=finished.append, priority=1)
+    dropped = jobs.submit("dropped", counting, done=finished.append)
+    jobs.cancel(dropped.job_id)
+    assert [i.title for i in jobs.jobs()] == ["first", "high", "low", "dropped"]
+
+    jobs.set_priority(low.job_id, 2)
+    release.set()
+    wait_for(root, lambda: len(finished) == 3)
+
+    assert ran == ["low", "high"]
+    assert finished == ["first", "low", "high"]
+    assert [first.state, low.state, high.state] == [DONE, DONE, DONE]
+    assert dropped.state == CANCELLED
+
+
+def test_a_running_job_stops_when_it_next_reports_progress(root, manager) -> None:
+    _, make = manager
+    jobs = make()
+    started, finished = Event(), []
+
+    def endless(job):
+        started.set()
+        while True:
+            job.progress(1)
+            time.sleep(0.001)
+
+    job = jobs.submit("endless", endless, done=finished.append)
+    started.wait(5)
+    jobs.cancel(job.job_id)
+    wait_for(root, job.finished)
+    root.update()
+
+    assert job.state == CANCELLED
+    assert finished == []
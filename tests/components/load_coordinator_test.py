@@ -0,0 +1,70 @@
+"""
+Tests for the debounced background loads of the ui
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from gui.components.load_coordinator.load_coordinator import LoadCoordinator
+
+
+def test_only_the_latest_request_is_loaded_and_rendered(root) -> None:
+    loader = LoadCoordinator(root, delay=20)
+    loaded, rendered = [], []
+
+    def request(value):
+        loader.request("page", lambda: loaded.append(value) or value, rendered.append)
+
+    for i in range(5):
+        request(i)
+    end = time.time() + 5
+    while not rendered and time.time() < end:
+        root.update()
+        time.sleep(0.005)
+
+    loader.close()
+
+    assert loaded == [4]
+    assert rendered == [4]
+
+
+def test_a_render_that_fails_does_not_stop_later_loads(root) -> None:
+    loader = LoadCoordinator(root, delay=1)
+    rendered = []
+
+    def fail(_):
+        raise TypeError("nothing to show")
+
+    loader.request("page", lambda: None, fail)
+    loader.request("table", lambda: time.sleep(0.05) or 1, rendered.append)
+    end = time.time() + 5
+    while len(rendered) < 1 and time.time() < end:
+        root.update()
+        time.sleep(0.005)
+
+    loader.close()
+
+    assert rendered == [1]
+
+
+def test_close_stops_the_workers(root) -> None:
+    before = set(threading.enumerate())
+    loader = LoadCoordinator(root, delay=1)
+    rendered = []
+    loader.request("page", lambda: 1, rendered.append)
+    end = time.time() + 5
+    while not rendered and time.time() < end:
+        root.update()
+        time.sleep(0.005)
+    workers = set(threading.enumerate()) - before
+    assert workers
+
+    loader.request("page", lambda: 2, rendered.append)
+    loader.close()
+    root.update()
+
+    assert rendered == [1]
+    assert not any(i.is_alive() for i in workers)
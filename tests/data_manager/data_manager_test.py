@@ -0,0 +1,308 @@
+"""
+Tests for reading and writing the .bci data file
+"""
+import os
+import sys
+import time
+from threading import Event
+import h5py
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from data_manager import data_manager, user_table, write_queue
+from data_manager.data_manager import DataReader, DataWriter, PageSource
+from data_manager.page_cache import PageCache
+from data_manager.write_queue import WriteQueue
+
+
+def make_file(tmp_path) -> str:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    DataWriter(filename)
+    return filename
+
+
+def test_huge_page_is_read_lazily(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    page = np.arange(300 * 200, dtype=np.uint8).reshape((300, 200))
+    DataWriter(filename).insert_image("1", "1-0", page)
+
+    img, num_pgs, _ = DataReader(filename, huge_pixels=100).get_img("1", 1)
+
+    assert num_pgs == 1
+    assert isinstance(img, PageSource)
+    assert img.shape == (300, 200)
+    assert np.array_equal(img[10:20, 5:50], page[10:20, 5:50])
+    assert np.array_equal(np.asarray(img), page)
+
+
+def test_small_page_is_read_whole(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    page = np.zeros((30, 20), dtype=np.uint8)
+    DataWriter(filename).insert_image("1", "1-0", page)
+
+    img, _, _ = DataReader(filename).get_img("1", 1)
+
+    assert isinstance(img, np.ndarray)
+    assert np.array_equal(img, page)
+
+
+def test_rotation_is_an_attribute_until_compacted(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    page = np.arange(30 * 20, dtype=np.uint8).reshape((30, 20))
+    writer = DataWriter(filename)
+    writer.insert_image("1", "1-0", page)
+
+    writer.set_rotation("1", "1-0", -1)
+    img, _, rotation = DataReader(filename).get_img("1", 1)
+    assert rotation == 3
+    assert np.array_equal(img, page)
+
+    done = Event()
+    writer.compact_rotation("1", "1-0", done.set)
+    assert done.wait(10)
+    img, _, rotation = DataReader(filename).get_img("1", 1)
+    assert rotation == 0
+    assert np.array_equal(img, np.rot90(page, 3))
+
+
+def test_a_rotation_made_while_compacting_is_kept(tmp_path, monkeypatch) -> None:
+    filename = make_file(tmp_path)
+    page = np.arange(30 * 20, dtype=np.uint8).reshape((30, 20))
+    writer = DataWriter(filename)
+    writer.insert_image("1", "1-0", page)
+    writer.set_rotation("1", "1-0", 3)
+    rotated_band = data_manager._rotated_band
+
+    def turned_back(dataset, *args):
+        dataset.attrs["rotation"] = 0  # the user turns the page back mid way
+        return rotated_band(dataset, *args)
+
+    monkeypatch.setattr(data_manager, "_rotated_band", turned_back)
+    done = Event()
+    writer.compact_rotation("1", "1-0", done.set)
+    assert done.wait(10)
+    img, _, rotation = DataReader(filename).get_img("1", 1)
+    assert rotation == 1
+    assert np.array_equal(np.rot90(img, rotation), page)
+
+
+def test_table_boxes_are_rotated_with_the_page_when_compacted(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    writer = DataWriter(filename)
+    writer.insert_image("1", "1-0", np.zeros((30, 20), dtype=np.uint8))
+    writer.set_tables("1", "1-0", [(0.1, 0.2, 0.5, 0.4)])
+    writer.set_rotation("1", "1-0", 1)
+
+    done = Event()
+    writer.compact_rotation("1", "1-0", done.set)
+    assert done.wait(10)
+    ((_, box, rotation),) = DataReader(filename).get_tables("1", 1)
+    assert rotation == 0
+    assert np.allclose(box, (0.2, 0.5, 0.4, 0.9))
+
+
+def test_pages_are_memory_mapped_from_the_cache(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    cache = PageCache(filename, directory=str(tmp_path / "cache"))
+    page = np.arange(30 * 20, dtype=np.uint8).reshape((30, 20))
+    writer = DataWriter(filename, cache=cache)
+    writer.insert_image("1", "1-0", page)
+
+    img, _, _ = DataReader(filename, cache=cache).get_img("1", 1)
+    assert isinstance(img, np.memmap)
+    assert np.array_equal(img, page)
+
+    # new pixels give the page a new stamp, so the old copy isn't used
+    writer.insert_image("1", "1-0", page[::-1])
+    img, _, _ = DataReader(filename, cache=cache).get_img("1", 1)
+    assert np.array_equal(img, page[::-1])
+    assert len(os.listdir(cache.directory)) == 1
+
+
+def test_a_page_missing_from_the_cache_is_shown_before_it_is_cached(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    page = np.arange(30 * 20, dtype=np.uint8).reshape((30, 20))
+    DataWriter(filename).insert_image("1", "1-0", page)
+    cache = PageCache(filename, directory=str(tmp_path / "cache"))
+    reader = DataReader(filename, huge_pixels=100, cache=cache)
+
+    img, _, _ = reader.get_img("1", 1)
+    assert isinstance(img, PageSource)
+    assert np.array_equal(img[:], page)
+
+    end = time.time() + 10
+    while not isinstance(img, np.memmap) and time.time() < end:
+        time.sleep(0.01)
+        img, _, _ = reader.get_img("1", 1)
+    assert isinstance(img, np.memmap)
+    assert np.array_equal(img, page)
+
+
+def test_cache_evicts_least_recently_used(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    cache = PageCache(filename, directory=str(tmp_path / "cache"))
+    page = np.zeros((20, 20), dtype=np.uint8)
+    for i in range(3):
+        cache.put(f"/images/1/1-{i}", "a", page)
+    for i, name in enumerate(["1-1", "1-0", "1-2"]):
+        os.utime(cache.get(f"/images/1/{name}", "a").filename, (i, i))
+
+    cache.max_bytes = 1100
+    cache.evict()
+
+    assert cache.get("/images/1/1-1", "a") is None
+    assert cache.get("/images/1/1-0", "a") is not None
+    assert cache.get("/images/1/1-2", "a") is not None
+
+
+def test_bilevel_pages_are_packed(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    page = np.full((30, 21), 250, dtype=np.uint8)
+    page[5:9, 3:17] = 10
+    writer = DataWriter(filename)
+    writer.insert_image("1", "1-0", page, bilevel=True)
+
+    with h5py.File(filename, "r") as f:
+        assert f["images/1/1-0"].shape == (30, 3)
+    expected = np.where(page > 128, 255, 0).astype(np.uint8)
+    img, _, _ = DataReader(filename).get_img("1", 1)
+    assert np.array_equal(img, expected)
+    img, _, _ = DataReader(filename, huge_pixels=100).get_img("1", 1)
+    assert img.shape == (30, 21)
+    assert np.array_equal(img[4:10, 5:13], expected[4:10, 5:13])
+
+    writer.set_rotation("1", "1-0", 1)
+    done = Event()
+    writer.compact_rotation("1", "1-0", done.set)
+    assert done.wait(10)
+    img, _, _ = DataReader(filename).get_img("1", 1)
+    assert np.array_equal(img, np.rot90(expected))
+
+
+def test_queued_user_data_is_merged_and_flushed(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    queue = WriteQueue(DataWriter(filename))
+
+    queue.put_user_data("1", "material", {"Material": "A", "Notes": "old"})
+    queue.put_user_data("1", "material", {"Notes": "new"})
+    queue.put_user_data("2", "plating", {"Plating Spec": "X"})
+    overlay = queue.overlay("1", {"material": [("Grade", "5")]})
+    assert dict(overlay["material"])["Notes"] == "new"
+    assert queue.flush(timeout=10)
+
+    reader = DataReader(filename)
+    material = dict(reader.get_user_data("1")["material"])
+    assert material["Material"] == "A" and material["Notes"] == "new"
+    assert dict(reader.get_user_data("1")["plating"])["Notes"] == ""
+    assert dict(reader.get_user_data("2")["plating"])["Plating Spec"] == "X"
+    assert queue.pending("1") == {}
+    queue.close(timeout=10)
+
+
+def test_a_batch_that_fails_is_kept_queued_and_reported(tmp_path, monkeypatch) -> None:
+    filename = make_file(tmp_path)
+    monkeypatch.setattr(write_queue, "RETRY_SECONDS", 0.2)
+    failures, posted = [False], []
+
+    class FailingWriter(DataWriter):
+        def insert_user_data_batch(self, batch: dict) -> bool:
+            if failures:
+                return failures.pop()
+            return super().insert_user_data_batch(batch)
+
+    class Bus:
+        def post(self, topic, *args):
+            posted.append((topic, *args))
+
+    queue = WriteQueue(FailingWriter(filename), Bus())
+    queue.put_user_data("1", "material", {"Material": "A"})
+    assert not queue.flush(timeout=10)
+    assert queue.pending("1") == {"material": {"Material": "A"}}
+    end = time.time() + 10
+    while queue.pending("1") and time.time() < end:
+        time.sleep(0.01)
+
+    reader = DataReader(filename)
+    assert dict(reader.get_user_data("1")["material"])["Material"] == "A"
+    assert posted == [("write_failed", ["1"])]
+    read = queue.read("1", reader.get_user_data)
+    assert dict(read["material"])["Material"] == "A"
+    queue.close(timeout=10)
+
+
+def test_rows_of_the_parts_are_kept_between_reads(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    writer = DataWriter(filename)
+    writer.insert_user_data_batch({"1": {"paint": {"Color": "red"}}})
+    with h5py.File(filename, "r") as f:
+        rows = user_table.part_rows(f)
+        assert rows == {"1": 0}
+
+    writer.insert_user_data_batch({"2": {"paint": {"Color": "blue"}}})
+    with h5py.File(filename, "r") as f:
+        assert user_table.part_rows(f) is rows
+        assert rows == {"1": 0, "2": 1}
+    assert dict(DataReader(filename).get_user_data("2")["paint"])["Color"] == "blue"
+
+    # a new file at the same path isn't read with the rows of the old one
+    h5py.File(filename, "w").close()
+    DataWriter(filename).insert_user_data_batch({"3": {"paint": {"Color": "red"}}})
+    with h5py.File(filename, "r") as f:
+        assert user_table.part_rows(f) == {"3": 0}
+
+
+def test_user_table_bulk_queries(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    writer = DataWriter(filename)
+    writer.insert_user_data_batch(
+        {
+            str(i): {"plating": {"Plating Spec": "X" if i % 3 else "Y"}}
+            for i in range(10)
+        }
+    )
+    writer.insert_user_data("4", "plating", {"Plating Spec": "Y", "Notes": "n"})
+
+    reader = DataReader(filename)
+    found = reader.find_parts("plating", "Plating Spec", "Y")
+    assert found == ["0", "3", "4", "6", "9"]
+    part_ids, fields, values = reader.get_user_table("plating", ["Notes"])
+    assert fields == ["Notes"]
+    assert values.shape == (10, 1)
+    assert values[list(part_ids).index("4"), 0] == "n"
+
+
+def test_old_user_data_is_migrated(tmp_path) -> None:
+    filename = str(tmp_path / "old.bci")
+    with h5py.File(filename, "w") as f:
+        f.create_dataset("user_data/7", data=[])
+        f["user_data/7"].attrs["Notes"] = "kept"
+        f["user_data/7"].attrs["Plating Spec"] = "X"
+
+    DataWriter(filename)
+
+    data = DataReader(filename).get_user_data("7")
+    assert dict(data["plating"])["Plating Spec"] == "X"
+    assert dict(data["material"])["Notes"] == "kept"
+    with h5py.File(filename, "r") as f:
+        assert "user_data" not in f
+
+
+def test_tables_found_on_pages_are_page_attributes(tmp_path) -> None:
+    filename = make_file(tmp_path)
+    writer = DataWriter(filename)
+    for i in range(3):
+        writer.insert_image("1", f"1-{i}", np.zeros((30, 20), dtype=np.uint8))
+    writer.set_tables("1", "1-2", [(0.5, 0.0, 1.0, 0.25), (0.0, 0.5, 0.5, 1.0)])
+    writer.set_tables("1", "1-0", [])
+    writer.set_rotation("1", "1-2", 1)
+    reader = DataReader(filename)
+
+    assert reader.count_pages("1") == 3
+    assert reader.get_tables("1") == [
+        (3, (0.5, 0.0, 1.0, 0.25), 1),
+        (3, (0.0, 0.5, 0.5, 1.0), 1),
+    ]
+    assert reader.get_tables("1", 1) == []
+    assert reader.get_tables("2") == []
@@ -0,0 +1,57 @@
+"""
+Tests for exporting a project as a flat bill of materials
+"""
+import csv
+import os
+import sys
+import h5py
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from data_manager.data_manager import DataReader, DataWriter
+from data_manager import exporter
+from data_manager.exporter import HEADER, export
+
+
+def test_export_csv_has_a_row_per_part_in_tree_order(tmp_path) -> None:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    DataWriter(filename).insert_user_data("2", "plating", {"Plating Spec": "X"})
+    outline = [(0, "1", "part1", "", ""), (1, "2", "part2", "part1", "95")]
+    done = []
+
+    path = export(DataReader(filename), outline, str(tmp_path / "bom.csv"), done.append)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == HEADER
+    assert rows[1][:4] == ["0", "part1", "", ""]
+    assert rows[2][:4] == ["1", "part2", "part1", "95"]
+    assert rows[2][HEADER.index("Plating: Plating Spec")] == "X"
+    assert rows[1][HEADER.index("Plating: Plating Spec")] == ""
+    assert done[-1] == 100
+
+
+def test_export_reads_the_table_a_chunk_of_parts_at_a_time(
+    tmp_path, monkeypatch
+) -> None:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    DataWriter(filename).insert_user_data_batch(
+        {str(i): {"paint": {"Color": f"c{i}"}} for i in range(5)}
+    )
+    outline = [(0, str(i), f"part{i}", "", "") for i in (4, 0, 9, 2)]
+    reader = DataReader(filename)
+    reads = []
+    get_user_rows = reader.get_user_rows
+    monkeypatch.setattr(exporter, "EXPORT_CHUNK", 3)
+    monkeypatch.setattr(
+        reader, "get_user_rows", lambda ids: reads.append(ids) or get_user_rows(ids)
+    )
+
+    rows = list(exporter.export_rows(reader, outline))
+
+    assert reads == [["4", "0", "9"], ["2"]]
+    color = HEADER.index("Paint: Color")
+    assert [i[color] for i in rows[1:]] == ["c4", "c0", "", "c2"]
+    assert len(rows[3]) == len(HEADER)
@@ -0,0 +1,80 @@
+"""
+Tests for the trigram search index over the parts
+"""
+import os
+import sys
+import h5py
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from data_manager.data_manager import DataReader, DataWriter
+from data_manager.search_index import SearchIndex
+
+
+def make_index() -> SearchIndex:
+    index = SearchIndex()
+    index.set_text("1", "name", "Bracket Assy")
+    index.set_text("2", "name", "Bolt")
+    index.set_text("2", "plating", "Cadmium QQ-P-416")
+    index.set_text("3", "name", "AB")
+    return index
+
+
+def test_search_finds_substrings_in_any_field() -> None:
+    index = make_index()
+
+    assert index.search("ASSY") == ["1"]
+    assert index.search("qq-p") == ["2"]
+    assert sorted(index.search("b")) == ["1", "2", "3"]
+    assert index.search("ab") == ["3"]
+    assert index.search("missing") == []
+
+
+def test_saved_index_is_searched_with_later_changes(tmp_path) -> None:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    writer = DataWriter(filename)
+    writer.save_search_index(make_index())
+
+    index = DataReader(filename).get_search_index()
+    assert not index.dirty
+    assert index.search("cadmium") == ["2"]
+    index.set_text("2", "name", "Screw")
+    index.remove("1")
+    index.set_text("4", "name", "Screw Cap")
+
+    assert index.search("bolt") == []
+    assert index.search("cadmium") == ["2"]
+    assert sorted(index.search("screw")) == ["2", "4"]
+    assert index.search("bracket") == []
+    writer.save_search_index(index)
+    assert sorted(DataReader(filename).get_search_index().search("screw")) == ["2", "4"]
+
+
+def test_out_of_date_index_is_rebuilt(tmp_path) -> None:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    writer = DataWriter(filename)
+    writer.save_search_index(SearchIndex())
+    writer.save_drawings([("", "1", "Hinge", "", ())], [])
+    writer.insert_user_data("1", "paint", {"Color": "Green"})
+
+    index = DataReader(filename).get_search_index()
+
+    assert index.dirty
+    assert index.search("hinge") == ["1"]
+    assert index.search("green") == ["1"]
+
+
+def test_merge_keeps_changes_made_while_loading() -> None:
+    index = SearchIndex()
+    index.set_text("2", "name", "Screw")
+    index.remove("3")
+
+    index.merge(make_index())
+
+    assert index.search("screw") == ["2"]
+    assert index.search("cadmium") == ["2"]
+    assert index.search("bolt") == []
+    assert index.search("ab") == []
+    assert index.search("assy") == ["1"]
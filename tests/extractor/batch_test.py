@@ -0,0 +1,48 @@
+"""
+Tests for extracting many table regions as one batch
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from extractor.extractor import crop_region, merge_tables, sort_regions
+
+
+def test_regions_are_read_in_page_order_top_to_bottom() -> None:
+    regions = [
+        ("7", 2, (0.1, 0.5, 0.9, 0.9), 0),
+        ("3", 1, (0.1, 0.0, 0.9, 0.4), 0),
+        ("7", 1, (0.1, 0.6, 0.9, 0.9), 0),
+        ("7", 2, (0.1, 0.1, 0.9, 0.4), 0),
+    ]
+
+    assert sort_regions(regions) == [
+        ("7", 1, (0.1, 0.6, 0.9, 0.9), 0),
+        ("7", 2, (0.1, 0.1, 0.9, 0.4), 0),
+        ("7", 2, (0.1, 0.5, 0.9, 0.9), 0),
+        ("3", 1, (0.1, 0.0, 0.9, 0.4), 0),
+    ]
+
+
+def test_the_same_region_is_cut_from_pages_of_any_size() -> None:
+    small = np.arange(20 * 10).reshape(20, 10)
+    big = np.arange(40 * 20).reshape(40, 20)
+    box = (0.5, 0.25, 1.0, 0.5)
+
+    assert crop_region(small, box, 0).tolist() == small[5:10, 5:10].tolist()
+    assert crop_region(big, box, 0).shape == (10, 10)
+    assert crop_region(small, box, 1).tolist() == np.rot90(small[5:10, 5:10]).tolist()
+
+
+def test_tables_are_stacked_and_padded_to_the_widest() -> None:
+    first = [[["PART", "90"], ["QTY", "91"]], [["A-1", "80"], ["2", "85"]]]
+    second = [[["PART", "88"], ["QTY", "90"], ["NOTE", "70"]]]
+
+    assert merge_tables([first, second]) == [
+        [["PART", "90"], ["QTY", "91"], ["", "-2"]],
+        [["A-1", "80"], ["2", "85"], ["", "-2"]],
+        [["PART", "88"], ["QTY", "90"], ["NOTE", "70"]],
+    ]
+    assert merge_tables([]) == []
@@ -0,0 +1,53 @@
+"""
+Tests for preparing the cells of a table for OCR
+"""
+import os
+import sys
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from extractor.helper import (
+    CELL_PAD,
+    has_ink,
+    scale_cell,
+    text_height,
+    text_scale,
+    trim_cell,
+)
+
+
+def cell_with_rules() -> np.ndarray:
+    """a 40 x 120 cell with pieces of the rules along its top and left"""
+    cell = np.full((40, 120), 255, np.uint8)
+    cell[:2, :] = 0
+    cell[:, :3] = 0
+    cell[15:25, 30:70] = 0  # the text
+    return cell
+
+
+def test_cells_are_trimmed_to_their_text() -> None:
+    cell = cell_with_rules()
+    trimmed = trim_cell(cell)
+    assert trimmed.shape == (10, 40) and has_ink(trimmed)
+    cell[15:25, 30:70] = 255
+    assert not has_ink(trim_cell(cell))
+
+    scaled = scale_cell(trimmed, 2)
+    assert scaled.shape == (20 + 2 * CELL_PAD, 80 + 2 * CELL_PAD)
+    assert (scaled[:CELL_PAD] == 255).all() and (scaled[:, :CELL_PAD] == 255).all()
+
+
+def test_the_text_height_of_a_row_leaves_out_rules_and_specks() -> None:
+    row = np.full((60, 600), 255, np.uint8)
+    row[0:2, :] = row[-2:, :] = 0  # rules above and below
+    row[:, 200:202] = row[:, 400:402] = 0  # rules between the cells
+    row[30, 100] = 0  # a speck
+    for x, text in [(20, "ABC 12"), (220, "PART"), (420, "7")]:
+        cv2.putText(row, text, (x, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 0, 1)
+
+    height = text_height(row)
+    assert 10 <= height <= 16
+    assert text_scale(height, 2 * height) == 2
+    assert text_scale(0, 22) == 1 and text_scale(1, 22) == 4
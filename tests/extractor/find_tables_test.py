@@ -0,0 +1,34 @@
+"""
+Tests for finding the tables on a whole page
+"""
+import os
+import sys
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from extractor.helper import find_tables
+
+
+def test_ruled_tables_are_found_but_not_the_border_or_views() -> None:
+    page = np.full((3300, 5100), 255, np.uint8)
+    cv2.rectangle(page, (50, 50), (5050, 3250), 0, 6)  # drawing border
+    cv2.rectangle(page, (600, 1000), (2000, 2000), 0, 5)  # a view, one box
+    for row in range(7):  # parts list, 6 rows and 4 columns
+        cv2.line(page, (3000, 300 + row * 80), (4800, 300 + row * 80), 0, 3)
+    for col in (3000, 3300, 4000, 4400, 4800):
+        cv2.line(page, (col, 300), (col, 780), 0, 3)
+    for row in range(4):  # title block, joined to the border
+        cv2.line(page, (3600, 2650 + row * 200), (5050, 2650 + row * 200), 0, 4)
+    for col in (3600, 4300):
+        cv2.line(page, (col, 2650), (col, 3250), 0, 4)
+
+    tables = find_tables(page)
+    boxes = [
+        np.round(np.array(i) * [5100, 3300, 5100, 3300], -1).tolist() for i in tables
+    ]
+
+    assert len(boxes) == 2
+    assert np.allclose(boxes[0], [3000, 300, 4800, 780], atol=20)
+    assert np.allclose(boxes[1], [3600, 2650, 5050, 3250], atol=20)
@@ -0,0 +1,22 @@
+"""
+Tests for finding a column in an OCR'd table
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from extractor.helper import get_column
+
+
+def test_get_column_returns_cells_under_the_header() -> None:
+    data = [
+        [["ITEM", "90"], ["PART NO", "91"], ["DESC", "92"]],
+        [["1", "80"], [" A-100 ", "96.5"], ["bolt", "70"]],
+        [["2", "80"], ["", "-2"], ["nut", "70"]],
+        [["3", "80"], ["B-200", "60"], ["washer", "70"]],
+    ]
+
+    assert get_column(data, "PART") == [("A-100", "96.5"), ("B-200", "60")]
+    assert get_column(data, "MISSING") == []
+    assert get_column([], "PART") == []
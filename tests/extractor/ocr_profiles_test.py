@@ -0,0 +1,54 @@
+"""
+Tests for the OCR profiles of the columns of a table
+"""
+import os
+import shlex
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from extractor.ocr_profiles import (
+    BLANK,
+    DEFAULT,
+    FAST,
+    PROFILES,
+    RETRY,
+    OcrStats,
+    profile_for,
+    tesseract_config,
+)
+
+
+def test_each_profile_is_one_set_of_tesseract_options() -> None:
+    assert profile_for("QTY") == "QTY"
+    assert profile_for("") == profile_for("REV") == DEFAULT
+    for profile, settings in PROFILES.items():
+        # pytesseract splits the config the same way
+        args = shlex.split(tesseract_config(profile))
+        assert args[:2] == ["-c", "tessedit_char_whitelist=" + settings["whitelist"]]
+        assert args[2:] == [
+            "--psm",
+            str(settings["psm"]),
+            "--oem",
+            str(settings["oem"]),
+        ]
+
+
+def test_time_is_added_up_by_profile_and_tier() -> None:
+    stats = OcrStats()
+    stats.record("QTY", 0.01)
+    stats.record("QTY", 0.03)
+    stats.record("QTY", 0.2, RETRY)
+    stats.record(DEFAULT, 0.0, BLANK)
+
+    report = stats.report()
+    assert [i[:3] for i in report] == [
+        ("QTY", FAST, 2),
+        ("QTY", RETRY, 1),
+        (DEFAULT, BLANK, 1),
+    ]
+    assert abs(report[0][4] - 20) < 1e-9
+    assert stats.tiers() == {BLANK: 1, FAST: 2, RETRY: 1}
+    assert "1 retry" in stats.summary()
+    assert stats.counts() == "1 blank, 2 fast, 1 retry"
+    assert OcrStats().counts() == "0 blank, 0 fast, 0 retry"
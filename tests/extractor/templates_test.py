@@ -0,0 +1,79 @@
+"""
+Tests for reusing the layout of tables that were read before
+"""
+import os
+import sys
+import h5py
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from data_manager.data_manager import DataReader, DataWriter
+from extractor.templates import (
+    TemplateStore,
+    grid_rules,
+    header_roles,
+    role_of,
+    signature,
+)
+
+
+def ruled_table(scale: int, margin: int, rows=(0, 20, 40, 60, 80)) -> np.ndarray:
+    """a parts list with 3 columns and 4 rows, rules 2 * scale pixels wide"""
+    cols = [0, 40, 160, 200]
+    size = (rows[-1] * scale + 2 * margin, cols[-1] * scale + 2 * margin)
+    img = np.full(size, 255, np.uint8)
+    for x in cols:
+        x = margin + x * scale
+        img[margin : size[0] - margin, x : x + 2 * scale] = 0
+    for y in rows:
+        y = margin + y * scale
+        img[y : y + 2 * scale, margin : size[1] - margin] = 0
+    img[margin + 8 * scale, margin + 60 * scale : margin + 90 * scale] = 0  # text
+    return img
+
+
+def test_the_same_layout_has_one_signature_at_any_size() -> None:
+    small, big = ruled_table(1, 3), ruled_table(3, 20)
+
+    cols, rows = grid_rules(small)
+    assert len(cols) == 4 and len(rows) == 5
+    assert signature(grid_rules(big)[0]) == signature(cols)
+    longer = ruled_table(1, 3, rows=(0, 20, 30, 40, 50, 60, 90))
+    assert signature(grid_rules(longer)[0]) == signature(cols)
+    other = ruled_table(1, 3)
+    other[:, 100:102] = 0  # another column
+    assert signature(grid_rules(other)[0]) != signature(cols)
+
+
+def test_a_learned_layout_is_matched_from_the_file(tmp_path) -> None:
+    filename = str(tmp_path / "test.bci")
+    h5py.File(filename, "w").close()
+    store = TemplateStore(DataReader(filename), DataWriter(filename))
+    table = ruled_table(2, 10)
+    assert store.match(table) is None
+
+    header = [[(50, "ITEM"), (200, "PART NO."), (380, "QTY")], [(200, "A-1")]]
+    store.learn(table, header)
+    template, cells = TemplateStore(DataReader(filename), DataWriter(filename)).match(
+        ruled_table(3, 5, rows=(0, 20, 40, 60, 80, 100))
+    )
+
+    # the rows are found again in the table that matched, it has one more
+    assert template.roles == ["", "PART", "QTY"]
+    assert len(cells) == 5 and all(len(row) == 3 for row in cells)
+    x, y, w, h = cells[0][1][0]
+    assert (x, y, w, h) == (5 + 42 * 3, 5 + 2 * 3, 118 * 3, 18 * 3)
+
+
+def test_a_header_names_at_least_two_columns() -> None:
+    assert header_roles(["PARTS LIST", "", ""]) is None
+    assert header_roles(["PARTS LIST", "SPARE", "QUEUE"]) is None
+    assert header_roles(["ITEM", "P/N", "QTY REQD", "DESCRIPTION"]) == [
+        "",
+        "PART",
+        "QTY",
+        "DESCRIPTION",
+    ]
+    # keywords have to start a word, not be somewhere inside one
+    assert role_of("UNIQTY") == "" and role_of("QUANTITY") == "QTY"
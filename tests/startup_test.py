@@ -0,0 +1,23 @@
+"""
+Tests that starting the application doesn't load what it only needs later
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from startup_report import HEAVY_MODULES, import_times, loaded_modules
+
+
+def test_heavy_modules_are_not_imported_on_start() -> None:
+    loaded = loaded_modules("gui.gui")
+
+    assert "gui.gui" in loaded
+    assert [i for i in HEAVY_MODULES if i in loaded] == []
+
+
+def test_import_report_adds_up_packages() -> None:
+    packages = dict((i[0], i[1:]) for i in import_times("data_manager.data_manager"))
+
+    assert "h5py" in packages
+    assert "cv2" not in packages
@@ -0,0 +1,100 @@
+"""
+Tests for the in memory part model behind the treeview
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+
+from gui.treeview.part_model.part_model import PartModel
+
+
+def make_model() -> PartModel:
+    data = [
+        ["1", "", "part1", "", ["2", "3"]],
+        ["2", "1", "part2", "", ["4"]],
+        ["3", "1", "part3", "95", []],
+        ["4", "2", "part4", "", []],
+    ]
+    model = PartModel()
+    model.load(data)
+    return model
+
+
+def test_load_keeps_tree_order() -> None:
+    model = make_model()
+
+    assert [i.part_id for i in model.walk()] == ["1", "2", "4", "3"]
+    assert model.item_id == 4
+
+
+def test_remove_moves_children_up() -> None:
+    model = make_model()
+
+    assert model.remove("2") == ["4", "3"]
+    assert model["4"].parent == "1"
+    rows, deleted = model.pop_changes()
+    assert deleted == ["2"]
+    assert sorted(rows) == [
+        ("", "1", "part1", "", ("4", "3")),
+        ("1", "4", "part4", "", ()),
+    ]
+    assert model.pop_changes() == ([], [])
+
+
+def test_rows_are_in_save_form() -> None:
+    model = make_model()
+    model.add(model.new_id(), "3", "part5", "50")
+
+    assert ("3", "5", "part5", "50", ()) in model.rows()
+    assert ("1", "3", "part3", "95", ("5",)) in model.rows()
+
+
+def test_only_changed_parts_are_saved() -> None:
+    model = make_model()
+    assert model.pop_changes() == ([], [])
+    assert not model.has_changes()
+
+    model.rename("4", "new name")
+
+    assert model.has_changes()
+    assert model.pop_changes() == ([("2", "4", "new name", "", ())], [])
+    assert not model.has_changes()
+
+
+def test_outline_has_levels_and_parent_names() -> None:
+    model = make_model()
+
+    assert model.outline() == [
+        (0, "1", "part1", "", ""),
+        (1, "2", "part2", "part1", ""),
+        (2, "4", "part4", "part2", ""),
+        (1, "3", "part3", "part1", "95"),
+    ]
+
+
+def test_chunks_in_any_order_load_like_the_whole_tree() -> None:
+    data = [
+        ["4", "2", "part4", "", []],
+        ["3", "1", "part3", "95", []],
+        ["1", "", "part1", "", ["2", "3"]],
+        ["9", "8", "orphan", "", []],
+        ["2", "1", "part2", "", ["4"]],
+    ]
+    model = PartModel()
+    model.begin_load()
+
+    first = model.load_chunk(data[:2])
+    second = model.load_chunk(data[2:])
+    model.end_load()
+
+    assert first == []
+    assert [(i.part_id, j) for i, j in second] == [
+        ("1", 0),
+        ("3", 0),
+        ("2", 0),
+        ("4", 0),
+    ]
+    assert [i.part_id for i in model.walk()] == ["1", "2", "4", "3"]
+    assert model.item_id == 4
+    assert model.pop_changes() == ([], [])